@@ -1,21 +1,55 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict
-from datetime import datetime
+from typing import Callable, List, Dict, Optional
+from datetime import datetime, date, timezone
+from zoneinfo import ZoneInfo
 import json
-import requests
+import httpx
 import hmac
 import hashlib
 import time
 import logging
 import math
 import uuid
+import asyncio
+import os
+import numpy as np
+from services.http_client import get_exchange_client, close_exchange_clients
+from services.clock import ClockSkewEstimator
+from services.instruments import InstrumentRegistry
+from services.price_feed import TickerPriceFeed
+from services.credentials import CredentialCache, AUTH_ERROR_CODES, credential_fingerprint
+from services.leverage import LeverageCache
+from services.store import IndexedStore
+from services.journal import JsonJournal
+from services.shared_journal import SharedJsonJournal
+from services.sql_persistence import SqlUserPersistence, SqlPortfolioPersistence
+from models.database import init_db
+from services.catalog import CryptoCatalog
+from services.pipeline import StagePipeline
+from services.exchange_registry import ExchangeClientRegistry
+from services.job_queue import JobQueue, JobWorkerPool
+from services.rate_limit import RequestScheduler, BYBIT_CLASS_LIMITS, bybit_endpoint_class, parse_bybit_limit_headers
+from services.valuation import ValuationJob, SIDE_LONG, SIDE_SHORT
+from services.ohlcv_store import OhlcvStore, KlineSync, INTERVAL_MS, SYMBOL_PATTERN
+from services.trend import TrendMonitor
+from services.leader import LeaderLock
+from services.backtest import run_backtest
+from services.paper_exchange import PaperExchange, PaperLedger, DEFAULT_FEE_RATE
+from services.log_setup import configure_logging, stop_logging, log_payload, logging_status
+from services.metrics import registry as metrics_registry, StageMetrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from services.sizing import size_order, size_orders, format_qty, step_decimals, SIZE_OK, SIZE_INVALID_PRICE, SIZE_BELOW_MIN, SIZE_ABOVE_MAX
 
 app = FastAPI()
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+# Configurar logging: registros estruturados (JSON ou texto) escritos por uma thread a partir de uma fila,
+# com credenciais e assinaturas mascaradas. Payloads completos só em DEBUG ou numa amostra em INFO.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0"))
+configure_logging(LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_PAYLOAD_SAMPLE_RATE)
 logger = logging.getLogger(__name__)
 
 # Adicionar middleware CORS
@@ -62,103 +96,246 @@ class SignalRequest(BaseModel):
     amount_in_usd: float
     leverage: int
 
+# Modelo para o envio de um sinal a várias carteiras
+class BroadcastRequest(BaseModel):
+    symbol: str
+    trend: str
+    portfolioType: str  # 'daily' ou 'intraday'
+
+# Modelo para o rebalanceamento de uma carteira
+class RebalanceRequest(BaseModel):
+    trend: str  # 'up' (comprado) ou 'down' (vendido)
+
+# Modelo para o backtest de uma carteira
+class BacktestRequest(BaseModel):
+    start: Optional[str] = None  # Ex.: "2024-01-01" (padrão: todo o histórico local)
+    end: Optional[str] = None
+    fee_rate: Optional[float] = None  # Padrão: PAPER_FEE_RATE
+    enter_on_first_trend: bool = False  # Abre posição já na primeira tendência (o ao vivo só opera viradas)
+
+# Catálogo de criptomoedas (cryptos.json) em memória, recarregado quando o arquivo muda
+crypto_catalog = CryptoCatalog("cryptos.json", check_interval=float(os.getenv("CRYPTOS_CHECK_INTERVAL", "1")))
+
+# URL base da API da Bybit (ex.: http://127.0.0.1:9009 para o servidor falso de benchmarks.fake_bybit)
+BYBIT_BASE_URL = os.getenv("BYBIT_BASE_URL", "https://api-testnet.bybit.com")
+
+# Número máximo de ordens por requisição de /v5/order/create-batch (contratos lineares)
+BYBIT_BATCH_ORDER_LIMIT = int(os.getenv("BYBIT_BATCH_ORDER_LIMIT", "10"))
+
+# URL do stream público de tickers (contratos lineares)
+BYBIT_WS_PUBLIC_URL = os.getenv("BYBIT_WS_PUBLIC_URL", "wss://stream-testnet.bybit.com/v5/public/linear")
+
+# Número máximo de carteiras processadas simultaneamente em um broadcast
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "50"))
+
+# Limite da Bybit por IP (600 requisições a cada 5 segundos): taxa por segundo e rajada máxima
+BYBIT_IP_RATE_LIMIT = float(os.getenv("BYBIT_IP_RATE_LIMIT", "120"))
+BYBIT_IP_BURST = float(os.getenv("BYBIT_IP_BURST", "600"))
+
+# Clientes das exchanges atendidas por adaptador (SDK): ambiente de testes, tamanho do registro
+# e tempo ocioso (s) até o cliente ser descartado
+EXCHANGE_TESTNET = os.getenv("EXCHANGE_TESTNET", "true").lower() == "true"
+EXCHANGE_CLIENTS_MAX = int(os.getenv("EXCHANGE_CLIENTS_MAX", "256"))
+EXCHANGE_CLIENT_IDLE_TIMEOUT = float(os.getenv("EXCHANGE_CLIENT_IDLE_TIMEOUT", "900"))
+
+# Taxa por execução das ordens simuladas (carteiras com exchange "Paper") e dos backtests
+PAPER_FEE_RATE = float(os.getenv("PAPER_FEE_RATE", str(DEFAULT_FEE_RATE)))
+
+# Fila durável de ordens assíncronas: arquivo SQLite, workers, tentativas e intervalo entre tentativas (s)
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "2"))
+# Posse de um job em execução (s): sem heartbeat por esse tempo, o job volta à fila (o processo caiu)
+JOB_LEASE = float(os.getenv("JOB_LEASE", "60"))
+
+# Avaliação diária das carteiras (PortfolioPerformance): hora e fuso do snapshot e dias verificados no backfill
+VALUATION_ENABLED = os.getenv("VALUATION_ENABLED", "true").lower() == "true"
+VALUATION_HOUR = int(os.getenv("VALUATION_HOUR", "21"))
+VALUATION_TIMEZONE = os.getenv("VALUATION_TIMEZONE", "America/Sao_Paulo")
+VALUATION_BACKFILL_DAYS = int(os.getenv("VALUATION_BACKFILL_DAYS", "7"))
+
+# Candles locais (OHLCV) dos símbolos do cryptos.json: pasta, intervalos (diário e intraday),
+# histórico inicial (dias) e intervalo entre sincronizações (s)
+OHLCV_ENABLED = os.getenv("OHLCV_ENABLED", "true").lower() == "true"
+OHLCV_DIR = os.getenv("OHLCV_DIR", "ohlcv")
+OHLCV_INTERVALS = tuple(os.getenv("OHLCV_INTERVALS", "D,60").split(","))
+OHLCV_HISTORY_DAYS = int(os.getenv("OHLCV_HISTORY_DAYS", "365"))
+OHLCV_SYNC_INTERVAL = float(os.getenv("OHLCV_SYNC_INTERVAL", "300"))
+
+# Motor de tendência: intervalo dos candles de cada lista do cryptos.json, períodos das EMAs e do
+# ATR/ADX, filtros da virada e envio automático das viradas às carteiras do timeframe (broadcast)
+TREND_INTERVALS = {"daily": os.getenv("TREND_DAILY_INTERVAL", "D"), "intraday": os.getenv("TREND_INTRADAY_INTERVAL", "60")}
+TREND_FAST_PERIOD = int(os.getenv("TREND_FAST_PERIOD", "9"))
+TREND_SLOW_PERIOD = int(os.getenv("TREND_SLOW_PERIOD", "21"))
+TREND_PERIOD = int(os.getenv("TREND_PERIOD", "14"))
+TREND_ADX_THRESHOLD = float(os.getenv("TREND_ADX_THRESHOLD", "20"))
+TREND_ATR_FILTER = float(os.getenv("TREND_ATR_FILTER", "0"))
+TREND_AUTO_BROADCAST = os.getenv("TREND_AUTO_BROADCAST", "false").lower() == "true"
+# Arquivo de liderança entre os workers do uvicorn: só o processo líder envia as ordens automáticas
+# e executa a avaliação diária agendada
+LEADER_LOCK_PATH = os.getenv("LEADER_LOCK_PATH", "leader.lock")
+TREND_ENGINE_OPTIONS = {
+    "fast": TREND_FAST_PERIOD,
+    "slow": TREND_SLOW_PERIOD,
+    "period": TREND_PERIOD,
+    "adx_threshold": TREND_ADX_THRESHOLD,
+    "atr_filter": TREND_ATR_FILTER,
+}
+
 # Dicionário de mapeamento de erros da Bybit
 BYBIT_ERROR_MESSAGES = {
     10001: "Parâmetro inválido. Verifique os dados enviados (ex.: símbolo ou quantidade inválida).",
     10002: "Timestamp dessincronizado. Tente novamente.",
+    10003: "Chave de API inválida. Verifique as credenciais da API.",
     10004: "Erro de assinatura. Verifique as credenciais da API.",
+    10006: "Limite de requisições excedido. Tente novamente em instantes.",
     110001: "Saldo insuficiente para executar a ordem.",
     110043: "Alavancagem não modificada (leverage not modified).",
+    110072: "orderLinkId duplicado: a ordem já foi enviada.",
     130021: "Alavancagem inválida. Verifique o valor de alavancagem permitido para o símbolo.",
     130028: "Falha ao definir a alavancagem. Tente novamente."
 }
 
-# Função para carregar usuários de um arquivo JSON
-def load_users():
-    try:
-        with open("users.json", "r") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        return []
-    except Exception as e:
-        logger.error(f"Erro ao carregar users.json: {str(e)}")
-        return []
+# Backend de persistência: "json" (snapshot + journal, um único processo), "shared" (snapshot + journal
+# compartilhados entre processos, para uvicorn/gunicorn com --workers N) ou "sql" (modelos SQLAlchemy em DATABASE_URL)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
 
-# Função para salvar usuários em um arquivo JSON
-def save_users(users):
-    try:
-        with open("users.json", "w") as file:
-            json.dump(users, file, indent=4)
-    except Exception as e:
-        logger.error(f"Erro ao salvar users.json: {str(e)}")
+# Intervalo do fsync em lote e número de mutações entre compactações dos journals
+JOURNAL_FSYNC_INTERVAL = float(os.getenv("JOURNAL_FSYNC_INTERVAL", "0.05"))
+JOURNAL_COMPACT_EVERY = int(os.getenv("JOURNAL_COMPACT_EVERY", "10000"))
+
+if STORAGE_BACKEND == "sql":
+    init_db()
+    users_persistence = SqlUserPersistence()
+    portfolios_persistence = SqlPortfolioPersistence()
+elif STORAGE_BACKEND == "shared":
+    # Escritas sob flock e journals acompanhados por todos os processos
+    users_persistence = SharedJsonJournal("users.json", fsync_interval=JOURNAL_FSYNC_INTERVAL, compact_every=JOURNAL_COMPACT_EVERY)
+    portfolios_persistence = SharedJsonJournal("portfolios.json", fsync_interval=JOURNAL_FSYNC_INTERVAL, compact_every=JOURNAL_COMPACT_EVERY)
+else:
+    # Snapshots users.json/portfolios.json + journals append-only
+    users_persistence = JsonJournal("users.json", fsync_interval=JOURNAL_FSYNC_INTERVAL, compact_every=JOURNAL_COMPACT_EVERY)
+    portfolios_persistence = JsonJournal("portfolios.json", fsync_interval=JOURNAL_FSYNC_INTERVAL, compact_every=JOURNAL_COMPACT_EVERY)
 
 # Carrega os usuários ao iniciar o servidor
-users_db = load_users()
+users_db = IndexedStore(users_persistence.load(), indexes=("username", "email"), persistence=users_persistence)
+users_persistence.snapshot_source = users_db.all
 
-# Função para carregar portfolios de um arquivo JSON
-def load_portfolios():
-    try:
-        with open("portfolios.json", "r") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        return []
-    except Exception as e:
-        logger.error(f"Erro ao carregar portfolios.json: {str(e)}")
-        return []
+# Carrega os portfolios ao iniciar o servidor
+portfolios_db = IndexedStore(
+    portfolios_persistence.load(),
+    indexes=(
+        "user_id",
+        "portfolioType",
+        # (portfolioType, símbolo) de cada ativo: resolve os destinos de um broadcast sem varrer as carteiras
+        ("type_symbol", lambda p: {(p.get("portfolioType"), a["symbol"]) for a in p["assets"]}),
+        # (chave de API, símbolo): carteiras que dividem a posição de um ativo na mesma conta
+        ("key_symbol", lambda p: {(p["api_key"], a["symbol"]) for a in p["assets"]})
+    ),
+    persistence=portfolios_persistence
+)
+portfolios_persistence.snapshot_source = portfolios_db.all
 
-# Função para salvar portfolios em um arquivo JSON
-def save_portfolios(portfolios):
-    try:
-        with open("portfolios.json", "w") as file:
-            json.dump(portfolios, file, indent=4)
-    except Exception as e:
-        logger.error(f"Erro ao salvar portfolios.json: {str(e)}")
+# Função para uma consulta pública à Bybit: devolve o JSON da resposta; retCode != 0 vira exceção
+# (e entra na contagem de erros do endpoint)
+async def bybit_public_request(path: str, params: Optional[Dict] = None) -> Dict:
+    client = get_exchange_client(BYBIT_BASE_URL)
+    response = await client.get(path, params=params)
+    response.raise_for_status()
+    data = response.json()
+    if data["retCode"] != 0:
+        client.record_error(path, data["retCode"])
+        raise Exception(data["retMsg"])
+    return data
 
-# Carrega os portfolios ao iniciar o servidor
-portfolios_db = load_portfolios()
+# Função para consultar o horário do servidor da Bybit (em milissegundos)
+async def fetch_bybit_server_time() -> float:
+    data = await bybit_public_request("/v5/market/time")
+    return int(data["result"]["timeNano"]) / 1_000_000
 
-# Função para obter o horário do servidor da Bybit
+# Estimador do desvio de relógio em relação à Bybit, sincronizado em segundo plano
+bybit_clock = ClockSkewEstimator(
+    fetch_bybit_server_time,
+    sync_interval=float(os.getenv("BYBIT_CLOCK_SYNC_INTERVAL", "60"))
+)
+
+# Função para obter o horário do servidor da Bybit (estimado localmente, sem requisição)
 def get_bybit_server_time() -> int:
-    try:
-        response = requests.get("https://api-testnet.bybit.com/v5/market/time")
-        response.raise_for_status()
-        data = response.json()
-        if data["retCode"] != 0:
-            raise Exception(data["retMsg"])
-        server_time = int(data["result"]["timeSecond"]) * 1000
-        logger.info(f"Horário do servidor da Bybit: {server_time}")
-        return server_time
-    except Exception as e:
-        logger.error(f"Erro ao obter horário do servidor da Bybit: {str(e)}")
-        local_time = int(time.time() * 1000)
-        logger.warning(f"Usando horário local como fallback: {local_time}")
-        return local_time
+    return bybit_clock.now_ms()
+
+# Cache das credenciais já validadas (chaveado por hash, nunca pelo texto puro)
+credential_cache = CredentialCache(ttl=float(os.getenv("CREDENTIALS_CACHE_TTL", "3600")))
+
+# Alavancagem já aplicada por (chave de API, símbolo)
+leverage_cache = LeverageCache()
+
+# Adaptadores importados sob demanda: o SDK de cada exchange só é necessário se houver carteiras nela.
+# Carteiras Bybit não passam pelo registro: usam sempre o fluxo nativo (execute_signal).
+def create_binance_adapter(api_key: str, api_secret: str, testnet: bool):
+    from binance_service import BinanceService
+    return BinanceService(api_key, api_secret, testnet=testnet)
+
+# Loop do servidor, usado pelos adaptadores síncronos (executados em threads) para consultar
+# o cache de preços e o registro de instrumentos
+server_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def run_in_server_loop(coroutine, timeout: float = 30.0):
+    return asyncio.run_coroutine_threadsafe(coroutine, server_loop).result(timeout)
+
+# Contas simuladas das carteiras "Paper" (em memória, por credenciais)
+paper_ledger = PaperLedger()
+
+def create_paper_adapter(api_key: str, api_secret: str, testnet: bool):
+    return PaperExchange(
+        paper_ledger.account(credential_fingerprint(api_key, api_secret)),
+        lambda symbol: run_in_server_loop(price_feed.get_price(symbol)),
+        lambda symbol: run_in_server_loop(instrument_registry.get(symbol)),
+        fee_rate=PAPER_FEE_RATE
+    )
+
+def is_paper_portfolio(portfolio: Dict) -> bool:
+    return (portfolio.get("exchange") or "").lower() == "paper"
+
+# Clientes de exchange reaproveitados por (exchange, credenciais, testnet)
+exchange_registry = ExchangeClientRegistry(
+    {"Binance": create_binance_adapter, "Paper": create_paper_adapter},
+    max_size=EXCHANGE_CLIENTS_MAX,
+    idle_timeout=EXCHANGE_CLIENT_IDLE_TIMEOUT
+)
+
+# Escalonador das requisições à Bybit: limites por chave e classe de endpoint, limite por IP
+# e filas por prioridade (ordens antes de alavancagem, posições, saldo e consultas)
+bybit_scheduler = RequestScheduler(BYBIT_CLASS_LIMITS, ip_rate=BYBIT_IP_RATE_LIMIT, ip_capacity=BYBIT_IP_BURST)
 
 # Função para gerar a assinatura HMAC-SHA256 para a Bybit
 def generate_bybit_signature(api_key: str, api_secret: str, timestamp: str, recv_window: str, body: str = None, query_params: Dict = None) -> str:
     param_str = f"{timestamp}{api_key}{recv_window}"
     if query_params:
+        # A query string assinada precisa ser idêntica à enviada (parâmetros ordenados, separados por '&')
         sorted_params = sorted(query_params.items())
-        query_str = "".join(f"{key}={value}" for key, value in sorted_params)
+        query_str = "&".join(f"{key}={value}" for key, value in sorted_params)
         param_str += query_str
     elif body:
         param_str += body
-    logger.info(f"String de assinatura gerada: {param_str}")
-    signature = hmac.new(
+    return hmac.new(
         api_secret.encode('utf-8'),
         param_str.encode('utf-8'),
         hashlib.sha256
     ).hexdigest()
-    logger.info(f"Assinatura gerada (X-BAPI-SIGN): {signature}")
-    return signature
 
-# Função para validar as credenciais na Bybit
-def validate_bybit_credentials(api_key: str, api_secret: str) -> bool:
-    max_attempts = 3
-    for attempt in range(max_attempts):
+# Função para enviar uma requisição assinada para a Bybit pelo cliente compartilhado
+async def bybit_signed_request(method: str, path: str, api_key: str, api_secret: str, query_params: Dict = None, body_params: Dict = None) -> Dict:
+    recv_window = "10000"
+    body = json.dumps(body_params, separators=(',', ':')) if body_params is not None else None
+    client = get_exchange_client(BYBIT_BASE_URL)
+    limiter_key = credential_fingerprint(api_key)[:16]
+    endpoint_class = bybit_endpoint_class(path)
+    for attempt in range(2):
+        # Aguarda a vez antes de assinar, para que o timestamp não envelheça na fila
+        await bybit_scheduler.acquire(limiter_key, endpoint_class)
         timestamp = str(get_bybit_server_time())
-        recv_window = "10000"
-        signature = generate_bybit_signature(api_key, api_secret, timestamp, recv_window, body=None, query_params=None)
+        signature = generate_bybit_signature(api_key, api_secret, timestamp, recv_window, body=body, query_params=query_params)
         headers = {
             "X-BAPI-API-KEY": api_key,
             "X-BAPI-TIMESTAMP": timestamp,
@@ -166,89 +343,103 @@ def validate_bybit_credentials(api_key: str, api_secret: str) -> bool:
             "X-BAPI-SIGN": signature,
             "Content-Type": "application/json"
         }
-        logger.info(f"Cabeçalhos da requisição (validação): {headers}")
-        try:
-            response = requests.get(
-                "https://api-testnet.bybit.com/v5/user/query-api",
-                headers=headers
-            )
-            data = response.json()
-            logger.info(f"Resposta da validação de credenciais (tentativa {attempt + 1}): {data}")
-            if data["retCode"] == 0:
-                return True
-            elif data["retCode"] == 10002:
-                logger.warning(f"Timestamp dessincronizado (tentativa {attempt + 1}): req_timestamp[{timestamp}], server_timestamp[{data['time']}]")
-                if attempt == max_attempts - 1:
-                    logger.error("Falha ao sincronizar timestamp após várias tentativas")
-                    return False
-                time.sleep(1)
-                continue
-            else:
-                logger.error(f"Credenciais inválidas: {data['retMsg']}")
-                return False
-        except Exception as e:
-            logger.error(f"Erro ao validar credenciais: {str(e)}")
+        if body is not None:
+            log_payload(logger, "Corpo da requisição", body_params, path=path)
+        if method == "GET":
+            params = sorted(query_params.items()) if query_params else None
+            response = await client.get(path, params=params, headers=headers)
+        else:
+            response = await client.post(path, content=body, headers=headers)
+        bybit_scheduler.observe(limiter_key, endpoint_class, *parse_bybit_limit_headers(response.headers, bybit_clock.now_ms()))
+        response.raise_for_status()
+        data = response.json()
+        if data.get("retCode", 0) != 0:
+            client.record_error(path, data["retCode"])
+        # Limite excedido: o balde já foi bloqueado até o reset informado; tenta novamente uma vez
+        if data.get("retCode") == 10006 and attempt == 0:
+            logger.warning("Limite de requisições excedido em %s; aguardando o reset", path)
+            continue
+        # Credenciais rejeitadas: deixam de ser consideradas válidas
+        if data.get("retCode") in AUTH_ERROR_CODES:
+            credential_cache.invalidate(api_key, api_secret)
+        # Timestamp fora da janela: ressincroniza o relógio e tenta novamente uma vez
+        if data.get("retCode") == 10002 and attempt == 0:
+            logger.warning("Timestamp dessincronizado em %s: req_timestamp[%s], server_timestamp[%s]", path, timestamp, data.get("time"))
+            await bybit_clock.sync()
+            continue
+        return data
+    return data
+
+# Função para validar as credenciais na Bybit
+async def validate_bybit_credentials(api_key: str, api_secret: str, use_cache: bool = True) -> bool:
+    if use_cache and credential_cache.is_valid(api_key, api_secret):
+        return True
+    try:
+        data = await bybit_signed_request("GET", "/v5/user/query-api", api_key, api_secret)
+        log_payload(logger, "Resposta da validação de credenciais", data)
+        if data["retCode"] == 0:
+            credential_cache.mark_valid(api_key, api_secret)
+            return True
+        elif data["retCode"] == 10002:
+            logger.error("Falha ao sincronizar timestamp com a Bybit")
+            return False
+        else:
+            logger.error("Credenciais inválidas: %s", data["retMsg"])
             return False
+    except Exception as e:
+        logger.error("Erro ao validar credenciais: %s", e)
+        return False
+
+# Função para buscar uma página de instrumentos lineares na Bybit
+async def fetch_instruments_page(cursor: str = None):
+    params = {"category": "linear", "limit": 1000}
+    if cursor:
+        params["cursor"] = cursor
+    await bybit_scheduler.acquire(None, "market")
+    data = await bybit_public_request("/v5/market/instruments-info", params)
+    return data["result"]["list"], data["result"].get("nextPageCursor", "")
+
+# Registro dos instrumentos lineares (filtros de quantidade) mantido em memória
+instrument_registry = InstrumentRegistry(
+    fetch_instruments_page,
+    ttl=float(os.getenv("INSTRUMENTS_REFRESH_INTERVAL", "3600"))
+)
 
 # Função para obter informações do símbolo na Bybit
-def get_symbol_info(symbol: str) -> Dict:
+async def get_symbol_info(symbol: str) -> Dict:
     try:
-        response = requests.get(
-            "https://api-testnet.bybit.com/v5/market/instruments-info",
-            params={"category": "linear", "symbol": symbol}
-        )
-        response.raise_for_status()
-        data = response.json()
-        if data["retCode"] != 0:
-            raise Exception(data["retMsg"])
-        symbol_info = data["result"]["list"][0]
-        return {
-            "minOrderQty": float(symbol_info["lotSizeFilter"]["minOrderQty"]),
-            "maxOrderQty": float(symbol_info["lotSizeFilter"]["maxOrderQty"]),
-            "qtyStep": float(symbol_info["lotSizeFilter"]["qtyStep"])
-        }
+        return await instrument_registry.get(symbol)
+    except KeyError:
+        raise HTTPException(status_code=500, detail=f"Erro ao obter informações do símbolo {symbol}: símbolo não encontrado")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao obter informações do símbolo {symbol}: {str(e)}")
 
+# Função para consultar o preço atual do ativo na API REST da Bybit
+async def fetch_ticker_price(symbol: str) -> float:
+    await bybit_scheduler.acquire(None, "market")
+    data = await bybit_public_request("/v5/market/tickers", {"category": "linear", "symbol": symbol})
+    return float(data["result"]["list"][0]["lastPrice"])
+
+# Cache de preços alimentado pelo WebSocket público (REST apenas para cotações velhas)
+price_feed = TickerPriceFeed(
+    BYBIT_WS_PUBLIC_URL,
+    fetch_ticker_price,
+    max_age=float(os.getenv("PRICE_MAX_AGE", "5"))
+)
+
 # Função para obter o preço atual do ativo na Bybit
-def get_current_price(symbol: str) -> float:
+async def get_current_price(symbol: str) -> float:
     try:
-        response = requests.get(
-            "https://api-testnet.bybit.com/v5/market/tickers",
-            params={"category": "linear", "symbol": symbol}
-        )
-        response.raise_for_status()
-        data = response.json()
-        if data["retCode"] != 0:
-            raise Exception(data["retMsg"])
-        price = float(data["result"]["list"][0]["lastPrice"])
-        return price
+        return await price_feed.get_price(symbol)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao obter preço do ativo {symbol}: {str(e)}")
 
 # Função para verificar o saldo da conta na Bybit
-def check_balance(api_key: str, api_secret: str, amount_in_usd: float) -> bool:
-    timestamp = str(get_bybit_server_time())
-    recv_window = "10000"
+async def check_balance(api_key: str, api_secret: str, amount_in_usd: float) -> bool:
     query_params = {"accountType": "UNIFIED"}
-    signature = generate_bybit_signature(api_key, api_secret, timestamp, recv_window, body=None, query_params=query_params)
-    headers = {
-        "X-BAPI-API-KEY": api_key,
-        "X-BAPI-TIMESTAMP": timestamp,
-        "X-BAPI-RECV-WINDOW": recv_window,
-        "X-BAPI-SIGN": signature,
-        "Content-Type": "application/json"
-    }
-    logger.info(f"Cabeçalhos da requisição (verificação de saldo): {headers}")
     try:
-        response = requests.get(
-            "https://api-testnet.bybit.com/v5/account/wallet-balance",
-            headers=headers,
-            params=query_params
-        )
-        response.raise_for_status()
-        data = response.json()
-        logger.info(f"Resposta da verificação de saldo: {data}")
+        data = await bybit_signed_request("GET", "/v5/account/wallet-balance", api_key, api_secret, query_params=query_params)
+        log_payload(logger, "Resposta da verificação de saldo", data)
         if data["retCode"] != 0:
             error_msg = BYBIT_ERROR_MESSAGES.get(data["retCode"], data["retMsg"])
             raise HTTPException(status_code=500, detail=f"Erro ao verificar saldo: {error_msg} (retCode: {data['retCode']})")
@@ -258,7 +449,7 @@ def check_balance(api_key: str, api_secret: str, amount_in_usd: float) -> bool:
                 if not wallet_balance:
                     raise HTTPException(status_code=400, detail="Saldo da carteira (walletBalance) não disponível para USDT")
                 available_balance = float(wallet_balance)
-                logger.info(f"Saldo disponível em USDT (walletBalance): {available_balance}")
+                logger.debug("Saldo disponível em USDT (walletBalance): %s", available_balance)
                 if available_balance < amount_in_usd:
                     raise HTTPException(
                         status_code=400,
@@ -266,41 +457,27 @@ def check_balance(api_key: str, api_secret: str, amount_in_usd: float) -> bool:
                     )
                 return True
         raise HTTPException(status_code=400, detail="USDT não encontrado na carteira")
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Erro ao verificar saldo: {str(e)}")
+    except httpx.HTTPError as e:
+        logger.error("Erro ao verificar saldo: %s", e)
         raise HTTPException(status_code=500, detail=f"Erro ao verificar saldo: {str(e)}")
 
 # Função para definir a alavancagem na Bybit
-def set_leverage(api_key: str, api_secret: str, symbol: str, leverage: int) -> bool:
-    timestamp = str(get_bybit_server_time())
-    recv_window = "10000"
+async def set_leverage(api_key: str, api_secret: str, symbol: str, leverage: int) -> bool:
+    if leverage_cache.get(api_key, symbol) == leverage:
+        return True
     params = {
         "category": "linear",
         "symbol": symbol,
         "buyLeverage": str(leverage),
         "sellLeverage": str(leverage)
     }
-    body = json.dumps(params, separators=(',', ':'))
-    signature = generate_bybit_signature(api_key, api_secret, timestamp, recv_window, body=body, query_params=None)
-    headers = {
-        "X-BAPI-API-KEY": api_key,
-        "X-BAPI-TIMESTAMP": timestamp,
-        "X-BAPI-RECV-WINDOW": recv_window,
-        "X-BAPI-SIGN": signature,
-        "Content-Type": "application/json"
-    }
-    logger.info(f"Cabeçalhos da requisição (definição de alavancagem): {headers}")
-    logger.info(f"Corpo da requisição (definição de alavancagem): {body}")
     try:
-        response = requests.post(
-            "https://api-testnet.bybit.com/v5/position/set-leverage",
-            headers=headers,
-            data=body
-        )
-        response_data = response.json()
-        logger.info(f"Resposta da definição de alavancagem: {response_data}")
+        response_data = await bybit_signed_request("POST", "/v5/position/set-leverage", api_key, api_secret, body_params=params)
+        log_payload(logger, "Resposta da definição de alavancagem", response_data, symbol=symbol)
         if response_data["retCode"] == 0 or response_data["retCode"] == 110043:
+            leverage_cache.set(api_key, symbol, leverage)
             return True
+        leverage_cache.invalidate(api_key, symbol)
         if (response_data["retCode"] == 10001 and "leverage invalid" in response_data["retMsg"].lower()) or response_data["retCode"] == 130021:
             error_msg = f"Alavancagem inválida ({leverage}x). O valor máximo permitido para {symbol} é geralmente 100x."
             raise HTTPException(
@@ -312,188 +489,973 @@ def set_leverage(api_key: str, api_secret: str, symbol: str, leverage: int) -> b
             status_code=500,
             detail=f"Erro ao definir alavancagem: {error_msg} (retCode: {response_data['retCode']})"
         )
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Erro ao definir alavancagem: {str(e)}")
+    except httpx.HTTPError as e:
+        logger.error("Erro ao definir alavancagem: %s", e)
         raise HTTPException(status_code=500, detail=f"Erro ao definir alavancagem: {str(e)}")
 
+# Função para listar todas as posições lineares (USDT) de uma conta na Bybit
+async def fetch_positions(api_key: str, api_secret: str, symbol: Optional[str] = None) -> List[Dict]:
+    positions = []
+    cursor = None
+    while True:
+        query_params = {"category": "linear", "limit": 200}
+        if symbol:
+            query_params["symbol"] = symbol
+        else:
+            query_params["settleCoin"] = "USDT"
+        if cursor:
+            query_params["cursor"] = cursor
+        data = await bybit_signed_request("GET", "/v5/position/list", api_key, api_secret, query_params=query_params)
+        if data["retCode"] != 0:
+            error_msg = BYBIT_ERROR_MESSAGES.get(data["retCode"], data["retMsg"])
+            raise HTTPException(status_code=500, detail=f"Erro ao consultar posições: {error_msg} (retCode: {data['retCode']})")
+        positions.extend(data["result"]["list"])
+        cursor = data["result"].get("nextPageCursor")
+        if not cursor:
+            return positions
+
+# Função para carregar a alavancagem atual de todas as posições lineares de uma conta
+async def load_account_leverage(api_key: str, api_secret: str) -> int:
+    return leverage_cache.load_positions(api_key, await fetch_positions(api_key, api_secret))
+
+# Função para pré-carregar a alavancagem das contas de todas as carteiras cadastradas
+async def warm_leverage_cache():
+    accounts = {(p["api_key"], p["api_secret"]) for p in portfolios_db.all() if is_bybit_portfolio(p)}
+    for api_key, api_secret in accounts:
+        try:
+            await load_account_leverage(api_key, api_secret)
+        except Exception as e:
+            logger.warning("Não foi possível carregar as posições de uma conta: %s", e)
+    logger.info("Cache de alavancagem carregado: %d posições", len(leverage_cache))
+
+# Guarda o loop do servidor para os adaptadores síncronos
+@app.on_event("startup")
+async def capture_server_loop():
+    global server_loop
+    server_loop = asyncio.get_running_loop()
+
+# Inicia a sincronização periódica do relógio com a Bybit
+@app.on_event("startup")
+async def start_bybit_clock():
+    bybit_clock.start()
+
+# Carrega os instrumentos em lote e agenda a renovação periódica
+@app.on_event("startup")
+async def start_instrument_registry():
+    instrument_registry.start()
+
+# Assina os tickers de todas as criptomoedas do cryptos.json
+@app.on_event("startup")
+async def start_price_feed():
+    try:
+        await price_feed.subscribe(crypto_catalog.current().symbols)
+    except Exception as e:
+        logger.error("Erro ao ler cryptos.json para o stream de preços: %s", e)
+    price_feed.start()
+
+# Carrega em segundo plano a alavancagem atual das contas cadastradas
+@app.on_event("startup")
+async def start_leverage_warmup():
+    asyncio.create_task(warm_leverage_cache())
+
+# Fecha as sessões HTTP com as exchanges ao desligar o servidor
+@app.on_event("shutdown")
+async def shutdown_background_services():
+    await job_workers.stop()
+    job_queue.close()
+    await bybit_clock.stop()
+    await instrument_registry.stop()
+    await price_feed.stop()
+    users_persistence.close()
+    portfolios_persistence.close()
+    await close_exchange_clients()
+    await asyncio.to_thread(exchange_registry.close)
+
+# Métricas das rotas da API, rotuladas pelo caminho declarado (ex.: /signal/{portfolio_id})
+HTTP_REQUEST_DURATION = metrics_registry.histogram("http_request_duration_seconds", "Latência das rotas da API", ("method", "route"))
+HTTP_REQUESTS = metrics_registry.counter("http_requests_total", "Requisições atendidas por rota e status", ("method", "route", "status"))
+HTTP_REQUESTS_IN_FLIGHT = metrics_registry.gauge("http_requests_in_flight", "Requisições em andamento", ("method",))
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(request.method)
+    in_flight.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        in_flight.dec()
+        # Rotas inexistentes ficam agrupadas, para não criar uma série por URL
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_REQUEST_DURATION.labels(request.method, route).observe(time.perf_counter() - started)
+        HTTP_REQUESTS.labels(request.method, route, status).inc()
+
+# Endpoint de métricas no formato de texto do Prometheus
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+# Aplica as alterações feitas por outros processos (backend "shared") antes de atender a requisição
+@app.middleware("http")
+async def sync_shared_state(request: Request, call_next):
+    users_db.sync()
+    portfolios_db.sync()
+    return await call_next(request)
+
+# Endpoint para acompanhar o desvio de relógio em relação à Bybit
+@app.get("/exchange/clock")
+async def get_exchange_clock():
+    return bybit_clock.status()
+
+# Endpoint para acompanhar o stream de preços
+@app.get("/exchange/prices")
+async def get_exchange_prices():
+    return price_feed.status()
+
+# Endpoint para acompanhar os clientes de exchange em uso
+@app.get("/exchange/clients")
+async def get_exchange_clients():
+    return exchange_registry.status()
+
+# Endpoint para acompanhar as filas e os limites de requisições por chave de API
+@app.get("/exchange/rate-limits")
+async def get_exchange_rate_limits():
+    return bybit_scheduler.status()
+
+# Endpoint para acompanhar a fila de logs (registros pendentes e descartados)
+@app.get("/logging/status")
+async def get_logging_status():
+    return logging_status()
+
+# Espera o banco confirmar a gravação do registro (no backend SQL ela é feita em segundo plano);
+# se falhar, o store já desfez a mutação na memória e a requisição recebe o erro
+async def confirm_write(store: IndexedStore, pk):
+    try:
+        await store.confirm(pk)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao gravar no banco: {str(e)}")
+
 # Endpoint para signup (criar conta)
 @app.post("/signup")
 async def signup(request: SignupRequest):
-    global users_db
-    # Valida se o email já existe
-    if any(user["email"] == request.email for user in users_db):
-        raise HTTPException(status_code=400, detail="Email já cadastrado.")
-    
-    # Gera um username e senha para o usuário
-    username = request.email.split('@')[0]
-    password = str(uuid.uuid4())[:8]
-    
-    user = {
-        "id": len(users_db) + 1,
-        "name": request.name,
-        "email": request.email,
-        "phone": request.phone,
-        "username": username,
-        "password": password,
-        "created_at": datetime.now().isoformat()
-    }
-    users_db.append(user)
-    save_users(users_db)
+    # Verificação de unicidade e inserção atômicas (inclusive entre processos)
+    with users_db.transaction():
+        # Valida se o email já existe
+        if users_db.find_one("email", request.email):
+            raise HTTPException(status_code=400, detail="Email já cadastrado.")
+        
+        # Gera um username e senha para o usuário
+        username = request.email.split('@')[0]
+        # Username é único: e-mails com o mesmo prefixo recebem um sufixo numérico
+        base_username = username
+        suffix = 1
+        while users_db.find_one("username", username):
+            suffix += 1
+            username = f"{base_username}{suffix}"
+        password = str(uuid.uuid4())[:8]
+        
+        user = {
+            "id": users_db.next_id(),
+            "name": request.name,
+            "email": request.email,
+            "phone": request.phone,
+            "username": username,
+            "password": password,
+            "created_at": datetime.now().isoformat()
+        }
+        users_db.insert(user)
+    await confirm_write(users_db, user["id"])
     return {"username": username, "password": password, "user_id": user["id"]}
 
 # Endpoint para login
 @app.post("/login")
 async def login(request: LoginRequest):
-    user = next((u for u in users_db if u["username"] == request.username and u["password"] == request.password), None)
+    user = next((u for u in users_db.find("username", request.username) if u["password"] == request.password), None)
     if not user:
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
     return {"user_id": user["id"]}
 
 # Endpoint para buscar as criptomoedas disponíveis
 @app.get("/cryptos")
-async def get_cryptos(timeframe: str = None):
+async def get_cryptos(request: Request, timeframe: str = None):
+    if timeframe not in ["daily", "intraday", None]:
+        raise HTTPException(status_code=400, detail="Parâmetro 'timeframe' inválido. Use 'daily' ou 'intraday'.")
     try:
-        with open("cryptos.json", "r") as file:
-            cryptos_data = json.load(file)
-        
-        if timeframe not in ["daily", "intraday", None]:
-            raise HTTPException(status_code=400, detail="Parâmetro 'timeframe' inválido. Use 'daily' ou 'intraday'.")
-        
-        # Se não for especificado um timeframe, retorna todas as criptomoedas (união das listas)
-        if timeframe is None:
-            daily_cryptos = cryptos_data["daily"]
-            intraday_cryptos = cryptos_data["intraday"]
-            # União das listas, evitando duplicatas com base no 'code'
-            all_cryptos_dict = {crypto["code"]: crypto for crypto in daily_cryptos}
-            for crypto in intraday_cryptos:
-                all_cryptos_dict[crypto["code"]] = crypto
-            return list(all_cryptos_dict.values())
-        
-        # Retorna a lista correspondente ao timeframe
-        return cryptos_data[timeframe]
+        catalog = crypto_catalog.current()
     except FileNotFoundError:
         raise HTTPException(status_code=500, detail="Arquivo cryptos.json não encontrado")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao ler cryptos.json: {str(e)}")
+    # Sem timeframe, retorna a união das listas (sem duplicatas por 'code'), já serializada
+    body, etag = catalog.responses[timeframe or "all"]
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 # Endpoint para buscar as carteiras de um usuário
 @app.get("/portfolios/{user_id}")
 async def get_portfolios(user_id: int):
-    user_portfolios = [p for p in portfolios_db if p["user_id"] == user_id]
+    user_portfolios = portfolios_db.find("user_id", user_id)
     return user_portfolios
 
 # Endpoint para criar uma nova carteira
 @app.post("/portfolios/{user_id}")
 async def create_portfolio(user_id: int, portfolio: Portfolio):
-    global portfolios_db
     portfolio_dict = portfolio.dict()
     portfolio_dict["user_id"] = user_id
     portfolio_dict["created_at"] = datetime.now().isoformat()
-    if not validate_bybit_credentials(portfolio_dict["api_key"], portfolio_dict["api_secret"]):
+    # Carteiras simuladas ("Paper") não enviam ordens à exchange: as credenciais só identificam a conta
+    if not is_paper_portfolio(portfolio_dict) and not await validate_bybit_credentials(portfolio_dict["api_key"], portfolio_dict["api_secret"], use_cache=False):
         raise HTTPException(status_code=400, detail="Credenciais da Bybit inválidas")
-    portfolios_db.append(portfolio_dict)
-    save_portfolios(portfolios_db)
+    with portfolios_db.transaction():
+        if portfolio_dict["id"] in portfolios_db:
+            raise HTTPException(status_code=400, detail="Já existe uma carteira com este id")
+        portfolios_db.insert(portfolio_dict)
+    await confirm_write(portfolios_db, portfolio_dict["id"])
     return {"portfolio_id": portfolio_dict["id"]}
 
 # Endpoint para excluir uma carteira
 @app.delete("/portfolios/{portfolio_id}")
 async def delete_portfolio(portfolio_id: int):
-    global portfolios_db
-    portfolio = next((p for p in portfolios_db if p["id"] == portfolio_id), None)
-    if not portfolio:
-        raise HTTPException(status_code=404, detail="Carteira não encontrada")
-    portfolios_db = [p for p in portfolios_db if p["id"] != portfolio_id]
-    save_portfolios(portfolios_db)
+    with portfolios_db.transaction():
+        if portfolio_id not in portfolios_db:
+            raise HTTPException(status_code=404, detail="Carteira não encontrada")
+        portfolios_db.delete(portfolio_id)
+    await confirm_write(portfolios_db, portfolio_id)
     return {"message": "Carteira excluída com sucesso"}
 
 # Endpoint para atualizar uma carteira existente
 @app.put("/portfolios/{portfolio_id}")
 async def update_portfolio(portfolio_id: int, portfolio: Portfolio):
-    global portfolios_db
-    existing_portfolio = next((p for p in portfolios_db if p["id"] == portfolio_id), None)
+    existing_portfolio = portfolios_db.get(portfolio_id)
     if not existing_portfolio:
         raise HTTPException(status_code=404, detail="Carteira não encontrada")
     portfolio_dict = portfolio.dict()
     portfolio_dict["user_id"] = existing_portfolio["user_id"]
     portfolio_dict["created_at"] = existing_portfolio["created_at"]
-    if not validate_bybit_credentials(portfolio_dict["api_key"], portfolio_dict["api_secret"]):
+    # Carteiras simuladas ("Paper") não enviam ordens à exchange: as credenciais só identificam a conta
+    if not is_paper_portfolio(portfolio_dict) and not await validate_bybit_credentials(portfolio_dict["api_key"], portfolio_dict["api_secret"], use_cache=False):
         raise HTTPException(status_code=400, detail="Credenciais da Bybit inválidas")
-    portfolios_db = [p for p in portfolios_db if p["id"] != portfolio_id]
-    portfolios_db.append(portfolio_dict)
-    save_portfolios(portfolios_db)
+    with portfolios_db.transaction():
+        if portfolio_id not in portfolios_db:
+            raise HTTPException(status_code=404, detail="Carteira não encontrada")
+        portfolios_db.update(portfolio_id, portfolio_dict)
+    await confirm_write(portfolios_db, portfolio_id)
     return {"message": "Carteira atualizada com sucesso"}
 
-# Endpoint para enviar um sinal para a Bybit
-@app.post("/signal/{portfolio_id}")
-async def send_signal(portfolio_id: int, signal: SignalRequest):
-    portfolio = next((p for p in portfolios_db if p["id"] == portfolio_id), None)
-    if not portfolio:
-        raise HTTPException(status_code=404, detail="Carteira não encontrada")
-    api_key = portfolio["api_key"]
-    api_secret = portfolio["api_secret"]
-    logger.info(f"Usando credenciais - api_key: {api_key}, api_secret: {api_secret}")
-    if not validate_bybit_credentials(api_key, api_secret):
-        raise HTTPException(status_code=400, detail="Credenciais da Bybit inválidas")
-    check_balance(api_key, api_secret, signal.amount_in_usd)
-    price = get_current_price(signal.symbol)
-    if price <= 0:
-        raise HTTPException(status_code=400, detail="Preço do ativo inválido")
-    symbol_info = get_symbol_info(signal.symbol)
-    min_order_qty = symbol_info["minOrderQty"]
-    max_order_qty = symbol_info["maxOrderQty"]
-    qty_step = symbol_info["qtyStep"]
-    logger.info(f"Informações do símbolo {signal.symbol}: minOrderQty={min_order_qty}, maxOrderQty={max_order_qty}, qtyStep={qty_step}")
-    qty = signal.amount_in_usd / price
-    logger.info(f"Quantidade calculada (antes do ajuste): {qty}")
-    qty = math.floor(qty / qty_step) * qty_step
-    logger.info(f"Quantidade ajustada (múltiplo de qtyStep): {qty}")
-    if qty < min_order_qty:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Quantidade ajustada ({qty}) é menor que a quantidade mínima permitida ({min_order_qty}) para {signal.symbol}"
-        )
-    if qty > max_order_qty:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Quantidade ajustada ({qty}) é maior que a quantidade máxima permitida ({max_order_qty}) para {signal.symbol}"
-        )
-    set_leverage(api_key, api_secret, signal.symbol, signal.leverage)
-    timestamp = str(get_bybit_server_time())
-    recv_window = "10000"
+# Função que calcula a quantidade da ordem a partir do preço e dos filtros do símbolo
+# (devolve a quantidade já formatada com as casas do qtyStep)
+def calculate_order_qty(symbol: str, amount_in_usd: float, price: float, symbol_info: Dict) -> str:
+    qty, status = size_order(amount_in_usd, price, symbol_info)
+    detail = sizing_error_detail(symbol, qty, status, symbol_info)
+    if detail:
+        raise HTTPException(status_code=400, detail=detail)
+    return format_qty(qty, symbol_info["qtyStep"])
+
+# Mensagem de erro correspondente à rejeição do motor de dimensionamento (None se a ordem é válida)
+def sizing_error_detail(symbol: str, qty: float, status: int, symbol_info: Dict) -> Optional[str]:
+    if status == SIZE_INVALID_PRICE:
+        return "Preço do ativo inválido"
+    if status == SIZE_BELOW_MIN:
+        return f"Quantidade ajustada ({qty}) é menor que a quantidade mínima permitida ({symbol_info['minOrderQty']}) para {symbol}"
+    if status == SIZE_ABOVE_MAX:
+        return f"Quantidade ajustada ({qty}) é maior que a quantidade máxima permitida ({symbol_info['maxOrderQty']}) para {symbol}"
+    return None
+
+# Função para enviar a ordem a mercado para a Bybit
+async def place_order(api_key: str, api_secret: str, symbol: str, trend: str, qty: str, order_link_id: Optional[str] = None) -> Dict:
     order_params = {
         "category": "linear",
-        "symbol": signal.symbol,
-        "side": "Buy" if signal.trend == "up" else "Sell",
+        "symbol": symbol,
+        "side": "Buy" if trend == "up" else "Sell",
         "orderType": "Market",
-        "qty": str(qty),
+        "qty": qty,
         "timeInForce": "GTC"
     }
-    body = json.dumps(order_params, separators=(',', ':'))
-    logger.info(f"Corpo da requisição (enviado): {body}")
-    signature = generate_bybit_signature(api_key, api_secret, timestamp, recv_window, body=body, query_params=None)
-    headers = {
-        "X-BAPI-API-KEY": api_key,
-        "X-BAPI-TIMESTAMP": timestamp,
-        "X-BAPI-RECV-WINDOW": recv_window,
-        "X-BAPI-SIGN": signature,
-        "Content-Type": "application/json"
-    }
-    logger.info(f"Cabeçalhos da requisição (criação de ordem): {headers}")
+    if order_link_id:
+        order_params["orderLinkId"] = order_link_id
     try:
-        response = requests.post(
-            "https://api-testnet.bybit.com/v5/order/create",
-            headers=headers,
-            data=body
-        )
-        response_data = response.json()
-        logger.info(f"Resposta da Bybit: {response_data}")
+        response_data = await bybit_signed_request("POST", "/v5/order/create", api_key, api_secret, body_params=order_params)
+        log_payload(logger, "Resposta da Bybit", response_data, symbol=symbol, order_link_id=order_link_id)
+        if response_data["retCode"] == 110072 and order_link_id:
+            # orderLinkId já usado: a ordem foi aceita em uma tentativa anterior
+            existing = await find_order_by_link_id(api_key, api_secret, symbol, order_link_id)
+            if existing:
+                return {"retCode": 0, "retMsg": "OK", "result": {"orderId": existing.get("orderId"), "orderLinkId": order_link_id}}
         if response_data["retCode"] != 0:
+            # Ordem rejeitada: a alavancagem conhecida deixa de ser confiável
+            leverage_cache.invalidate(api_key, symbol)
             error_msg = BYBIT_ERROR_MESSAGES.get(response_data["retCode"], response_data["retMsg"])
             raise HTTPException(
                 status_code=500,
                 detail=f"Erro na API da Bybit: {error_msg} (retCode: {response_data['retCode']})"
             )
-        return {"message": "Ordem enviada com sucesso", "bybit_response": response_data}
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Erro ao enviar ordem para a Bybit: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erro ao enviar ordem para a Bybit: {str(e)}")
\ No newline at end of file
+        return response_data
+    except httpx.HTTPError as e:
+        leverage_cache.invalidate(api_key, symbol)
+        logger.error("Erro ao enviar ordem para a Bybit: %s", e, extra={"symbol": symbol})
+        raise HTTPException(status_code=500, detail=f"Erro ao enviar ordem para a Bybit: {str(e)}")
+
+# Função para localizar uma ordem pelo orderLinkId (ordens abertas e recentes; depois o histórico)
+async def find_order_by_link_id(api_key: str, api_secret: str, symbol: str, order_link_id: str) -> Optional[Dict]:
+    query_params = {"category": "linear", "symbol": symbol, "orderLinkId": order_link_id}
+    for path in ("/v5/order/realtime", "/v5/order/history"):
+        data = await bybit_signed_request("GET", path, api_key, api_secret, query_params=query_params)
+        if data["retCode"] != 0:
+            error_msg = BYBIT_ERROR_MESSAGES.get(data["retCode"], data["retMsg"])
+            raise HTTPException(status_code=500, detail=f"Erro na API da Bybit: {error_msg} (retCode: {data['retCode']})")
+        orders = data["result"].get("list", [])
+        if orders:
+            return orders[0]
+    return None
+
+# Latência por etapa do envio de ordem ("total" = do início do fluxo até a resposta da ordem)
+signal_metrics = StageMetrics("signal")
+
+# Função que executa o fluxo completo de envio de ordem para uma carteira.
+# As etapas independentes (credenciais, saldo, preço, símbolo, alavancagem) rodam em paralelo;
+# a ordem é enviada assim que as etapas de que depende terminam.
+# Se a quantidade já foi calculada (broadcast), as etapas de preço, símbolo e quantidade são omitidas.
+async def execute_signal(portfolio: Dict, symbol: str, trend: str, amount_in_usd: float, leverage: int, qty: Optional[str] = None, order_link_id: Optional[str] = None) -> Dict:
+    if not is_bybit_portfolio(portfolio):
+        return await execute_adapter_signal(portfolio, symbol, trend, amount_in_usd, leverage, order_link_id)
+    api_key = portfolio["api_key"]
+    api_secret = portfolio["api_secret"]
+
+    async def credentials_stage():
+        if not await validate_bybit_credentials(api_key, api_secret):
+            raise HTTPException(status_code=400, detail="Credenciais da Bybit inválidas")
+
+    async def balance_stage():
+        await check_balance(api_key, api_secret, amount_in_usd)
+
+    async def price_stage():
+        return await get_current_price(symbol)
+
+    async def instrument_stage():
+        return await get_symbol_info(symbol)
+
+    async def leverage_stage():
+        await set_leverage(api_key, api_secret, symbol, leverage)
+
+    async def quantity_stage(price, instrument):
+        return calculate_order_qty(symbol, amount_in_usd, price, instrument)
+
+    async def precomputed_quantity_stage():
+        return qty
+
+    async def order_stage(credentials, balance, leverage, quantity):
+        return await place_order(api_key, api_secret, symbol, trend, quantity, order_link_id)
+
+    pipeline = (
+        StagePipeline(signal_metrics)
+        .add("credentials", credentials_stage)
+        .add("balance", balance_stage)
+        .add("leverage", leverage_stage)
+    )
+    if qty is None:
+        pipeline.add("price", price_stage).add("instrument", instrument_stage)
+        pipeline.add("quantity", quantity_stage, depends_on=("price", "instrument"))
+    else:
+        pipeline.add("quantity", precomputed_quantity_stage)
+    pipeline.add("order", order_stage, depends_on=("credentials", "balance", "leverage", "quantity"))
+    results = await pipeline.run()
+    return {"message": "Ordem enviada com sucesso", "bybit_response": results["order"], "timings": pipeline.timings}
+
+def is_bybit_portfolio(portfolio: Dict) -> bool:
+    return (portfolio.get("exchange") or "Bybit").lower() == "bybit"
+
+# Adaptador da exchange da carteira (Portfolio.exchange), reaproveitado entre chamadas com as mesmas credenciais
+def portfolio_adapter(portfolio: Dict):
+    try:
+        return exchange_registry.get(portfolio.get("exchange"), portfolio["api_key"], portfolio["api_secret"], testnet=EXCHANGE_TESTNET)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Ordem já enviada com o orderLinkId informado, pela consulta da própria exchange da carteira
+async def find_portfolio_order(portfolio: Dict, symbol: str, order_link_id: str) -> Optional[Dict]:
+    if is_bybit_portfolio(portfolio):
+        return await find_order_by_link_id(portfolio["api_key"], portfolio["api_secret"], symbol, order_link_id)
+    return await asyncio.to_thread(lambda: portfolio_adapter(portfolio).find_order(symbol, order_link_id))
+
+# Função que executa o envio de ordem pelo adaptador da exchange da carteira (Portfolio.exchange),
+# reaproveitando o cliente já criado para as mesmas credenciais
+async def execute_adapter_signal(portfolio: Dict, symbol: str, trend: str, amount_in_usd: float, leverage: int, order_link_id: Optional[str] = None) -> Dict:
+    exchange = portfolio.get("exchange")
+    started_at = time.perf_counter()
+
+    def run() -> Dict:
+        adapter = portfolio_adapter(portfolio)
+        if adapter.set_leverage(symbol, leverage) is None:
+            raise HTTPException(status_code=500, detail=f"Erro ao definir alavancagem na {exchange}")
+        # O valor em USD é o nocional da ordem, como no fluxo da Bybit
+        qty = adapter.calculate_quantity(symbol, amount_in_usd, 1)
+        if qty is None:
+            raise HTTPException(status_code=400, detail=f"Não foi possível calcular a quantidade da ordem para {symbol}")
+        order = adapter.create_futures_order(order_link_id or uuid.uuid4().hex, symbol, "Buy" if trend == "up" else "Sell", qty)
+        if order is None:
+            raise HTTPException(status_code=500, detail=f"Erro ao enviar ordem para a {exchange}")
+        return order
+
+    with signal_metrics.stage("total"):
+        order = await asyncio.to_thread(run)
+    return {
+        "message": "Ordem enviada com sucesso",
+        "bybit_response": order,
+        "timings": {"total": {"duration_ms": round((time.perf_counter() - started_at) * 1000, 2)}}
+    }
+
+# Endpoint para enviar um sinal a todas as carteiras do tipo informado que possuem o ativo
+# (declarado antes de /signal/{portfolio_id} para que "broadcast" não seja tratado como id)
+@app.post("/signal/broadcast")
+async def broadcast_signal(request: BroadcastRequest):
+    return await broadcast_to_portfolios(request)
+
+# Envia o sinal às carteiras; `order_link_id`, se informado, dá o orderLinkId da ordem de cada
+# carteira (um id determinístico faz a exchange recusar o reenvio do mesmo sinal)
+async def broadcast_to_portfolios(request: BroadcastRequest, order_link_id: Optional[Callable[[Dict], str]] = None) -> Dict:
+    if request.portfolioType not in ["daily", "intraday"]:
+        raise HTTPException(status_code=400, detail="Parâmetro 'portfolioType' inválido. Use 'daily' ou 'intraday'.")
+    # Qualquer valor diferente de "up" viraria venda em todas as carteiras
+    if request.trend not in ["up", "down"]:
+        raise HTTPException(status_code=400, detail="Parâmetro 'trend' inválido. Use 'up' ou 'down'.")
+    targets = []
+    for portfolio in portfolios_db.find("type_symbol", (request.portfolioType, request.symbol)):
+        asset = next((a for a in portfolio["assets"] if a["symbol"] == request.symbol), None)
+        if asset:
+            targets.append((portfolio, asset))
+    semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+    started_at = time.perf_counter()
+
+    # Preço e filtros do símbolo são os mesmos para todas as carteiras da Bybit: busca uma vez e
+    # calcula a quantidade de todas as ordens em uma única passada vetorizada
+    # (carteiras de outras exchanges calculam a quantidade no próprio adaptador)
+    quantities = [None] * len(targets)
+    rejections = [None] * len(targets)
+    bybit_targets = [i for i, (portfolio, _) in enumerate(targets) if is_bybit_portfolio(portfolio)]
+    if bybit_targets:
+        price, instrument = await asyncio.gather(get_current_price(request.symbol), get_symbol_info(request.symbol))
+        sizing = size_orders(
+            [targets[i][1]["amount_in_usd"] for i in bybit_targets], np.full(len(bybit_targets), price),
+            instrument["qtyStep"], instrument["minOrderQty"], instrument["maxOrderQty"]
+        )
+        decimals = step_decimals(instrument["qtyStep"])
+        for position, i in enumerate(bybit_targets):
+            status = int(sizing.status[position])
+            if status == SIZE_OK:
+                quantities[i] = f"{sizing.qty[position]:.{decimals}f}"
+            else:
+                rejections[i] = sizing_error_detail(request.symbol, float(sizing.qty[position]), status, instrument)
+
+    async def run(portfolio: Dict, asset: Dict, qty: Optional[str], rejection: Optional[str]) -> Dict:
+        if rejection is not None:
+            return {"portfolio_id": portfolio["id"], "status": "error", "detail": rejection,
+                    "started_ms": 0.0, "finished_ms": 0.0, "elapsed_ms": 0.0}
+        async with semaphore:
+            start = time.perf_counter()
+            result = {"portfolio_id": portfolio["id"]}
+            try:
+                response = await execute_signal(
+                    portfolio, request.symbol, request.trend, asset["amount_in_usd"], asset["leverage"], qty=qty,
+                    order_link_id=order_link_id(portfolio) if order_link_id else None
+                )
+                result["status"] = "ok"
+                result["bybit_response"] = response["bybit_response"]
+                result["timings"] = response["timings"]
+            except HTTPException as e:
+                result["status"] = "error"
+                result["detail"] = e.detail
+            except Exception as e:
+                logger.error("Erro inesperado no broadcast para a carteira %s: %s", portfolio["id"], e)
+                result["status"] = "error"
+                result["detail"] = str(e)
+            end = time.perf_counter()
+            result["started_ms"] = round((start - started_at) * 1000, 2)
+            result["finished_ms"] = round((end - started_at) * 1000, 2)
+            result["elapsed_ms"] = round((end - start) * 1000, 2)
+            return result
+
+    results = await asyncio.gather(*(
+        run(portfolio, asset, qty, rejection)
+        for (portfolio, asset), qty, rejection in zip(targets, quantities, rejections)
+    ))
+    fills = [r["finished_ms"] for r in results if r["status"] == "ok"]
+    return {
+        "symbol": request.symbol,
+        "trend": request.trend,
+        "portfolioType": request.portfolioType,
+        "total": len(results),
+        "succeeded": len(fills),
+        "failed": len(results) - len(fills),
+        "elapsed_ms": round((time.perf_counter() - started_at) * 1000, 2),
+        "fill_spread_ms": round(max(fills) - min(fills), 2) if fills else 0.0,
+        "results": results
+    }
+
+# Função para enviar ordens em lote (/v5/order/create-batch), em blocos do tamanho máximo permitido.
+# Devolve, na mesma ordem das ordens enviadas, o resultado de cada uma.
+async def place_batch_orders(api_key: str, api_secret: str, orders: List[Dict]) -> List[Dict]:
+    chunks = [orders[i:i + BYBIT_BATCH_ORDER_LIMIT] for i in range(0, len(orders), BYBIT_BATCH_ORDER_LIMIT)]
+
+    async def submit(chunk: List[Dict]) -> List[Dict]:
+        try:
+            data = await bybit_signed_request(
+                "POST", "/v5/order/create-batch", api_key, api_secret,
+                body_params={"category": "linear", "request": chunk}
+            )
+        except httpx.HTTPError as e:
+            logger.error("Erro ao enviar lote de ordens para a Bybit: %s", e)
+            return [{"status": "error", "detail": f"Erro ao enviar ordem para a Bybit: {str(e)}"} for _ in chunk]
+        log_payload(logger, "Resposta da Bybit (lote)", data, orders=len(chunk))
+        if data["retCode"] != 0:
+            error_msg = BYBIT_ERROR_MESSAGES.get(data["retCode"], data["retMsg"])
+            detail = f"Erro na API da Bybit: {error_msg} (retCode: {data['retCode']})"
+            return [{"status": "error", "detail": detail} for _ in chunk]
+        created = data["result"]["list"]
+        statuses = data.get("retExtInfo", {}).get("list", [])
+        results = []
+        for i, order in enumerate(chunk):
+            status = statuses[i] if i < len(statuses) else {"code": 0, "msg": "OK"}
+            if status["code"] == 0:
+                results.append({"status": "ok", "orderId": created[i].get("orderId"), "orderLinkId": created[i].get("orderLinkId")})
+            else:
+                leverage_cache.invalidate(api_key, order["symbol"])
+                error_msg = BYBIT_ERROR_MESSAGES.get(status["code"], status["msg"])
+                results.append({"status": "error", "detail": f"Erro na API da Bybit: {error_msg} (retCode: {status['code']})"})
+        return results
+
+    chunk_results = await asyncio.gather(*(submit(chunk) for chunk in chunks))
+    return [result for results in chunk_results for result in results]
+
+# Fração da posição de um símbolo na conta que pertence à carteira: carteiras da Bybit com a mesma
+# chave e o mesmo ativo dividem a posição na proporção dos valores alocados
+def position_share(portfolio: Dict, asset: Dict) -> float:
+    allocated = 0.0
+    for other in portfolios_db.find("key_symbol", (portfolio["api_key"], asset["symbol"])):
+        if is_bybit_portfolio(other):
+            allocated += sum(a["amount_in_usd"] for a in other["assets"] if a["symbol"] == asset["symbol"])
+    return asset["amount_in_usd"] / allocated if allocated > 0 else 1.0
+
+# Endpoint para rebalancear todos os ativos de uma carteira de uma vez.
+# Para cada ativo, consulta preço, filtros e a posição do símbolo e define a alavancagem; calcula a
+# quantidade alvo (long para "up", short para "down") ao preço de marcação, desconta a parte da
+# posição atual que cabe à carteira e envia as diferenças em ordens em lote. A falha de um ativo
+# fica no resultado dele (como no broadcast) e não impede os demais.
+@app.post("/portfolios/{portfolio_id}/rebalance")
+async def rebalance_portfolio(portfolio_id: int, request: RebalanceRequest):
+    portfolio = portfolios_db.get(portfolio_id)
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Carteira não encontrada")
+    if request.trend not in ["up", "down"]:
+        raise HTTPException(status_code=400, detail="Parâmetro 'trend' inválido. Use 'up' ou 'down'.")
+    if not is_bybit_portfolio(portfolio):
+        raise HTTPException(status_code=400, detail="Rebalanceamento em lote disponível apenas para carteiras da Bybit")
+    api_key = portfolio["api_key"]
+    api_secret = portfolio["api_secret"]
+    assets = portfolio["assets"]
+    if not await validate_bybit_credentials(api_key, api_secret):
+        raise HTTPException(status_code=400, detail="Credenciais da Bybit inválidas")
+
+    # Preço de marcação, filtros e posição atual (líquida: Buy positivo, Sell negativo) de um ativo
+    async def load(asset: Dict) -> Dict:
+        symbol = asset["symbol"]
+        price, instrument, positions, _ = await asyncio.gather(
+            get_current_price(symbol),
+            get_symbol_info(symbol),
+            fetch_positions(api_key, api_secret, symbol),
+            set_leverage(api_key, api_secret, symbol, asset["leverage"])
+        )
+        size = 0.0
+        for position in positions:
+            mark = float(position.get("markPrice") or 0)
+            if mark > 0:
+                price = mark
+            if position.get("side") == "Buy":
+                size += float(position.get("size") or 0)
+            elif position.get("side") == "Sell":
+                size -= float(position.get("size") or 0)
+        return {"price": price, "instrument": instrument, "current_qty": size * position_share(portfolio, asset)}
+
+    loaded = await asyncio.gather(*(load(asset) for asset in assets), return_exceptions=True)
+    legs = [{"symbol": asset["symbol"]} for asset in assets]
+    ready = []
+    for leg, asset, result in zip(legs, assets, loaded):
+        if isinstance(result, Exception):
+            leg["status"] = "error"
+            leg["detail"] = result.detail if isinstance(result, HTTPException) else str(result)
+            if not isinstance(result, HTTPException):
+                logger.error("Erro inesperado no rebalanceamento de %s (carteira %s): %s", asset["symbol"], portfolio_id, result)
+        else:
+            ready.append((leg, asset, result))
+
+    # Alvo e diferença de todos os ativos calculados de uma vez pelo motor de dimensionamento,
+    # ambos em quantidade ao preço de marcação
+    orders = []
+    if ready:
+        direction = 1 if request.trend == "up" else -1
+        prices = np.array([data["price"] for _, _, data in ready], dtype=np.float64)
+        instruments = [data["instrument"] for _, _, data in ready]
+        qty_steps = np.array([info["qtyStep"] for info in instruments], dtype=np.float64)
+        targets = size_orders([asset["amount_in_usd"] for _, asset, _ in ready], prices, qty_steps, 0.0, np.inf)
+        target_qtys = direction * targets.qty
+        current_qtys = np.array([data["current_qty"] for _, _, data in ready], dtype=np.float64)
+        deltas = size_orders(
+            np.abs(target_qtys - current_qtys) * prices, prices, qty_steps,
+            [info["minOrderQty"] for info in instruments], [info["maxOrderQty"] for info in instruments]
+        )
+        for i, (leg, asset, data) in enumerate(ready):
+            symbol = asset["symbol"]
+            target_qty = float(target_qtys[i]) + 0.0
+            current_qty = float(current_qtys[i])
+            order_qty = float(deltas.qty[i])
+            leg.update({"price": float(prices[i]), "target_qty": target_qty, "current_qty": current_qty, "order_qty": order_qty})
+            if targets.status[i] == SIZE_INVALID_PRICE:
+                leg["status"] = "error"
+                leg["detail"] = "Preço do ativo inválido"
+                continue
+            if deltas.status[i] == SIZE_BELOW_MIN:
+                leg["status"] = "skipped"
+                leg["detail"] = "Posição já está no alvo (diferença menor que a quantidade mínima)"
+                continue
+            if deltas.status[i] == SIZE_ABOVE_MAX:
+                leg["status"] = "error"
+                leg["detail"] = f"Quantidade ajustada ({order_qty}) é maior que a quantidade máxima permitida ({instruments[i]['maxOrderQty']}) para {symbol}"
+                continue
+            leg["side"] = "Buy" if target_qty > current_qty else "Sell"
+            orders.append((leg, {
+                "symbol": symbol,
+                "side": leg["side"],
+                "orderType": "Market",
+                "qty": f"{order_qty:.{deltas.decimals[i]}f}",
+                "timeInForce": "GTC",
+                "orderLinkId": f"rb-{portfolio_id}-{uuid.uuid4().hex[:20]}"
+            }))
+
+    results = await place_batch_orders(api_key, api_secret, [order for _, order in orders]) if orders else []
+    for (leg, _), result in zip(orders, results):
+        leg.update(result)
+    return {
+        "portfolio_id": portfolio_id,
+        "trend": request.trend,
+        "batches": math.ceil(len(orders) / BYBIT_BATCH_ORDER_LIMIT),
+        "legs": legs
+    }
+
+# Endpoint para enviar um sinal para a Bybit
+@app.post("/signal/{portfolio_id}")
+async def send_signal(portfolio_id: int, signal: SignalRequest):
+    portfolio = portfolios_db.get(portfolio_id)
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Carteira não encontrada")
+    if signal.trend not in ["up", "down"]:
+        raise HTTPException(status_code=400, detail="Parâmetro 'trend' inválido. Use 'up' ou 'down'.")
+    return await execute_signal(portfolio, signal.symbol, signal.trend, signal.amount_in_usd, signal.leverage)
+
+# Executa um job de sinal. O orderLinkId é fixado quando o job é criado, então uma nova tentativa
+# (ou a retomada após uma queda) nunca gera uma segunda ordem: antes de reenviar, procura a ordem
+# já aceita (na exchange da carteira); e, se a exchange recusar o id como duplicado, usa a ordem existente.
+async def run_signal_job(job: Dict) -> Dict:
+    payload = job["payload"]
+    portfolios_db.sync()
+    portfolio = portfolios_db.get(payload["portfolio_id"])
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Carteira não encontrada")
+    if job["attempts"] > 1:
+        existing = await find_portfolio_order(portfolio, payload["symbol"], payload["order_link_id"])
+        if existing:
+            logger.info("Job %s: ordem %s já havia sido aceita; não será reenviada", job["id"], payload["order_link_id"])
+            return {
+                "message": "Ordem enviada com sucesso",
+                "bybit_response": {"retCode": 0, "retMsg": "OK", "result": {"orderId": existing.get("orderId"), "orderLinkId": payload["order_link_id"]}}
+            }
+    response = await execute_signal(
+        portfolio, payload["symbol"], payload["trend"], payload["amount_in_usd"], payload["leverage"],
+        order_link_id=payload["order_link_id"]
+    )
+    return {"message": response["message"], "bybit_response": response["bybit_response"], "timings": response["timings"]}
+
+# Falhas transitórias (rede ou erro da exchange) voltam para a fila; erros de validação encerram o job
+def is_retryable_job_error(error: Exception) -> bool:
+    if isinstance(error, HTTPException):
+        return error.status_code >= 500
+    return isinstance(error, httpx.HTTPError)
+
+job_queue = JobQueue(JOB_QUEUE_PATH)
+job_workers = JobWorkerPool(
+    job_queue,
+    {"signal": run_signal_job},
+    workers=JOB_WORKERS,
+    max_attempts=JOB_MAX_ATTEMPTS,
+    retry_delay=JOB_RETRY_DELAY,
+    retryable=is_retryable_job_error,
+    lease=JOB_LEASE
+)
+
+# Inicia os workers da fila de ordens, retomando os jobs pendentes e os de processos que caíram
+@app.on_event("startup")
+async def start_job_workers():
+    job_workers.start()
+
+# Endpoint para enviar um sinal de forma assíncrona: o job é gravado na fila durável
+# e a resposta (202) sai imediatamente; o resultado é consultado em /jobs/{job_id}
+@app.post("/signal/{portfolio_id}/jobs", status_code=202)
+async def enqueue_signal(portfolio_id: int, signal: SignalRequest):
+    if not portfolios_db.get(portfolio_id):
+        raise HTTPException(status_code=404, detail="Carteira não encontrada")
+    if signal.trend not in ["up", "down"]:
+        raise HTTPException(status_code=400, detail="Parâmetro 'trend' inválido. Use 'up' ou 'down'.")
+    job_id = uuid.uuid4().hex
+    payload = {
+        "portfolio_id": portfolio_id,
+        "symbol": signal.symbol,
+        "trend": signal.trend,
+        "amount_in_usd": signal.amount_in_usd,
+        "leverage": signal.leverage,
+        "order_link_id": f"sg-{portfolio_id}-{job_id[:20]}"
+    }
+    job = await job_workers.submit("signal", payload, job_id=job_id)
+    return {"job_id": job["id"], "status": job["status"], "order_link_id": payload["order_link_id"]}
+
+# Endpoint para consultar a situação de um job
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+# Função para buscar os tickers de todos os contratos lineares em uma única chamada
+async def fetch_all_tickers() -> List[Dict]:
+    await bybit_scheduler.acquire(None, "market")
+    data = await bybit_public_request("/v5/market/tickers", {"category": "linear"})
+    return data["result"]["list"]
+
+# Função para buscar uma página de candles de um símbolo entre dois instantes (ms), do mais novo para o mais antigo
+async def fetch_klines(symbol: str, interval: str, start_ms: int, end_ms: int) -> List[List]:
+    await bybit_scheduler.acquire(None, "market")
+    data = await bybit_public_request(
+        "/v5/market/kline",
+        {"category": "linear", "symbol": symbol, "interval": interval, "start": start_ms, "end": end_ms, "limit": 1000}
+    )
+    return data["result"]["list"]
+
+# Função para buscar os candles de 1h de um símbolo entre dois instantes (ms)
+async def fetch_hourly_klines(symbol: str, start_ms: int, end_ms: int) -> List[List]:
+    return await fetch_klines(symbol, "60", start_ms, end_ms)
+
+# Processo líder entre os workers (ordens automáticas e avaliação agendada)
+leader_lock = LeaderLock(LEADER_LOCK_PATH)
+
+# Lado das posições pelo sinal: a tendência atual de cada símbolo no timeframe da carteira
+def current_position_sides() -> Dict:
+    return {
+        (timeframe, symbol): SIDE_LONG if info["trend"] == "up" else SIDE_SHORT
+        for timeframe in TREND_INTERVALS
+        for symbol, info in trend_monitor.trends(timeframe).items()
+        if info["trend"]
+    }
+
+# Job diário que grava o valor de todas as carteiras em PortfolioPerformance (agendado só no processo líder)
+valuation_job = ValuationJob(
+    portfolios_db.all,
+    fetch_all_tickers,
+    fetch_hourly_klines,
+    ZoneInfo(VALUATION_TIMEZONE),
+    hour=VALUATION_HOUR,
+    backfill_days=VALUATION_BACKFILL_DAYS,
+    load_sides=current_position_sides,
+    is_owner=lambda: leader_lock.is_leader()
+)
+
+# Reconstrói os dias perdidos e agenda a avaliação diária. Nos backends JSON o banco só guarda os
+# snapshots da avaliação, então só é criado quando ela está ligada (no "sql" já foi criado acima)
+@app.on_event("startup")
+async def start_valuation_job():
+    if not VALUATION_ENABLED:
+        return
+    if STORAGE_BACKEND != "sql":
+        await asyncio.to_thread(init_db)
+    valuation_job.start()
+
+@app.on_event("shutdown")
+async def stop_valuation_job():
+    await valuation_job.stop()
+
+# Endpoint para acompanhar a avaliação diária
+@app.get("/valuation/status")
+async def get_valuation_status():
+    return valuation_job.status()
+
+# Endpoint para avaliar as carteiras em uma data (padrão: a avaliação mais recente), substituindo os snapshots existentes
+@app.post("/valuation/run")
+async def run_valuation(day: Optional[str] = None):
+    try:
+        target = date.fromisoformat(day) if day else valuation_job.latest_day()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Data inválida. Use o formato AAAA-MM-DD.")
+    if target > valuation_job.latest_day():
+        raise HTTPException(status_code=400, detail="A avaliação dessa data ainda não ocorreu")
+    return {"snapshots": await valuation_job.run([target])}
+
+# Endpoint para reconstruir os dias sem snapshot entre as últimas `days` avaliações
+@app.post("/valuation/backfill")
+async def backfill_valuation(days: Optional[int] = None):
+    if days is not None and days < 1:
+        raise HTTPException(status_code=400, detail="'days' deve ser maior que zero")
+    return {"snapshots": await valuation_job.backfill(days)}
+
+# Símbolos de uma lista do cryptos.json ("daily" ou "intraday")
+def catalog_symbols(timeframe: str) -> List[str]:
+    return [crypto["code"] for crypto in crypto_catalog.current().lists[timeframe]]
+
+# orderLinkId da ordem de uma virada de tendência: o mesmo para a mesma carteira, símbolo, candle e
+# sentido, então a virada só vira uma ordem mesmo que seja enviada mais de uma vez
+def trend_flip_link_id(portfolio: Dict, timeframe: str, flip) -> str:
+    key = f"{portfolio['id']}:{flip.symbol}:{timeframe}:{flip.ts}:{flip.trend}"
+    return "tf-" + hashlib.sha1(key.encode()).hexdigest()[:32]
+
+# Envia a virada de tendência às carteiras do timeframe que possuem o ativo (TREND_AUTO_BROADCAST).
+# Todos os workers acompanham as tendências, mas só o líder envia as ordens.
+async def broadcast_trend_flip(timeframe: str, flip) -> None:
+    logger.info("Virada de tendência: %s (%s) -> %s em %s", flip.symbol, timeframe, flip.trend, flip.close)
+    if TREND_AUTO_BROADCAST and leader_lock.is_leader():
+        await broadcast_to_portfolios(
+            BroadcastRequest(symbol=flip.symbol, trend=flip.trend, portfolioType=timeframe),
+            order_link_id=lambda portfolio: trend_flip_link_id(portfolio, timeframe, flip)
+        )
+
+# Tendências das listas do cryptos.json, atualizadas com os candles novos de cada sincronização
+ohlcv_store = OhlcvStore(OHLCV_DIR)
+trend_monitor = TrendMonitor(
+    ohlcv_store,
+    {timeframe: (interval, lambda timeframe=timeframe: catalog_symbols(timeframe)) for timeframe, interval in TREND_INTERVALS.items()},
+    on_flip=broadcast_trend_flip,
+    **TREND_ENGINE_OPTIONS
+)
+
+# Candles locais de todos os símbolos do cryptos.json, sincronizados de forma incremental
+kline_sync = KlineSync(
+    ohlcv_store,
+    fetch_klines,
+    lambda: crypto_catalog.current().symbols,
+    intervals=OHLCV_INTERVALS,
+    history_days=OHLCV_HISTORY_DAYS,
+    sync_interval=OHLCV_SYNC_INTERVAL,
+    on_synced=trend_monitor.update
+)
+
+@app.on_event("startup")
+async def start_kline_sync():
+    if OHLCV_ENABLED:
+        kline_sync.start()
+
+@app.on_event("shutdown")
+async def stop_kline_sync():
+    await kline_sync.stop()
+    ohlcv_store.close()
+    leader_lock.release()
+
+# Endpoint para consultar os candles locais de um símbolo (ts em ms; start/end opcionais, inclusive)
+@app.get("/market/klines/{symbol}")
+async def get_klines(symbol: str, interval: str = "D", start: Optional[int] = None, end: Optional[int] = None, limit: Optional[int] = Query(None, ge=1)):
+    if interval not in INTERVAL_MS:
+        raise HTTPException(status_code=400, detail=f"Intervalo inválido. Use um de: {', '.join(INTERVAL_MS)}")
+    if symbol not in crypto_catalog.current().symbols:
+        raise HTTPException(status_code=404, detail="Símbolo não encontrado no cryptos.json")
+    candles = ohlcv_store.range(symbol, interval, start, end)
+    if limit:
+        candles = {column: values[-limit:] for column, values in candles.items()}
+    return {"symbol": symbol, "interval": interval, **{column: values.tolist() for column, values in candles.items()}}
+
+# Endpoint para acompanhar as séries locais e a última sincronização
+@app.get("/market/klines")
+async def get_klines_status():
+    return {"last_sync": kline_sync.last_sync, **ohlcv_store.status()}
+
+# Endpoint para sincronizar os candles imediatamente
+@app.post("/market/klines/sync")
+async def sync_klines():
+    return await kline_sync.sync()
+
+# Endpoint para consultar a tendência atual de cada símbolo de uma lista ("daily" ou "intraday")
+@app.get("/trends/{timeframe}")
+async def get_trends(timeframe: str):
+    if timeframe not in TREND_INTERVALS:
+        raise HTTPException(status_code=400, detail="Parâmetro 'timeframe' inválido. Use 'daily' ou 'intraday'.")
+    return {"timeframe": timeframe, "interval": TREND_INTERVALS[timeframe], "trends": trend_monitor.trends(timeframe)}
+
+# Endpoint para consultar as últimas viradas de tendência e a situação do motor
+@app.get("/trends")
+async def get_trend_flips(limit: int = 50):
+    return {**trend_monitor.status(), "flips": list(trend_monitor.history)[-limit:]}
+
+# Converte uma data ISO ("2024-01-01") em ms (UTC); None se não informada
+def parse_backtest_date(value: Optional[str], name: str) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp() * 1000)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Parâmetro '{name}' inválido. Use o formato AAAA-MM-DD.")
+
+# Endpoint para simular a carteira sobre os candles locais: reproduz as viradas do motor de tendência
+# no intervalo do seu portfolioType, com o dimensionamento do send_signal
+@app.post("/portfolios/{portfolio_id}/backtest")
+async def backtest_portfolio(portfolio_id: int, request: BacktestRequest):
+    portfolio = portfolios_db.get(portfolio_id)
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Carteira não encontrada")
+    start_ms = parse_backtest_date(request.start, "start")
+    end_ms = parse_backtest_date(request.end, "end")
+    interval = TREND_INTERVALS.get(portfolio.get("portfolioType"), TREND_INTERVALS["daily"])
+    symbols = sorted({asset["symbol"] for asset in portfolio["assets"]})
+    # Os símbolos viram nomes de diretório no armazenamento OHLCV: nada fora do padrão chega a ele
+    invalid = [symbol for symbol in symbols if not SYMBOL_PATTERN.fullmatch(symbol)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Símbolos inválidos na carteira: {', '.join(invalid)}")
+    # Traz as séries dos ativos até o último candle fechado (incremental; ativos fora do cryptos.json inclusive)
+    await asyncio.gather(*(kline_sync.sync_series(symbol, interval) for symbol in symbols), return_exceptions=True)
+    symbol_infos = {}
+    for symbol in symbols:
+        try:
+            symbol_infos[symbol] = await instrument_registry.get(symbol)
+        except Exception:
+            pass
+    candles = {symbol: ohlcv_store.range(symbol, interval, start_ms, end_ms) for symbol in symbols}
+    result = await asyncio.to_thread(
+        run_backtest,
+        portfolio["assets"],
+        portfolio["total_amount"],
+        candles,
+        symbol_infos,
+        INTERVAL_MS[interval],
+        PAPER_FEE_RATE if request.fee_rate is None else request.fee_rate,
+        TREND_ENGINE_OPTIONS,
+        request.enter_on_first_trend
+    )
+    return {"portfolio_id": portfolio_id, "interval": interval, **result}
+
+# Endpoint para consultar a conta simulada de uma carteira "Paper" (posições, PnL e últimas ordens)
+@app.get("/portfolios/{portfolio_id}/paper")
+async def get_paper_account(portfolio_id: int):
+    portfolio = portfolios_db.get(portfolio_id)
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Carteira não encontrada")
+    if not is_paper_portfolio(portfolio):
+        raise HTTPException(status_code=400, detail="A carteira não é simulada (exchange 'Paper')")
+    account = paper_ledger.get(credential_fingerprint(portfolio["api_key"], portfolio["api_secret"]))
+    if account is None:
+        return {"positions": {}, "realized_pnl": 0.0, "unrealized_pnl": 0.0, "fees": 0.0, "orders": []}
+    return account.status(lambda symbol: price_feed.latest(symbol, max_age=float("inf")))
+
+# Esvazia a fila de logs por último, depois dos demais hooks de desligamento
+@app.on_event("shutdown")
+async def shutdown_logging():
+    await asyncio.to_thread(stop_logging)
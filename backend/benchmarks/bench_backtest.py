@@ -0,0 +1,57 @@
+# ~/backend/benchmarks/bench_backtest.py
+# Benchmark do backtest de carteiras (services.backtest) sobre candles sintéticos: tempo total
+# (motor de tendência + dimensionamento + PnL/curva de capital) por número de ativos e de anos.
+# Uso (a partir de backend/): python -m benchmarks.bench_backtest [--assets 5,20,50] [--years 5] [--interval D]
+import argparse
+import time
+
+import numpy as np
+
+from services.backtest import run_backtest
+from services.ohlcv_store import INTERVAL_MS
+
+YEAR_MS = 365 * 24 * 3600 * 1000
+SYMBOL_INFO = {"qtyStep": 0.001, "minOrderQty": 0.001, "maxOrderQty": 100000.0}
+
+
+def make_candles(symbols, bars: int, interval_ms: int):
+    rng = np.random.default_rng(11)
+    candles = {}
+    for symbol in symbols:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, bars)))
+        spread = close * rng.uniform(0, 0.02, bars)
+        candles[symbol] = {
+            "ts": np.arange(bars, dtype=np.int64) * interval_ms,
+            "high": close + spread,
+            "low": close - spread,
+            "close": close,
+        }
+    return candles
+
+
+def bench(assets: int, years: float, interval: str):
+    interval_ms = INTERVAL_MS[interval]
+    bars = int(years * YEAR_MS / interval_ms)
+    symbols = [f"SYM{i}USDT" for i in range(assets)]
+    candles = make_candles(symbols, bars, interval_ms)
+    portfolio_assets = [{"symbol": symbol, "amount_in_usd": 1000.0 / assets, "leverage": 1} for symbol in symbols]
+    infos = {symbol: SYMBOL_INFO for symbol in symbols}
+    started = time.perf_counter()
+    result = run_backtest(portfolio_assets, 1000.0, candles, infos, interval_ms)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"{assets:>6} | {interval:>9} | {bars:>7} | {elapsed_ms:9.1f} | {result['trades']:>8} | {result['return_pct']:10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo do backtest de uma carteira (ms)")
+    parser.add_argument("--assets", default="5,20,50")
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--interval", default="D")
+    args = parser.parse_args()
+    print(f"{'ativos':>6} | {'intervalo':>9} | {'candles':>7} | {'tempo':>9} | {'trades':>8} | {'retorno %':>10}")
+    for assets in (int(a) for a in args.assets.split(",")):
+        bench(assets, args.years, args.interval)
+
+
+if __name__ == "__main__":
+    main()
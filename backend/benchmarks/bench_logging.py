@@ -0,0 +1,79 @@
+# ~/backend/benchmarks/bench_logging.py
+# Benchmark do custo de log por ordem no caminho quente: o formato antigo (f-strings em INFO com
+# payload completo, escrita síncrona num arquivo) contra services.log_setup (formatação preguiçosa,
+# payload só em DEBUG/amostrado e escrita numa thread a partir de uma fila).
+# Uso (a partir de backend/): python -m benchmarks.bench_logging [--orders 20000] [--sample-rate 0.01]
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from services.log_setup import configure_logging, stop_logging, log_payload, logging_status
+
+HEADERS = {"X-BAPI-API-KEY": "k" * 18, "X-BAPI-TIMESTAMP": "1700000000000", "X-BAPI-RECV-WINDOW": "10000", "X-BAPI-SIGN": "f" * 64}
+RESPONSE = {
+    "retCode": 0,
+    "retMsg": "OK",
+    "result": {"orderId": "1321003749386327552", "orderLinkId": "job-1-BTCUSDT"},
+    "retExtInfo": {},
+    "time": 1700000000000,
+}
+
+
+# Logs que o envio de uma ordem fazia: string de assinatura, assinatura, cabeçalhos, corpo e resposta
+def legacy_order(logger: logging.Logger, i: int):
+    param_str = f"1700000000000{HEADERS['X-BAPI-API-KEY']}10000{{\"symbol\":\"BTCUSDT\",\"qty\":\"{i}\"}}"
+    logger.info(f"String de assinatura gerada: {param_str}")
+    logger.info(f"Assinatura gerada (X-BAPI-SIGN): {HEADERS['X-BAPI-SIGN']}")
+    logger.info(f"Cabeçalhos da requisição (/v5/order/create): {HEADERS}")
+    logger.info(f"Corpo da requisição (/v5/order/create): {param_str}")
+    logger.info(f"Resposta da Bybit: {RESPONSE}")
+
+
+def structured_order(logger: logging.Logger, i: int):
+    log_payload(logger, "Corpo da requisição", {"symbol": "BTCUSDT", "qty": str(i)}, path="/v5/order/create")
+    log_payload(logger, "Resposta da Bybit", RESPONSE, symbol="BTCUSDT", order_link_id="job-1-BTCUSDT")
+
+
+def bench(orders: int, sample_rate: float):
+    logger = logging.getLogger("bench")
+    with tempfile.TemporaryDirectory() as directory:
+        # Antes: handler síncrono em arquivo, mensagens formatadas na chamada
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        handler = logging.FileHandler(os.path.join(directory, "legacy.log"))
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s:%(name)s:%(message)s"))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        started = time.perf_counter()
+        for i in range(orders):
+            legacy_order(logger, i)
+        legacy_us = (time.perf_counter() - started) * 1e6 / orders
+        root.removeHandler(handler)
+        handler.close()
+
+        # Depois: fila + thread de escrita, payloads amostrados
+        configure_logging("INFO", "json", queue_size=100000, payload_sample_rate=sample_rate)
+        started = time.perf_counter()
+        for i in range(orders):
+            structured_order(logger, i)
+        structured_us = (time.perf_counter() - started) * 1e6 / orders
+        status = logging_status()
+        stop_logging()
+
+    print(f"{'antes (us/ordem)':>16} | {'depois (us/ordem)':>17} | {'amostra':>7} | {'descartados':>11}")
+    print(f"{legacy_us:16.2f} | {structured_us:17.2f} | {sample_rate:7.3f} | {status['dropped']:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo de log por ordem (microssegundos)")
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    args = parser.parse_args()
+    bench(args.orders, args.sample_rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# ~/backend/benchmarks/bench_metrics.py
+# Benchmark das métricas (services.metrics): custo de um incremento/observação no caminho quente,
+# de uma etapa medida com StageMetrics e da renderização de /metrics; confere também que N threads
+# incrementando a mesma série não perdem contagens.
+# Uso (a partir de backend/): python -m benchmarks.bench_metrics [--ops 200000] [--threads 4] [--series 500]
+import argparse
+import threading
+import time
+
+from services.metrics import MetricsRegistry, StageMetrics
+
+
+def per_op_ns(fn, ops: int) -> float:
+    started = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter() - started) * 1e9 / ops
+
+
+def bench(ops: int, threads: int, series: int):
+    metrics = MetricsRegistry()
+    counter = metrics.counter("bench_total", "Contador", ("route",))
+    histogram = metrics.histogram("bench_seconds", "Histograma", ("route",))
+    stages = StageMetrics("bench", metrics)
+    child_counter = counter.labels("/signal")
+    child_histogram = histogram.labels("/signal")
+
+    def stage():
+        with stages.stage("order"):
+            pass
+
+    print(f"{'operação':>24} | {'ns/op':>9}")
+    print(f"{'counter.inc':>24} | {per_op_ns(child_counter.inc, ops):9.0f}")
+    print(f"{'labels().inc':>24} | {per_op_ns(lambda: counter.labels('/signal').inc(), ops):9.0f}")
+    print(f"{'histogram.observe':>24} | {per_op_ns(lambda: child_histogram.observe(0.012), ops):9.0f}")
+    print(f"{'StageMetrics.stage':>24} | {per_op_ns(stage, ops):9.0f}")
+
+    # Várias threads na mesma série: o total tem de ser exato
+    shared = counter.labels("/threads")
+    workers = [threading.Thread(target=lambda: [shared.inc() for _ in range(ops)]) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    print(f"{'threads':>24} | {threads} x {ops} = {int(shared.value())} ({'ok' if shared.value() == threads * ops else 'PERDA'})")
+
+    for i in range(series):
+        histogram.labels(f"/route/{i}").observe(0.001 * i)
+    started = time.perf_counter()
+    text = metrics.render()
+    print(f"{'render':>24} | {series} séries, {len(text.splitlines())} linhas em {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo das métricas (ns por operação)")
+    parser.add_argument("--ops", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--series", type=int, default=500)
+    args = parser.parse_args()
+    bench(args.ops, args.threads, args.series)
+
+
+if __name__ == "__main__":
+    main()
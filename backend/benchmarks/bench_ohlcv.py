@@ -0,0 +1,76 @@
+# ~/backend/benchmarks/bench_ohlcv.py
+# Benchmark das leituras do armazenamento local de candles (services.ohlcv_store): consulta de um
+# intervalo nas colunas memory-mapped contra a leitura do mesmo trecho guardado como JSON
+# (formato das respostas de /v5/market/kline), para séries de N candles.
+# Uso (a partir de backend/): python -m benchmarks.bench_ohlcv [--sizes 10000,100000,1000000] [--window 1000]
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from services.ohlcv_store import COLUMNS, OhlcvSeries
+
+HOUR_MS = 3600 * 1000
+REPEAT = 20
+
+
+def make_columns(size: int):
+    close = 100 + np.cumsum(np.random.normal(0, 1, size))
+    return {
+        "ts": np.arange(size, dtype=np.int64) * HOUR_MS,
+        "open": close,
+        "high": close + 1,
+        "low": close - 1,
+        "close": close,
+        "volume": np.random.uniform(1, 1000, size),
+        "turnover": np.random.uniform(1, 1000, size),
+    }
+
+
+def bench(size: int, window: int):
+    directory = tempfile.mkdtemp(prefix="ohlcv-")
+    columns = make_columns(size)
+    series = OhlcvSeries(os.path.join(directory, "series"))
+    started = time.perf_counter()
+    series.append(columns)
+    write_ms = (time.perf_counter() - started) * 1000
+
+    json_path = os.path.join(directory, "klines.json")
+    with open(json_path, "w") as file:
+        json.dump([[str(columns[name][i]) for name, _ in COLUMNS] for i in range(size)], file)
+
+    start_ms = int(columns["ts"][size - window])
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        # Abre a série do zero a cada consulta, como um processo novo faria
+        candles = OhlcvSeries(os.path.join(directory, "series")).range(start_ms, None)
+        float(candles["close"].mean())
+    mmap_ms = (time.perf_counter() - started) * 1000 / REPEAT
+
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        with open(json_path) as file:
+            rows = [row for row in json.load(file) if int(row[0]) >= start_ms]
+        float(np.array([float(row[4]) for row in rows]).mean())
+    json_ms = (time.perf_counter() - started) * 1000 / REPEAT
+
+    shutil.rmtree(directory)
+    print(f"{size:>9} | {window:>7} | {write_ms:9.1f} | {mmap_ms:9.3f} | {json_ms:9.1f} | {json_ms / mmap_ms:8.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo das consultas de candles locais (ms)")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--window", type=int, default=1000)
+    args = parser.parse_args()
+    print(f"{'candles':>9} | {'janela':>7} | {'gravação':>9} | {'memmap':>9} | {'json':>9} | {'ganho':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        bench(size, min(args.window, size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# ~/backend/benchmarks/bench_store.py
+# Microbenchmark do repositório em memória (IndexedStore).
+# Uso (a partir de backend/): python -m benchmarks.bench_store [--sizes 1000,10000,100000,1000000]
+import argparse
+import random
+import time
+
+from services.store import IndexedStore
+
+LOOKUPS = 20000
+
+
+def make_portfolio(pk: int) -> dict:
+    return {
+        "id": pk,
+        "user_id": pk // 3,
+        "name": f"Carteira {pk}",
+        "portfolioType": "daily" if pk % 2 else "intraday",
+        "assets": [{"symbol": "BTCUSDT" if pk % 5 else "ETHUSDT", "amount_in_usd": 100.0, "leverage": 1}],
+    }
+
+
+def per_op_us(fn, keys) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        fn(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def bench(size: int):
+    records = [make_portfolio(pk) for pk in range(1, size + 1)]
+    store = IndexedStore(records, indexes=("user_id", "portfolioType"))
+    ids = [random.randint(1, size) for _ in range(LOOKUPS)]
+    users = [pk // 3 for pk in ids]
+
+    get_us = per_op_us(store.get, ids)
+    find_us = per_op_us(lambda user_id: store.find("user_id", user_id), users)
+
+    def replace(pk):
+        store.update(pk, make_portfolio(pk))
+    update_us = per_op_us(replace, ids[:5000])
+
+    new_ids = list(range(size + 1, size + 5001))
+    insert_us = per_op_us(lambda pk: store.insert(make_portfolio(pk)), new_ids)
+    delete_us = per_op_us(store.delete, new_ids)
+
+    # Referência: a varredura linear que o app fazia antes do repositório
+    scan_keys = users[:max(1, min(200, 2_000_000 // size))]
+    scan_us = per_op_us(lambda user_id: [p for p in records if p["user_id"] == user_id], scan_keys)
+
+    print(f"{size:>9} | {get_us:8.2f} | {find_us:8.2f} | {insert_us:8.2f} | {update_us:8.2f} | {delete_us:8.2f} | {scan_us:12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência por operação do IndexedStore (µs)")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    args = parser.parse_args()
+    print(f"{'registros':>9} | {'get':>8} | {'find':>8} | {'insert':>8} | {'update':>8} | {'delete':>8} | {'scan (lista)':>12}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        bench(size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# ~/backend/benchmarks/bench_trend.py
+# Benchmark do motor de tendência (services.trend) para N símbolos: custo de um candle novo no
+# caminho incremental (estado O(1) por símbolo) contra recalcular o histórico inteiro a cada candle.
+# Uso (a partir de backend/): python -m benchmarks.bench_trend [--sizes 100,500,1000] [--history 1000] [--bars 50]
+import argparse
+import time
+
+import numpy as np
+
+from services.trend import TrendEngine
+
+HOUR_MS = 3600 * 1000
+
+
+def make_history(symbols, bars: int):
+    rng = np.random.default_rng(7)
+    candles = {}
+    for symbol in symbols:
+        close = 100 + np.cumsum(rng.normal(0, 1, bars))
+        candles[symbol] = {
+            "ts": np.arange(bars, dtype=np.int64) * HOUR_MS,
+            "high": close + rng.uniform(0, 2, bars),
+            "low": close - rng.uniform(0, 2, bars),
+            "close": close,
+        }
+    return candles
+
+
+def bench(size: int, history: int, bars: int):
+    symbols = [f"SYM{i}USDT" for i in range(size)]
+    candles = make_history(symbols, history + bars)
+    warm = {symbol: {name: values[:history] for name, values in columns.items()} for symbol, columns in candles.items()}
+
+    engine = TrendEngine(symbols)
+    started = time.perf_counter()
+    engine.feed(warm)
+    warmup_ms = (time.perf_counter() - started) * 1000
+
+    # Um candle por vez para todos os símbolos (engine.symbols está em ordem, como `symbols`)
+    flips = 0
+    started = time.perf_counter()
+    for bar in range(history, history + bars):
+        ts = np.full(size, bar * HOUR_MS, dtype=np.int64)
+        high = np.array([candles[symbol]["high"][bar] for symbol in engine.symbols])
+        low = np.array([candles[symbol]["low"][bar] for symbol in engine.symbols])
+        close = np.array([candles[symbol]["close"][bar] for symbol in engine.symbols])
+        flips += len(engine.update(ts, high, low, close))
+    incremental_ms = (time.perf_counter() - started) * 1000 / bars
+
+    # Referência: recalcula todo o histórico a cada candle novo (amostra de 3 candles)
+    samples = min(3, bars)
+    started = time.perf_counter()
+    for bar in range(history, history + samples):
+        TrendEngine(symbols).feed({symbol: {name: values[:bar + 1] for name, values in columns.items()} for symbol, columns in candles.items()})
+    recompute_ms = (time.perf_counter() - started) * 1000 / samples
+
+    print(f"{size:>8} | {warmup_ms:9.1f} | {incremental_ms:12.3f} | {recompute_ms:11.1f} | {recompute_ms / incremental_ms:8.0f}x | {flips:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo por candle do motor de tendência (ms)")
+    parser.add_argument("--sizes", default="100,500,1000")
+    parser.add_argument("--history", type=int, default=1000)
+    parser.add_argument("--bars", type=int, default=50)
+    args = parser.parse_args()
+    print(f"{'símbolos':>8} | {'histórico':>9} | {'incremental':>12} | {'recálculo':>11} | {'ganho':>9} | {'viradas':>7}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        bench(size, args.history, args.bars)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# ~/backend/benchmarks/bench_valuation.py
+# Benchmark da avaliação diária (services.valuation) para N carteiras sintéticas em um SQLite temporário:
+# montagem das colunas, avaliação escalar (carteira por carteira) contra a vetorizada e o dia completo
+# (leitura dos snapshots anteriores + avaliação + inserção em lote), no primeiro dia e no seguinte.
+# Uso (a partir de backend/): python -m benchmarks.bench_valuation [--sizes 1000,10000,100000] [--assets 5]
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.database import Base
+from services.valuation import build_book, price_table_from_tickers, value_portfolios, ValuationJob
+
+SYMBOLS = [f"SYM{i}USDT" for i in range(300)]
+
+
+def make_portfolios(size: int, assets: int):
+    return [
+        {
+            "id": portfolio_id,
+            "total_amount": 1000.0,
+            "assets": [{"symbol": symbol, "amount_in_usd": 1000.0 / assets, "leverage": 1} for symbol in random.sample(SYMBOLS, assets)],
+        }
+        for portfolio_id in range(1, size + 1)
+    ]
+
+
+def make_tickers():
+    return [
+        {"symbol": symbol, "lastPrice": str(round(random.uniform(0.1, 100), 4)), "prevPrice24h": str(round(random.uniform(0.1, 100), 4))}
+        for symbol in SYMBOLS
+    ]
+
+
+# Referência: uma carteira por vez, com um dicionário de preços
+def scalar_valuation(portfolios, tickers):
+    prices = {t["symbol"]: (float(t["lastPrice"]), float(t["prevPrice24h"])) for t in tickers}
+    values = []
+    for portfolio in portfolios:
+        value = portfolio["total_amount"]
+        for asset in portfolio["assets"]:
+            last, previous = prices[asset["symbol"]]
+            value += asset["amount_in_usd"] * (last / previous - 1)
+        values.append(value)
+    return values
+
+
+def bench(size: int, assets: int):
+    portfolios = make_portfolios(size, assets)
+    tickers = make_tickers()
+
+    started = time.perf_counter()
+    book = build_book(portfolios)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    scalar = scalar_valuation(portfolios, tickers)
+    scalar_ms = (time.perf_counter() - started) * 1000
+
+    table = price_table_from_tickers(tickers)
+    started = time.perf_counter()
+    values, _ = value_portfolios(book, table, book.initial_values)
+    vector_ms = (time.perf_counter() - started) * 1000
+    divergent = sum(1 for a, b in zip(scalar, values.tolist()) if abs(a - b) > 1e-6)
+
+    directory = tempfile.mkdtemp(prefix="valuation-")
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+    Base.metadata.create_all(bind=engine)
+    job = ValuationJob(lambda: portfolios, None, None, timezone=None, session_factory=sessionmaker(bind=engine))
+    day_ms = []
+    for day in ("2025-03-23", "2025-03-24"):
+        started = time.perf_counter()
+        job._value_day(book, table, day)
+        day_ms.append((time.perf_counter() - started) * 1000)
+    engine.dispose()
+    shutil.rmtree(directory)
+    print(f"{size:>9} | {build_ms:9.1f} | {scalar_ms:9.1f} | {vector_ms:10.1f} | {divergent:>8} | {day_ms[0]:10.1f} | {day_ms[1]:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo da avaliação diária das carteiras (ms)")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--assets", type=int, default=5)
+    args = parser.parse_args()
+    print(f"{'carteiras':>9} | {'colunas':>9} | {'escalar':>9} | {'vetorizado':>10} | {'divergem':>8} | {'1º dia':>10} | {'dia seguinte':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        bench(size, args.assets)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+# ~/backend/benchmarks/fake_bybit.py
+# Servidor local que imita a API v5 da Bybit para testes de carga sem a testnet: horário, validação
+# de chave (query-api), saldo, instrumentos, tickers, klines, posições, alavancagem e criação de ordem
+# (simples e em lote), além do stream público de tickers (ws://.../v5/public/linear, tópicos tickers.<símbolo>).
+# As ordens a mercado são executadas na hora e mudam a posição líquida da chave de API no símbolo;
+# um orderLinkId repetido é recusado (110072) e as ordens são consultáveis em /v5/order/realtime e
+# /v5/order/history. Com lost_order_responses = N, as N próximas ordens são executadas mas respondem
+# HTTP 502 (resposta perdida), para testar a deduplicação das novas tentativas.
+# Qualquer chave/assinatura é aceita. Latência (base + jitter) e taxa de erro (retCode) são injetáveis
+# na linha de comando e alteráveis em execução por POST /fake/config; GET /fake/stats conta as chamadas
+# e GET /fake/orders lista as ordens executadas.
+# Uso (a partir de backend/): python -m benchmarks.fake_bybit [--port 9009] [--latency-ms 20] [--jitter-ms 10] [--error-rate 0.01]
+# e aponte o backend para ele: BYBIT_BASE_URL=http://127.0.0.1:9009 uvicorn app:app
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+import zlib
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+
+DEFAULT_SYMBOLS = ("BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT")
+
+# Parâmetros de injeção (alteráveis por /fake/config)
+config = {
+    "latency_ms": float(os.getenv("FAKE_BYBIT_LATENCY_MS", "0")),
+    "jitter_ms": float(os.getenv("FAKE_BYBIT_JITTER_MS", "0")),
+    "error_rate": float(os.getenv("FAKE_BYBIT_ERROR_RATE", "0")),
+    "error_code": int(os.getenv("FAKE_BYBIT_ERROR_CODE", "10016")),
+    # Intervalo entre as mensagens de ticker do stream, por tópico assinado
+    "ticker_interval_ms": float(os.getenv("FAKE_BYBIT_TICKER_INTERVAL_MS", "1000")),
+    "lost_order_responses": 0,
+}
+stats: Dict[str, int] = {}
+# Posição líquida (Buy positivo, Sell negativo) por (chave de API, símbolo)
+positions: Dict[tuple, float] = {}
+# Ordens executadas, na ordem de chegada, e índice por (chave de API, orderLinkId)
+orders: List[Dict] = []
+orders_by_link_id: Dict[tuple, Dict] = {}
+
+app = FastAPI()
+
+
+# Símbolos conhecidos: os do cryptos.json (se existir no diretório atual) ou a lista padrão
+def load_symbols(path: str = "cryptos.json"):
+    try:
+        with open(path) as file:
+            catalog = json.load(file)
+        symbols = {item["code"] for items in catalog.values() for item in items}
+        return tuple(sorted(symbols)) or DEFAULT_SYMBOLS
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return DEFAULT_SYMBOLS
+
+
+SYMBOLS = load_symbols()
+
+
+# Preço estável por símbolo (com uma pequena oscilação), para que o dimensionamento das ordens seja realista
+def price_of(symbol: str) -> float:
+    base = 1 + zlib.crc32(symbol.encode()) % 50000
+    return round(base * (1 + random.uniform(-0.001, 0.001)), 4)
+
+
+def ok(result: Dict) -> Dict:
+    return {"retCode": 0, "retMsg": "OK", "result": result, "retExtInfo": {}, "time": int(time.time() * 1000)}
+
+
+# Latência e erros injetados em todas as rotas /v5 (as rotas /fake ficam de fora)
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    path = request.url.path
+    if not path.startswith("/v5/"):
+        return await call_next(request)
+    stats[path] = stats.get(path, 0) + 1
+    delay = config["latency_ms"] + random.uniform(0, config["jitter_ms"])
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+    if config["error_rate"] and random.random() < config["error_rate"]:
+        stats["errors"] = stats.get("errors", 0) + 1
+        return JSONResponse({"retCode": config["error_code"], "retMsg": "Injected error", "result": {}, "retExtInfo": {}, "time": int(time.time() * 1000)})
+    return await call_next(request)
+
+
+@app.get("/v5/market/time")
+async def market_time():
+    now = time.time_ns()
+    return ok({"timeSecond": str(now // 1_000_000_000), "timeNano": str(now)})
+
+
+@app.get("/v5/user/query-api")
+async def query_api():
+    return ok({"id": "1", "readOnly": 0, "permissions": {"ContractTrade": ["Order", "Position"]}})
+
+
+@app.get("/v5/account/wallet-balance")
+async def wallet_balance(accountType: str = "UNIFIED"):
+    return ok({"list": [{"accountType": accountType, "coin": [{"coin": "USDT", "walletBalance": "1000000"}]}]})
+
+
+@app.get("/v5/market/instruments-info")
+async def instruments_info(category: str = "linear", symbol: Optional[str] = None, cursor: Optional[str] = None, limit: int = 500):
+    symbols = (symbol,) if symbol else SYMBOLS
+    items = [
+        {
+            "symbol": name,
+            "status": "Trading",
+            "lotSizeFilter": {"minOrderQty": "0.001", "maxOrderQty": "100000", "qtyStep": "0.001"},
+        }
+        for name in symbols
+    ]
+    return ok({"category": category, "list": items, "nextPageCursor": ""})
+
+
+@app.get("/v5/market/tickers")
+async def tickers(category: str = "linear", symbol: Optional[str] = None):
+    symbols = (symbol,) if symbol else SYMBOLS
+    items = []
+    for name in symbols:
+        price = price_of(name)
+        items.append({"symbol": name, "lastPrice": str(price), "prevPrice24h": str(round(price * 0.98, 4))})
+    return ok({"category": category, "list": items})
+
+
+# Candles sintéticos (do mais novo para o mais antigo, como a Bybit)
+@app.get("/v5/market/kline")
+async def kline(symbol: str, start: int, end: int, interval: str = "60", category: str = "linear", limit: int = 200):
+    step = 24 * 3600 * 1000 if interval == "D" else 7 * 24 * 3600 * 1000 if interval == "W" else int(interval) * 60 * 1000
+    base = price_of(symbol)
+    rows = []
+    ts = end // step * step
+    while ts >= start and len(rows) < limit:
+        close = base * (1 + 0.05 * ((ts // step) % 40 - 20) / 20)
+        rows.append([str(ts), str(close), str(close * 1.01), str(close * 0.99), str(close), "1", str(close)])
+        ts -= step
+    return ok({"symbol": symbol, "category": category, "list": rows})
+
+
+def api_key_of(request: Request) -> str:
+    return request.headers.get("X-BAPI-API-KEY", "")
+
+
+# Posições abertas da chave (com symbol, a do símbolo, mesmo zerada, como a Bybit em modo one-way)
+@app.get("/v5/position/list")
+async def position_list(request: Request, category: str = "linear", symbol: Optional[str] = None):
+    key = api_key_of(request)
+    if symbol:
+        held = {symbol: positions.get((key, symbol), 0.0)}
+    else:
+        held = {name: size for (owner, name), size in positions.items() if owner == key and size}
+    items = [
+        {
+            "symbol": name,
+            "side": "Buy" if size > 0 else "Sell" if size < 0 else "",
+            "size": f"{abs(size):.8f}".rstrip("0").rstrip(".") or "0",
+            "markPrice": str(price_of(name)),
+            "positionIdx": 0,
+        }
+        for name, size in sorted(held.items())
+    ]
+    return ok({"category": category, "list": items, "nextPageCursor": ""})
+
+
+# Alavancagem acima de 100x é recusada como na Bybit (10001); a demais é aceita como "já definida"
+# (110043), como numa conta já configurada
+@app.post("/v5/position/set-leverage")
+async def set_leverage(request: Request):
+    body = await request.json()
+    if float(body.get("buyLeverage") or 1) > 100:
+        return {"retCode": 10001, "retMsg": "leverage invalid", "result": {}, "retExtInfo": {}, "time": int(time.time() * 1000)}
+    return {"retCode": 110043, "retMsg": "leverage not modified", "result": {}, "retExtInfo": {}, "time": int(time.time() * 1000)}
+
+
+# Executa uma ordem a mercado: atualiza a posição líquida e devolve o item de resposta da Bybit,
+# ou None se o orderLinkId já foi usado pela chave
+def fill_order(key: str, order: Dict) -> Optional[Dict]:
+    link_id = order.get("orderLinkId") or ""
+    if link_id and (key, link_id) in orders_by_link_id:
+        return None
+    qty = float(order.get("qty") or 0)
+    signed = qty if order.get("side") == "Buy" else -qty
+    position = (key, order["symbol"])
+    positions[position] = round(positions.get(position, 0.0) + signed, 8)
+    filled = {
+        "orderId": uuid.uuid4().hex,
+        "orderLinkId": link_id,
+        "symbol": order["symbol"],
+        "side": order.get("side"),
+        "qty": order.get("qty"),
+        "orderStatus": "Filled",
+        "apiKey": key,
+    }
+    orders.append(filled)
+    if link_id:
+        orders_by_link_id[(key, link_id)] = filled
+    return filled
+
+
+def public_order(order: Dict) -> Dict:
+    return {name: value for name, value in order.items() if name != "apiKey"}
+
+
+def lose_response() -> bool:
+    if config["lost_order_responses"] > 0:
+        config["lost_order_responses"] -= 1
+        return True
+    return False
+
+
+@app.post("/v5/order/create")
+async def order_create(request: Request):
+    body = await request.json()
+    filled = fill_order(api_key_of(request), body)
+    if filled is None:
+        return {"retCode": 110072, "retMsg": "OrderLinkedID is duplicate", "result": {}, "retExtInfo": {}, "time": int(time.time() * 1000)}
+    if lose_response():
+        return JSONResponse({"retMsg": "Bad Gateway"}, status_code=502)
+    return ok({"orderId": filled["orderId"], "orderLinkId": filled["orderLinkId"]})
+
+
+@app.post("/v5/order/create-batch")
+async def order_create_batch(request: Request):
+    body = await request.json()
+    key = api_key_of(request)
+    created, statuses = [], []
+    for order in body.get("request", []):
+        filled = fill_order(key, order)
+        created.append({"category": body.get("category", "linear"), "symbol": order["symbol"],
+                        "orderId": filled["orderId"] if filled else "", "orderLinkId": order.get("orderLinkId", "")})
+        statuses.append({"code": 0, "msg": "OK"} if filled else {"code": 110072, "msg": "OrderLinkedID is duplicate"})
+    response = ok({"list": created})
+    response["retExtInfo"] = {"list": statuses}
+    return response
+
+
+# Ordens executadas na hora já saem do livro: realtime e history devolvem as mesmas
+@app.get("/v5/order/realtime")
+@app.get("/v5/order/history")
+async def order_query(request: Request, category: str = "linear", symbol: Optional[str] = None, orderLinkId: Optional[str] = None):
+    key = api_key_of(request)
+    if orderLinkId:
+        found = orders_by_link_id.get((key, orderLinkId))
+        items = [found] if found and (symbol is None or found["symbol"] == symbol) else []
+    else:
+        items = [order for order in orders if order["apiKey"] == key and (symbol is None or order["symbol"] == symbol)]
+    return ok({"category": category, "list": [public_order(order) for order in items], "nextPageCursor": ""})
+
+
+@app.get("/fake/orders")
+async def fake_orders():
+    return [public_order(order) for order in orders]
+
+
+# Stream público de tickers: responde a subscribe/ping como a Bybit e envia um snapshot de cada
+# tópico assinado a cada ticker_interval_ms
+@app.websocket("/v5/public/linear")
+async def public_linear(websocket: WebSocket):
+    await websocket.accept()
+    stats["ws_connections"] = stats.get("ws_connections", 0) + 1
+    topics = set()
+
+    async def publish():
+        while True:
+            await asyncio.sleep(config["ticker_interval_ms"] / 1000)
+            for topic in sorted(topics):
+                symbol = topic[len("tickers."):]
+                await websocket.send_text(json.dumps({
+                    "topic": topic,
+                    "type": "snapshot",
+                    "data": {"symbol": symbol, "lastPrice": str(price_of(symbol))},
+                    "ts": int(time.time() * 1000),
+                }))
+
+    publisher = asyncio.create_task(publish())
+    try:
+        while True:
+            message = json.loads(await websocket.receive_text())
+            op = message.get("op")
+            if op == "subscribe":
+                topics.update(arg for arg in message.get("args", []) if arg.startswith("tickers."))
+                await websocket.send_text(json.dumps({"success": True, "ret_msg": "", "op": "subscribe", "conn_id": uuid.uuid4().hex}))
+            elif op == "ping":
+                await websocket.send_text(json.dumps({"success": True, "ret_msg": "pong", "op": "ping"}))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        publisher.cancel()
+
+
+@app.get("/fake/stats")
+async def fake_stats():
+    return {"config": config, "calls": stats}
+
+
+@app.post("/fake/config")
+async def fake_config(request: Request):
+    changes = await request.json()
+    for key, value in changes.items():
+        if key in config:
+            config[key] = type(config[key])(value)
+    return config
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor local que imita a API v5 da Bybit")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9009)
+    parser.add_argument("--latency-ms", type=float, default=config["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=config["jitter_ms"])
+    parser.add_argument("--error-rate", type=float, default=config["error_rate"])
+    parser.add_argument("--error-code", type=int, default=config["error_code"])
+    args = parser.parse_args()
+    config.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate, error_code=args.error_code)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# ~/backend/benchmarks/load_api.py
+# Teste de carga da API: dispara /cryptos, /portfolios/{user_id} e /signal/{portfolio_id} com
+# concorrência controlada por `--duration` segundos e mostra vazão, latência p50/p99 e erros por
+# cenário. Com --spawn, sobe o servidor falso da Bybit (benchmarks.fake_bybit) e o backend num
+# diretório temporário (sem tocar nos dados locais); sem ele, usa o backend em --url, que deve
+# estar apontado para o servidor falso (BYBIT_BASE_URL) para não enviar ordens à testnet.
+# Uso (a partir de backend/): python -m benchmarks.load_api --spawn [--concurrency 1,10,50] [--duration 10]
+#                             [--scenarios cryptos,portfolios,signal] [--portfolios 20] [--fake-latency-ms 20] [--fake-error-rate 0]
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Sobe o servidor falso e o backend (cada um num processo) e os encerra ao final. O servidor falso
+# começa sem erros injetados, para que o preparo (cadastro das carteiras) não falhe.
+@contextmanager
+def spawn_servers(api_port: int, fake_port: int, latency_ms: float):
+    workdir = tempfile.mkdtemp(prefix="load-api-")
+    shutil.copy(os.path.join(BACKEND_DIR, "cryptos.json"), workdir)
+    env = dict(
+        os.environ,
+        BYBIT_BASE_URL=f"http://127.0.0.1:{fake_port}",
+        BYBIT_WS_PUBLIC_URL=f"ws://127.0.0.1:{fake_port}/v5/public/linear",
+        STORAGE_BACKEND="json",
+        JOB_QUEUE_PATH=os.path.join(workdir, "jobs.db"),
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'portfolios.db')}",
+        OHLCV_ENABLED="false",
+        VALUATION_ENABLED="false",
+        LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"),
+        PYTHONPATH=BACKEND_DIR,
+    )
+    log = open(os.path.join(workdir, "servers.log"), "w")
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_bybit", "--port", str(fake_port), "--latency-ms", str(latency_ms)],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        ),
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--port", str(api_port), "--log-level", "warning"],
+            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+        ),
+    ]
+    try:
+        yield workdir
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        log.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/cryptos")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("O backend não respondeu a tempo")
+        await asyncio.sleep(0.2)
+
+
+# Cria um usuário e `count` carteiras Bybit com o ativo do teste, cada uma com a sua chave: os sinais
+# são distribuídos entre elas para medir o backend, e não o limite de ordens por chave (as credenciais
+# só valem no servidor falso)
+async def setup_portfolios(client: httpx.AsyncClient, symbol: str, count: int) -> Dict:
+    tag = uuid.uuid4().hex[:8]
+    response = await client.post("/signup", json={"name": "Load test", "email": f"load-{tag}@example.com", "phone": "0"})
+    response.raise_for_status()
+    user_id = response.json()["user_id"]
+    first_id = int(time.time() * 1000) % 1_000_000_000
+    portfolio_ids = []
+    for portfolio_id in range(first_id, first_id + count):
+        portfolio = {
+            "id": portfolio_id,
+            "user_id": user_id,
+            "name": f"load-{tag}-{portfolio_id}",
+            "total_amount": 1000.0,
+            "exchange": "Bybit",
+            "api_key": f"load-key-{tag}-{portfolio_id}",
+            "api_secret": f"load-secret-{tag}",
+            "portfolioType": "daily",
+            "assets": [{"symbol": symbol, "amount_in_usd": 100.0, "leverage": 1}],
+        }
+        response = await client.post(f"/portfolios/{user_id}", json=portfolio)
+        response.raise_for_status()
+        portfolio_ids.append(portfolio_id)
+    return {"user_id": user_id, "portfolio_ids": portfolio_ids}
+
+
+def scenario_requests(ids: Dict, symbol: str):
+    trends = ("up", "down")
+    return {
+        "cryptos": lambda client, i: client.get("/cryptos", params={"timeframe": "daily"}),
+        "portfolios": lambda client, i: client.get(f"/portfolios/{ids['user_id']}"),
+        "signal": lambda client, i: client.post(
+            f"/signal/{ids['portfolio_ids'][i % len(ids['portfolio_ids'])]}",
+            json={"symbol": symbol, "trend": trends[i % 2], "amount_in_usd": 100.0, "leverage": 1},
+        ),
+    }
+
+
+# `concurrency` clientes em laço fechado até o fim do prazo; devolve latências (s) e número de erros
+async def run_scenario(client: httpx.AsyncClient, request, concurrency: int, duration: float):
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    sequence = 0
+
+    async def worker():
+        nonlocal errors, sequence
+        while time.perf_counter() < deadline:
+            sequence += 1
+            started = time.perf_counter()
+            try:
+                response = await request(client, sequence)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return np.array(latencies), errors, time.perf_counter() - started
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=max(args.concurrency) + 10, max_keepalive_connections=max(args.concurrency) + 10)
+    async with httpx.AsyncClient(base_url=args.url, timeout=30.0, limits=limits) as client:
+        await wait_ready(client)
+        ids = await setup_portfolios(client, args.symbol, args.portfolios)
+        if args.spawn and args.fake_error_rate:
+            (await client.post(f"http://127.0.0.1:{args.fake_port}/fake/config", json={"error_rate": args.fake_error_rate})).raise_for_status()
+        requests = scenario_requests(ids, args.symbol)
+        print(f"CPUs disponíveis: {os.cpu_count()} | backend: {args.url}")
+        print(f"{'cenário':>10} | {'conc.':>5} | {'requisições':>11} | {'req/s':>8} | {'p50 ms':>8} | {'p99 ms':>8} | {'erros':>6}")
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                latencies, errors, elapsed = await run_scenario(client, requests[name], concurrency, args.duration)
+                p50, p99 = (np.percentile(latencies, (50, 99)) * 1000) if len(latencies) else (float("nan"), float("nan"))
+                print(f"{name:>10} | {concurrency:>5} | {len(latencies):>11} | {len(latencies) / elapsed:8.1f} | {p50:8.2f} | {p99:8.2f} | {errors:>6}")
+        for portfolio_id in ids["portfolio_ids"]:
+            await client.delete(f"/portfolios/{portfolio_id}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão e latência (p50/p99) da API por cenário e concorrência")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="sobe o servidor falso da Bybit e o backend localmente")
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--fake-port", type=int, default=9009)
+    parser.add_argument("--fake-latency-ms", type=float, default=20.0, help="latência do servidor falso (com --spawn)")
+    parser.add_argument("--fake-error-rate", type=float, default=0.0, help="fração de respostas com retCode de erro (com --spawn)")
+    parser.add_argument("--scenarios", default="cryptos,portfolios,signal")
+    parser.add_argument("--concurrency", default="1,10,50")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--portfolios", type=int, default=20, help="carteiras (chaves de API) entre as quais os sinais são distribuídos")
+    args = parser.parse_args()
+    args.scenarios = [name for name in args.scenarios.split(",") if name]
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    unknown = set(args.scenarios) - {"cryptos", "portfolios", "signal"}
+    if unknown:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(unknown))}")
+    if args.spawn:
+        args.url = f"http://127.0.0.1:{args.api_port}"
+        with spawn_servers(args.api_port, args.fake_port, args.fake_latency_ms):
+            asyncio.run(run(args))
+    else:
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
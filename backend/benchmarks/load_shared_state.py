@@ -0,0 +1,102 @@
+# ~/backend/benchmarks/load_shared_state.py
+# Teste de carga do estado compartilhado entre processos (SharedJsonJournal + IndexedStore).
+# Cada processo faz, por `--duration` segundos, uma mistura de leituras (com sync) e escritas:
+# incrementos de um contador (ler-modificar-gravar em transação) e inserções com next_id().
+# Ao final, todos os processos sincronizam e o estado recarregado do disco é conferido:
+# nenhum incremento perdido, nenhum id duplicado e todas as visões iguais.
+# Uso (a partir de backend/): python -m benchmarks.load_shared_state [--workers 1,2,4,8] [--duration 5]
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from services.shared_journal import SharedJsonJournal
+from services.store import IndexedStore
+
+COUNTER_ID = 1
+
+
+def open_store(path: str, compact_every: int) -> IndexedStore:
+    journal = SharedJsonJournal(path, fsync_interval=0.05, compact_every=compact_every)
+    return IndexedStore(journal.load(), indexes=("user_id",), persistence=journal)
+
+
+def worker(path: str, duration: float, write_ratio: float, compact_every: int, barrier, results):
+    store = open_store(path, compact_every)
+    reads = increments = inserts = 0
+    barrier.wait()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        if random.random() >= write_ratio:
+            store.sync()
+            store.get(random.randint(1, max(1, store.next_id() - 1)))
+            store.find("user_id", random.randint(0, 100))
+            reads += 1
+        elif random.random() < 0.5:
+            with store.transaction():
+                counter = store.get(COUNTER_ID)
+                store.update(COUNTER_ID, dict(counter, value=counter["value"] + 1))
+            increments += 1
+        else:
+            with store.transaction():
+                store.insert({"id": store.next_id(), "user_id": random.randint(0, 100), "pid": os.getpid()})
+            inserts += 1
+    # Todos terminaram de escrever: cada processo sincroniza e informa a sua visão final
+    barrier.wait()
+    store.sync()
+    view = (store.get(COUNTER_ID)["value"], len(store), store.next_id())
+    store.persistence.close()
+    results.put((reads, increments, inserts, view))
+
+
+def run(workers: int, duration: float, write_ratio: float, compact_every: int):
+    directory = tempfile.mkdtemp(prefix="shared-state-")
+    path = os.path.join(directory, "records.json")
+    seed = open_store(path, compact_every)
+    seed.insert({"id": COUNTER_ID, "user_id": 0, "value": 0})
+    seed.persistence.close()
+
+    barrier = multiprocessing.Barrier(workers)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(path, duration, write_ratio, compact_every, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    reads = sum(outcome[0] for outcome in outcomes)
+    increments = sum(outcome[1] for outcome in outcomes)
+    inserts = sum(outcome[2] for outcome in outcomes)
+    final = open_store(path, compact_every)
+    counter = final.get(COUNTER_ID)["value"]
+    lost = increments - counter
+    missing = (1 + inserts) - len(final)
+    converged = len({outcome[3] for outcome in outcomes}) == 1 and outcomes[0][3][0] == counter
+    final.persistence.close()
+    shutil.rmtree(directory)
+    total = reads + increments + inserts
+    print(f"{workers:>8} | {total / duration:10.0f} | {reads / duration:10.0f} | {(increments + inserts) / duration:10.0f} | {lost:>8} | {missing:>9} | {'sim' if converged else 'NÃO':>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão e consistência do estado compartilhado por número de processos")
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--compact-every", type=int, default=2000)
+    args = parser.parse_args()
+    print(f"CPUs disponíveis: {os.cpu_count()}")
+    print(f"{'workers':>8} | {'ops/s':>10} | {'leituras/s':>10} | {'escritas/s':>10} | {'perdidos':>8} | {'faltando':>9} | {'convergiu':>10}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        run(workers, args.duration, args.write_ratio, args.compact_every)
+
+
+if __name__ == "__main__":
+    main()
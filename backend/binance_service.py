@@ -1,13 +1,36 @@
 # ~/backend/binance_service.py
+import logging
+
 from binance.client import Client
+from binance.exceptions import BinanceAPIException
+from services.credentials import credential_fingerprint
+from services.log_setup import log_payload
+from services.rate_limit import SyncRequestLimiter
+from services.sizing import size_order, SIZE_OK, SIZE_BELOW_MIN, SIZE_ABOVE_MAX
+
+logger = logging.getLogger(__name__)
+
+# Limites da Binance Futures por conta (requisições/s): 300 ordens a cada 10 s; demais chamadas pelo peso por IP
+BINANCE_CLASS_LIMITS = {"order": 30, "leverage": 10}
+
+# Códigos de erro da Binance Futures: clientOrderId repetido e ordem inexistente
+DUPLICATE_CLIENT_ORDER_ID = -4116
+ORDER_NOT_FOUND = -2013
 
 class BinanceService:
-    def __init__(self, api_key: str, api_secret: str):
-        self.client = Client(api_key, api_secret)
+    # Limites por (chave de API, classe de endpoint), compartilhados entre instâncias
+    rate_limiter = SyncRequestLimiter(BINANCE_CLASS_LIMITS)
+    # Filtros LOT_SIZE de todos os símbolos (uma única chamada a futures_exchange_info), compartilhados entre instâncias
+    _symbol_filters = {}
+
+    def __init__(self, api_key: str, api_secret: str, testnet: bool = False):
+        self.client = Client(api_key, api_secret, testnet=testnet)
+        self.limiter_key = credential_fingerprint(api_key)[:16]
 
     def set_leverage(self, symbol: str, leverage: int):
         try:
             print(f"Tentando definir alavancagem para {symbol}: {leverage}x")
+            self.rate_limiter.acquire(self.limiter_key, "leverage")
             response = self.client.futures_change_leverage(symbol=symbol, leverage=leverage)
             print(f"Sucesso ao definir alavancagem: {response}")
             return response
@@ -26,42 +49,93 @@ class BinanceService:
             print(f"Erro ao obter preço: {e}")
             return None
 
+    def get_symbol_info(self, symbol: str):
+        try:
+            if not BinanceService._symbol_filters:
+                logger.info("Carregando filtros de quantidade dos símbolos")
+                exchange_info = self.client.futures_exchange_info()
+                for item in exchange_info["symbols"]:
+                    lot_size = next((f for f in item["filters"] if f["filterType"] == "LOT_SIZE"), None)
+                    if lot_size:
+                        BinanceService._symbol_filters[item["symbol"]] = {
+                            "minOrderQty": float(lot_size["minQty"]),
+                            "maxOrderQty": float(lot_size["maxQty"]),
+                            "qtyStep": float(lot_size["stepSize"])
+                        }
+            return BinanceService._symbol_filters[symbol]
+        except Exception as e:
+            logger.error("Erro ao obter informações do símbolo %s: %s", symbol, e)
+            return None
+
     def calculate_quantity(self, symbol: str, amount_in_usd: float, leverage: int):
         try:
             price = self.get_current_price(symbol)
             if price is None:
-                print(f"Erro: Preço não obtido para {symbol}")
+                logger.error("Preço não obtido para %s", symbol)
+                return None
+            symbol_info = self.get_symbol_info(symbol)
+            if symbol_info is None:
+                return None
+            # Arredonda para baixo ao múltiplo do stepSize do símbolo e verifica minQty/maxQty
+            quantity, status = size_order(amount_in_usd, price, symbol_info, leverage)
+            logger.debug(
+                "Quantidade calculada para %s: %s (amount_in_usd=%s, leverage=%s, price=%s, stepSize=%s)",
+                symbol, quantity, amount_in_usd, leverage, price, symbol_info["qtyStep"]
+            )
+            if status == SIZE_BELOW_MIN:
+                logger.info("Quantidade %s abaixo do mínimo permitido (%s)", quantity, symbol_info["minOrderQty"])
+                return None
+            if status == SIZE_ABOVE_MAX:
+                logger.info("Quantidade %s acima do máximo permitido (%s)", quantity, symbol_info["maxOrderQty"])
                 return None
-            effective_amount = amount_in_usd * leverage
-            quantity = effective_amount / price
-            # Ajustar precisão (exemplo: 3 casas decimais para BTCUSDT)
-            quantity = round(quantity, 3)
-            print(f"Quantidade calculada para {symbol}: {quantity} (amount_in_usd={amount_in_usd}, leverage={leverage}, price={price})")
-            # Verificar tamanho mínimo (ajuste conforme o símbolo)
-            if quantity < 0.001:
-                print(f"Quantidade {quantity} abaixo do mínimo permitido")
+            if status != SIZE_OK:
+                logger.info("Preço inválido para %s: %s", symbol, price)
                 return None
             return quantity
         except Exception as e:
-            print(f"Erro ao calcular quantidade: {e}")
+            logger.error("Erro ao calcular quantidade: %s", e, extra={"symbol": symbol})
             return None
 
+    # O client_id vai como newClientOrderId: se a Binance o recusar como duplicado, a ordem já foi
+    # aceita numa tentativa anterior e a existente é devolvida em vez de uma nova
     def create_futures_order(self, client_id: str, symbol: str, side: str, quantity: float, order_type: str = "MARKET", price: float = None):
         try:
-            print(f"Tentando criar ordem: client_id={client_id}, symbol={symbol}, side={side}, quantity={quantity}, order_type={order_type}")
+            logger.debug("Tentando criar ordem: client_id=%s, symbol=%s, side=%s, quantity=%s, order_type=%s", client_id, symbol, side, quantity, order_type)
             order_params = {
                 "symbol": symbol,
-                "side": side,  # "BUY" ou "SELL"
+                "side": side.upper(),  # "BUY" ou "SELL"
                 "type": order_type,  # "MARKET" ou "LIMIT"
-                "quantity": quantity
+                "quantity": quantity,
+                "newClientOrderId": client_id
             }
             if order_type == "LIMIT" and price is not None:
                 order_params["price"] = price
                 order_params["timeInForce"] = "GTC"  # Good Till Cancelled
-            order = self.client.futures_create_order(**order_params)
-            print(f"Sucesso ao criar ordem: {order}")
+            self.rate_limiter.acquire(self.limiter_key, "order")
+            try:
+                order = self.client.futures_create_order(**order_params)
+            except BinanceAPIException as e:
+                if e.code != DUPLICATE_CLIENT_ORDER_ID:
+                    raise
+                order = self.find_order(symbol, client_id)
+                if order is None:
+                    raise
+                logger.info("Ordem %s já havia sido aceita; não será reenviada", client_id)
+            log_payload(logger, "Sucesso ao criar ordem", order, symbol=symbol, client_id=client_id)
             return order
         except Exception as e:
-            print(f"Erro ao criar ordem: {e}")
+            logger.error("Erro ao criar ordem: %s", e, extra={"symbol": symbol})
             return None
 
+    # Ordem pelo clientOrderId, ou None se não existir
+    def find_order(self, symbol: str, client_id: str):
+        try:
+            return self.client.futures_get_order(symbol=symbol, origClientOrderId=client_id)
+        except BinanceAPIException as e:
+            if e.code == ORDER_NOT_FOUND:
+                return None
+            raise
+
+    # Fecha a sessão HTTP do cliente (chamado pelo registro de clientes ao descartá-lo)
+    def close(self):
+        self.client.close_connection()
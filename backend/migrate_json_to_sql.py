@@ -0,0 +1,58 @@
+# ~/backend/migrate_json_to_sql.py
+# Importa users.json e portfolios.json (incluindo os journals pendentes) para o banco SQL.
+# Uso (a partir de backend/): DATABASE_URL=sqlite:///app.db python migrate_json_to_sql.py [--replace]
+import argparse
+import logging
+
+from sqlalchemy import delete, insert, select
+
+from models.database import SessionLocal, init_db
+from models.user import Portfolio, PortfolioAsset, User
+from services.journal import JsonJournal
+from services.sql_persistence import asset_rows, portfolio_row, user_row
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa os arquivos JSON do backend para o banco SQL")
+    parser.add_argument("--users", default="users.json")
+    parser.add_argument("--portfolios", default="portfolios.json")
+    parser.add_argument("--replace", action="store_true", help="apaga usuários, carteiras e ativos existentes antes de importar")
+    args = parser.parse_args()
+
+    init_db()
+    # Só leitura: não cria journals nem corta linhas incompletas dos arquivos da aplicação
+    users = JsonJournal(args.users).read()
+    portfolios = JsonJournal(args.portfolios).read()
+
+    with SessionLocal.begin() as session:
+        if args.replace:
+            session.execute(delete(PortfolioAsset))
+            session.execute(delete(Portfolio))
+            session.execute(delete(User))
+            existing_users, existing_portfolios = set(), set()
+        else:
+            existing_users = set(session.scalars(select(User.id)))
+            existing_portfolios = set(session.scalars(select(Portfolio.id)))
+
+        new_users = [user for user in users if user["id"] not in existing_users]
+        new_portfolios = [portfolio for portfolio in portfolios if portfolio["id"] not in existing_portfolios]
+        # Inserções em lote (executemany) por tabela
+        if new_users:
+            session.execute(insert(User), [user_row(user) for user in new_users])
+        if new_portfolios:
+            session.execute(insert(Portfolio), [portfolio_row(portfolio) for portfolio in new_portfolios])
+            rows = asset_rows(new_portfolios)
+            if rows:
+                session.execute(insert(PortfolioAsset), rows)
+
+    logger.info(
+        "Importação concluída: %d usuários e %d carteiras (%d usuários e %d carteiras já existiam)",
+        len(new_users), len(new_portfolios), len(users) - len(new_users), len(portfolios) - len(new_portfolios)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,17 @@
 # ~/backend/models/user.py
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
+    name = Column(String)
+    email = Column(String, index=True)
+    phone = Column(String)
     username = Column(String, unique=True, index=True)
     password = Column(String)  # Hash na produção
+    created_at = Column(String)  # ISO format
     portfolios = relationship("Portfolio", back_populates="user")
 
 class Portfolio(Base):
@@ -19,10 +23,17 @@ class Portfolio(Base):
     exchange = Column(String, default="Bybit")  # Nova coluna
     api_key = Column(String)  # Credenciais por carteira
     api_secret = Column(String)
+    portfolioType = Column(String)  # 'daily' ou 'intraday'
+    created_at = Column(String)  # ISO format
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User", back_populates="portfolios")
-    assets = relationship("PortfolioAsset", back_populates="portfolio")
+    assets = relationship("PortfolioAsset", back_populates="portfolio", cascade="all, delete-orphan")
     orders = relationship("Order", back_populates="portfolio")
+    # Carteiras por usuário e por tipo (broadcast de sinais)
+    __table_args__ = (
+        Index("ix_portfolios_user_id_id", "user_id", "id"),
+        Index("ix_portfolios_type_id", "portfolioType", "id"),
+    )
 
 class PortfolioAsset(Base):
     __tablename__ = "portfolio_assets"
@@ -32,6 +43,9 @@ class PortfolioAsset(Base):
     amount_in_usd = Column(Float)
     leverage = Column(Integer)  # Limitado a 1 ou 2
     portfolio = relationship("Portfolio", back_populates="assets")
+    __table_args__ = (
+        Index("ix_portfolio_assets_portfolio_id_symbol", "portfolio_id", "symbol"),
+    )
 
 class Order(Base):
     __tablename__ = "orders"
@@ -43,6 +57,10 @@ class Order(Base):
     entry_price = Column(Float)
     order_date = Column(String)  # ISO format, ex.: "2025-03-23"
     portfolio = relationship("Portfolio", back_populates="orders")
+    # Ordens de uma carteira por data
+    __table_args__ = (
+        Index("ix_orders_portfolio_id_order_date", "portfolio_id", "order_date"),
+    )
 
 class PortfolioPerformance(Base):
     __tablename__ = "portfolio_performance"
@@ -50,4 +68,7 @@ class PortfolioPerformance(Base):
     portfolio_id = Column(Integer, ForeignKey("portfolios.id"))
     date = Column(String)  # Ex.: "2025-03-23"
     total_value = Column(Float)  # Valor atualizado às 21h
-
+    # Desempenho de uma carteira por data
+    __table_args__ = (
+        Index("ix_portfolio_performance_portfolio_id_date", "portfolio_id", "date"),
+    )
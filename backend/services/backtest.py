@@ -0,0 +1,133 @@
+# ~/backend/services/backtest.py
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.paper_exchange import DEFAULT_FEE_RATE
+from services.sizing import size_orders, SIZE_OK
+from services.trend import TrendEngine, TREND_NONE
+
+YEAR_MS = 365 * 24 * 3600 * 1000
+
+
+# Backtest de uma carteira sobre os candles locais: o motor de tendência é reproduzido candle a candle
+# e, a cada virada, a posição do ativo é reaberta na nova direção com a quantidade que o send_signal
+# enviaria naquele fechamento (amount_in_usd / preço, arredondada para baixo no qtyStep, com min/max;
+# ordens rejeitadas deixam o ativo sem posição). PnL, taxas e curva de capital são calculados em
+# arrays por ativo e somados numa linha do tempo comum.
+# Virada é a mesma do TrendEngine ao vivo: a primeira tendência após o aquecimento só define o estado,
+# sem ordem. Com enter_on_first_trend, ela também abre a posição (carteira já posicionada no início).
+# `candles`: símbolo -> {"ts", "high", "low", "close"}; `symbol_infos`: símbolo -> filtros do instrumento.
+def run_backtest(
+    assets: List[Dict],
+    total_amount: float,
+    candles: Dict[str, Dict[str, np.ndarray]],
+    symbol_infos: Dict[str, Dict],
+    interval_ms: int,
+    fee_rate: float = DEFAULT_FEE_RATE,
+    engine_options: Optional[Dict] = None,
+    enter_on_first_trend: bool = False,
+) -> Dict:
+    skipped = {}
+    tradable = []
+    for asset in assets:
+        symbol = asset["symbol"]
+        if symbol not in symbol_infos:
+            skipped[symbol] = "instrumento não encontrado"
+        elif symbol not in candles or len(candles[symbol]["ts"]) < 2:
+            skipped[symbol] = "sem candles suficientes no período"
+        else:
+            tradable.append(asset)
+
+    engine = TrendEngine({asset["symbol"] for asset in tradable}, **(engine_options or {}))
+    trends = engine.trend_history({asset["symbol"]: candles[asset["symbol"]] for asset in tradable})
+
+    # Todas as entradas (viradas com direção) de todos os ativos, dimensionadas de uma vez
+    entry_assets, entry_bars = [], []
+    for position, asset in enumerate(tradable):
+        direction = trends[asset["symbol"]]
+        previous = np.concatenate((np.array([TREND_NONE], dtype=direction.dtype), direction[:-1]))
+        entries = direction != previous
+        if not enter_on_first_trend:
+            entries &= previous != TREND_NONE
+        changes = np.flatnonzero(entries)
+        entry_assets.append(np.full(len(changes), position, dtype=np.intp))
+        entry_bars.append(changes)
+    entry_assets = np.concatenate(entry_assets) if entry_assets else np.zeros(0, dtype=np.intp)
+    entry_bars = np.concatenate(entry_bars) if entry_bars else np.zeros(0, dtype=np.int64)
+    infos = [symbol_infos[asset["symbol"]] for asset in tradable]
+    sized = size_orders(
+        np.array([asset["amount_in_usd"] for asset in tradable], dtype=np.float64)[entry_assets],
+        np.array([candles[tradable[a]["symbol"]]["close"][bar] for a, bar in zip(entry_assets.tolist(), entry_bars.tolist())], dtype=np.float64),
+        np.array([info["qtyStep"] for info in infos], dtype=np.float64)[entry_assets],
+        np.array([info["minOrderQty"] for info in infos], dtype=np.float64)[entry_assets],
+        np.array([info["maxOrderQty"] for info in infos], dtype=np.float64)[entry_assets],
+    )
+    entry_qty = np.where(sized.status == SIZE_OK, sized.qty, 0.0)
+
+    timeline = np.unique(np.concatenate([candles[asset["symbol"]]["ts"] for asset in tradable])) if tradable else np.zeros(0, dtype=np.int64)
+    equity = np.full(len(timeline), float(total_amount))
+    results = {}
+    trades_total = 0
+    fees_total = 0.0
+    for position, asset in enumerate(tradable):
+        symbol = asset["symbol"]
+        ts = np.asarray(candles[symbol]["ts"])
+        close = np.asarray(candles[symbol]["close"], dtype=np.float64)
+        direction = trends[symbol].astype(np.float64)
+        mine = entry_assets == position
+        # Quantidade da posição em cada candle: a da última entrada, com o sinal da tendência
+        segment = np.zeros(len(ts), dtype=np.int64)
+        segment[entry_bars[mine]] = 1
+        segment = np.cumsum(segment) - 1
+        quantities = entry_qty[mine]
+        units = np.where(segment >= 0, direction * quantities[np.maximum(segment, 0)] if len(quantities) else 0.0, 0.0)
+        previous_units = np.concatenate(([0.0], units[:-1]))
+        pnl = previous_units * np.diff(close, prepend=close[0])
+        traded = np.abs(units - previous_units)
+        fees = traded * close * fee_rate
+        cumulative = np.cumsum(pnl - fees)
+        # Resultado acumulado do ativo em cada instante da linha do tempo comum
+        index = np.searchsorted(ts, timeline, side="right") - 1
+        equity += np.where(index >= 0, cumulative[np.maximum(index, 0)], 0.0)
+
+        trades = int(np.count_nonzero(traded))
+        trades_total += trades
+        fees_total += float(fees.sum())
+        margin = asset["amount_in_usd"] / max(1, asset.get("leverage") or 1)
+        results[symbol] = {
+            "pnl": round(float(cumulative[-1]), 8),
+            "fees": round(float(fees.sum()), 8),
+            "trades": trades,
+            "rejected_entries": int(np.count_nonzero(sized.status[mine] != SIZE_OK)),
+            "return_on_margin_pct": round(float(cumulative[-1]) / margin * 100, 4) if margin else None,
+            "final_trend": {1: "up", -1: "down"}.get(int(trends[symbol][-1])),
+        }
+
+    return {
+        "initial_value": float(total_amount),
+        "final_value": round(float(equity[-1]), 8) if len(equity) else float(total_amount),
+        **equity_metrics(equity, interval_ms),
+        "trades": trades_total,
+        "fees": round(fees_total, 8),
+        "assets": results,
+        "skipped": skipped,
+        "equity_curve": {"ts": timeline.tolist(), "equity": np.round(equity, 8).tolist()},
+    }
+
+
+# Retorno total, drawdown máximo e Sharpe anualizado (sem taxa livre de risco) de uma curva de capital
+def equity_metrics(equity: np.ndarray, interval_ms: int) -> Dict:
+    if len(equity) < 2 or equity[0] <= 0:
+        return {"return_pct": 0.0, "max_drawdown_pct": 0.0, "sharpe": None}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(equity) / equity[:-1]
+        drawdown = 1.0 - equity / np.maximum.accumulate(equity)
+    returns = returns[np.isfinite(returns)]
+    deviation = returns.std() if len(returns) else 0.0
+    return {
+        "return_pct": round(float(equity[-1] / equity[0] - 1) * 100, 4),
+        "max_drawdown_pct": round(float(np.nanmax(drawdown)) * 100, 4),
+        "sharpe": round(float(returns.mean() / deviation * math.sqrt(YEAR_MS / interval_ms)), 4) if deviation > 0 else None,
+    }
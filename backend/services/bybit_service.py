@@ -1,34 +1,62 @@
 # ~/backend/services/bybit_service.py
 from pybit.unified_trading import HTTP
+from services.instruments import SyncInstrumentCache
+from services.leverage import LeverageCache
+from services.credentials import credential_fingerprint
+from services.rate_limit import SyncRequestLimiter, BYBIT_CLASS_LIMITS
+from services.sizing import size_order, SIZE_OK, SIZE_BELOW_MIN, SIZE_ABOVE_MAX
+from services.log_setup import log_payload
 import logging
 
-logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 class BybitService:
-    def __init__(self, api_key: str, api_secret: str, use_testnet: bool = False):
+    # Cache de instrumentos compartilhado entre instâncias (um por ambiente: testnet/mainnet ou URL base)
+    _instrument_caches = {}
+    # Alavancagem já aplicada por (chave de API, símbolo), compartilhada entre instâncias
+    leverage_cache = LeverageCache()
+    # Limites por (chave de API, classe de endpoint), compartilhados entre instâncias
+    rate_limiter = SyncRequestLimiter(BYBIT_CLASS_LIMITS)
+
+    def __init__(self, api_key: str, api_secret: str, use_testnet: bool = False, price_feed=None, base_url: str = None):
         self.client = HTTP(api_key=api_key, api_secret=api_secret, testnet=use_testnet)
+        # URL base alternativa (ex.: servidor falso dos testes de carga) no lugar da escolhida pelo SDK
+        if base_url:
+            self.client.endpoint = base_url
+        # Cache de preços opcional (TickerPriceFeed); sem ele, o preço vem sempre da API REST
+        self.price_feed = price_feed
+        self.api_key = api_key
+        self.limiter_key = credential_fingerprint(api_key)[:16]
+        environment = base_url or use_testnet
+        if environment not in BybitService._instrument_caches:
+            BybitService._instrument_caches[environment] = SyncInstrumentCache(self._fetch_instruments_page)
+        self.instruments = BybitService._instrument_caches[environment]
+
+    def _fetch_instruments_page(self, cursor: str = None):
+        params = {"category": "linear", "limit": 1000}
+        if cursor:
+            params["cursor"] = cursor
+        response = self.client.get_instruments_info(**params)
+        if response["retCode"] != 0:
+            raise Exception(f"Erro na API: {response['retMsg']}")
+        return response["result"]["list"], response["result"].get("nextPageCursor", "")
 
     def get_symbol_info(self, symbol: str):
         try:
-            logging.info(f"Tentando obter informações do símbolo {symbol}")
-            response = self.client.get_instruments_info(category="linear", symbol=symbol)
-            if response["retCode"] != 0:
-                raise Exception(f"Erro na API: {response['retMsg']}")
-            info = response["result"]["list"][0]
-            symbol_info = {
-                "qtyStep": float(info["lotSizeFilter"]["qtyStep"]),
-                "minOrderQty": float(info["lotSizeFilter"]["minOrderQty"]),
-                "maxOrderQty": float(info["lotSizeFilter"]["maxOrderQty"])
-            }
-            logging.info(f"Informações do símbolo {symbol}: {symbol_info}")
+            symbol_info = self.instruments.get(symbol)
+            logger.debug("Informações do símbolo %s: %s", symbol, symbol_info)
             return symbol_info
         except Exception as e:
-            logging.error(f"Erro ao obter informações do símbolo: {e}")
+            logger.error("Erro ao obter informações do símbolo: %s", e)
             return None
 
     def set_leverage(self, symbol: str, leverage: int):
-        logging.info(f"Tentando definir alavancagem para {symbol}: {leverage}x")
+        logger.debug("Tentando definir alavancagem para %s: %sx", symbol, leverage)
+        if self.leverage_cache.get(self.api_key, symbol) == leverage:
+            logger.debug("Alavancagem já definida como %sx (cache), ignorando alteração", leverage)
+            return {"retCode": 0, "retMsg": "Leverage unchanged"}
         try:
+            self.rate_limiter.acquire(self.limiter_key, "leverage")
             response = self.client.set_leverage(
                 category="linear",
                 symbol=symbol,
@@ -38,32 +66,38 @@ class BybitService:
             # A biblioteca pybit pode lançar exceção para retCode != 0, mas vamos verificar o response
             ret_code = response.get("retCode", -1)
             if ret_code == 0:
-                logging.info(f"Sucesso ao definir alavancagem: {response}")
+                log_payload(logger, "Sucesso ao definir alavancagem", response, symbol=symbol)
+                self.leverage_cache.set(self.api_key, symbol, leverage)
                 return response
             elif ret_code == 110043:
-                logging.info(f"Alavancagem já definida como {leverage}x, ignorando alteração")
+                self.leverage_cache.set(self.api_key, symbol, leverage)
+                logger.debug("Alavancagem já definida como %sx, ignorando alteração", leverage)
                 return {"retCode": 0, "retMsg": "Leverage unchanged"}
             else:
-                logging.error(f"Erro na API: {response.get('retMsg', 'Erro desconhecido')} (ErrCode: {ret_code})")
+                logger.error("Erro na API: %s (ErrCode: %s)", response.get("retMsg", "Erro desconhecido"), ret_code)
                 return None
         except Exception as e:
             error_msg = str(e)
             if "leverage not modified" in error_msg.lower() and "110043" in error_msg:
-                logging.info(f"Alavancagem já definida como {leverage}x, ignorando alteração (exceção capturada)")
+                self.leverage_cache.set(self.api_key, symbol, leverage)
+                logger.debug("Alavancagem já definida como %sx, ignorando alteração (exceção capturada)", leverage)
                 return {"retCode": 0, "retMsg": "Leverage unchanged"}
             else:
-                logging.error(f"Erro inesperado ao definir alavancagem: {error_msg}")
+                logger.error("Erro inesperado ao definir alavancagem: %s", error_msg)
                 return None
 
     def get_current_price(self, symbol: str):
         try:
-            logging.info(f"Tentando obter preço atual para {symbol}")
+            if self.price_feed is not None:
+                price = self.price_feed.latest(symbol)
+                if price is not None:
+                    return price
             response = self.client.get_tickers(category="linear", symbol=symbol)
             price = float(response["result"]["list"][0]["lastPrice"])
-            logging.info(f"Preço obtido para {symbol}: {price}")
+            logger.debug("Preço obtido para %s: %s", symbol, price)
             return price
         except Exception as e:
-            logging.error(f"Erro ao obter preço: {e}")
+            logger.error("Erro ao obter preço: %s", e)
             return None
 
     def calculate_quantity(self, symbol: str, amount_in_usd: float, leverage: int):
@@ -73,41 +107,70 @@ class BybitService:
             if price is None or symbol_info is None:
                 return None
             
-            effective_amount = amount_in_usd * leverage
-            quantity = effective_amount / price
-            
-            qty_step = symbol_info["qtyStep"]
-            min_qty = symbol_info["minOrderQty"]
-            max_qty = symbol_info["maxOrderQty"]
-            
-            quantity = round(quantity / qty_step) * qty_step
-            if quantity < min_qty:
-                logging.warning(f"Quantidade {quantity} menor que o mínimo {min_qty}, ajustando para o mínimo")
-                quantity = min_qty
-            if quantity > max_qty:
-                raise ValueError(f"Quantidade {quantity} excede o máximo permitido ({max_qty})")
+            quantity, status = size_order(amount_in_usd, price, symbol_info, leverage)
+            if status == SIZE_BELOW_MIN:
+                logger.warning("Quantidade %s menor que o mínimo %s para %s", quantity, symbol_info["minOrderQty"], symbol)
+                return None
+            if status == SIZE_ABOVE_MAX:
+                raise ValueError(f"Quantidade {quantity} excede o máximo permitido ({symbol_info['maxOrderQty']})")
+            if status != SIZE_OK:
+                raise ValueError(f"Preço inválido para {symbol}: {price}")
             
-            logging.info(f"Quantidade ajustada para {symbol}: {quantity} (amount_in_usd={amount_in_usd}, leverage={leverage}, price={price}, qtyStep={qty_step})")
+            logger.debug("Quantidade ajustada para %s: %s (amount_in_usd=%s, leverage=%s, price=%s, qtyStep=%s)", symbol, quantity, amount_in_usd, leverage, price, symbol_info["qtyStep"])
             return quantity
         except Exception as e:
-            logging.error(f"Erro ao calcular quantidade: {e}")
+            logger.error("Erro ao calcular quantidade: %s", e)
             return None
 
+    # O client_id vai como orderLinkId: se a Bybit o recusar como duplicado (110072), a ordem já foi
+    # aceita numa tentativa anterior e a existente é devolvida em vez de uma nova
     def create_futures_order(self, client_id: str, symbol: str, side: str, quantity: float):
         try:
-            logging.info(f"Tentando criar ordem: client_id={client_id}, symbol={symbol}, side={side}, quantity={quantity}")
-            response = self.client.place_order(
-                category="linear",
-                symbol=symbol,
-                side=side.capitalize(),  # "Buy" ou "Sell"
-                orderType="Market",
-                qty=str(quantity)
-            )
+            logger.debug("Tentando criar ordem: client_id=%s, symbol=%s, side=%s, quantity=%s", client_id, symbol, side, quantity)
+            self.rate_limiter.acquire(self.limiter_key, "order")
+            try:
+                response = self.client.place_order(
+                    category="linear",
+                    symbol=symbol,
+                    side=side.capitalize(),  # "Buy" ou "Sell"
+                    orderType="Market",
+                    qty=str(quantity),
+                    orderLinkId=client_id
+                )
+            except Exception as e:
+                # A pybit lança exceção para retCode != 0
+                if "110072" not in str(e):
+                    raise
+                response = {"retCode": 110072, "retMsg": str(e)}
+            if response["retCode"] == 110072:
+                existing = self.find_order(symbol, client_id)
+                if existing is not None:
+                    logger.info("Ordem %s já havia sido aceita; não será reenviada", client_id)
+                    return {"retCode": 0, "retMsg": "OK", "result": {"orderId": existing.get("orderId"), "orderLinkId": client_id}}
             if response["retCode"] != 0:
                 raise Exception(f"Erro na API: {response['retMsg']} (ErrCode: {response['retCode']})")
-            logging.info(f"Sucesso ao criar ordem: {response}")
+            log_payload(logger, "Sucesso ao criar ordem", response, symbol=symbol, client_id=client_id)
             return response
         except Exception as e:
-            logging.error(f"Erro ao criar ordem: {e}")
+            # Ordem rejeitada: a alavancagem conhecida deixa de ser confiável
+            self.leverage_cache.invalidate(self.api_key, symbol)
+            logger.error("Erro ao criar ordem: %s", e, extra={"symbol": symbol})
             return None
 
+    # Ordem pelo orderLinkId (abertas e recentes; depois o histórico), ou None se não existir
+    def find_order(self, symbol: str, client_id: str):
+        for query in (self.client.get_open_orders, self.client.get_order_history):
+            self.rate_limiter.acquire(self.limiter_key, "order_query")
+            response = query(category="linear", symbol=symbol, orderLinkId=client_id)
+            if response["retCode"] != 0:
+                raise Exception(f"Erro na API: {response['retMsg']} (ErrCode: {response['retCode']})")
+            orders = response["result"].get("list", [])
+            if orders:
+                return orders[0]
+        return None
+
+    # Fecha a sessão HTTP do cliente (chamado pelo registro de clientes ao descartá-lo)
+    def close(self):
+        session = getattr(self.client, "client", None)
+        if session is not None:
+            session.close()
@@ -0,0 +1,80 @@
+# ~/backend/services/catalog.py
+import hashlib
+import json
+import logging
+import os
+import time
+from types import MappingProxyType
+from typing import FrozenSet, Mapping, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TIMEFRAMES = ("daily", "intraday")
+
+
+# Versão imutável do catálogo: listas por timeframe, união e respostas já serializadas
+class CatalogSnapshot(NamedTuple):
+    mtime_ns: int
+    lists: Mapping[str, Tuple[Mapping, ...]]
+    # "daily", "intraday" e "all" -> (corpo JSON, ETag)
+    responses: Mapping[str, Tuple[bytes, str]]
+    symbols: FrozenSet[str]
+
+
+def _serialize(items) -> Tuple[bytes, str]:
+    body = json.dumps(items, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return body, '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def build_snapshot(data: dict, mtime_ns: int) -> CatalogSnapshot:
+    lists = {timeframe: list(data[timeframe]) for timeframe in TIMEFRAMES}
+    # União das listas, evitando duplicatas com base no 'code'
+    union = {crypto["code"]: crypto for crypto in lists["daily"]}
+    for crypto in lists["intraday"]:
+        union[crypto["code"]] = crypto
+    lists["all"] = list(union.values())
+    responses = {name: _serialize(items) for name, items in lists.items()}
+    frozen_lists = {
+        name: tuple(MappingProxyType(dict(crypto)) for crypto in items)
+        for name, items in lists.items()
+    }
+    return CatalogSnapshot(
+        mtime_ns=mtime_ns,
+        lists=MappingProxyType(frozen_lists),
+        responses=MappingProxyType(responses),
+        symbols=frozenset(union),
+    )
+
+
+# Catálogo de criptomoedas (cryptos.json) mantido em memória e recarregado
+# apenas quando o mtime do arquivo muda (verificado no máximo a cada check_interval)
+class CryptoCatalog:
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+
+    def current(self) -> CatalogSnapshot:
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked_at < self.check_interval:
+            return self._snapshot
+        self._checked_at = now
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            if self._snapshot is None:
+                raise
+            logger.error("%s não encontrado; mantendo o catálogo carregado", self.path)
+            return self._snapshot
+        if self._snapshot is None or mtime_ns != self._snapshot.mtime_ns:
+            try:
+                with open(self.path, "r") as file:
+                    data = json.load(file)
+                self._snapshot = build_snapshot(data, mtime_ns)
+                logger.info("Catálogo %s carregado: %d símbolos", self.path, len(self._snapshot.symbols))
+            except Exception as e:
+                if self._snapshot is None:
+                    raise
+                logger.error("Erro ao recarregar %s; mantendo a versão anterior: %s", self.path, e)
+        return self._snapshot
@@ -0,0 +1,103 @@
+# ~/backend/services/clock.py
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Estimador do desvio entre o relógio local e o relógio do servidor da exchange.
+# Amostra o horário do servidor periodicamente (estilo NTP: usa a amostra de menor RTT)
+# e entrega timestamps localmente, sem ida e volta à rede.
+class ClockSkewEstimator:
+    def __init__(
+        self,
+        fetch_server_time_ms: Callable[[], Awaitable[float]],
+        sync_interval: float = 60.0,
+        samples_per_sync: int = 3,
+    ):
+        self._fetch_server_time_ms = fetch_server_time_ms
+        self.sync_interval = sync_interval
+        self.samples_per_sync = samples_per_sync
+        self.offset_ms = 0.0
+        self.rtt_ms: Optional[float] = None
+        self.drift_ms_per_hour = 0.0
+        self.sync_count = 0
+        self.last_error: Optional[str] = None
+        self._last_sync_monotonic: Optional[float] = None
+        self._sync_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def synced(self) -> bool:
+        return self._last_sync_monotonic is not None
+
+    # Timestamp do servidor estimado em milissegundos (O(1), sem rede)
+    def now_ms(self) -> int:
+        return int(time.time() * 1000 + self.offset_ms)
+
+    async def _sample(self):
+        sent = time.time() * 1000
+        server_ms = await self._fetch_server_time_ms()
+        received = time.time() * 1000
+        rtt = received - sent
+        return server_ms - (sent + received) / 2, rtt
+
+    # Sincroniza o relógio; chamadas simultâneas compartilham a mesma sincronização
+    async def sync(self) -> None:
+        sync_started = self.sync_count
+        async with self._sync_lock:
+            if self.sync_count != sync_started:
+                return
+            try:
+                samples = [await self._sample() for _ in range(self.samples_per_sync)]
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error("Erro ao sincronizar o relógio com a exchange: %s", e)
+                return
+            offset, rtt = min(samples, key=lambda sample: sample[1])
+            now = time.monotonic()
+            if self._last_sync_monotonic is not None:
+                elapsed_hours = (now - self._last_sync_monotonic) / 3600
+                if elapsed_hours > 0:
+                    self.drift_ms_per_hour = (offset - self.offset_ms) / elapsed_hours
+            self.offset_ms = offset
+            self.rtt_ms = rtt
+            self.last_error = None
+            self._last_sync_monotonic = now
+            self.sync_count += 1
+            logger.info("Relógio sincronizado: offset=%.1fms, rtt=%.1fms", offset, rtt)
+
+    async def _run(self):
+        while True:
+            await self.sync()
+            await asyncio.sleep(self.sync_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict:
+        last_sync_age = None
+        if self._last_sync_monotonic is not None:
+            last_sync_age = round(time.monotonic() - self._last_sync_monotonic, 3)
+        return {
+            "synced": self.synced,
+            "offset_ms": round(self.offset_ms, 3),
+            "rtt_ms": round(self.rtt_ms, 3) if self.rtt_ms is not None else None,
+            "drift_ms_per_hour": round(self.drift_ms_per_hour, 3),
+            "last_sync_age_s": last_sync_age,
+            "sync_interval_s": self.sync_interval,
+            "sync_count": self.sync_count,
+            "last_error": self.last_error,
+        }
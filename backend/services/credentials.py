@@ -0,0 +1,45 @@
+# ~/backend/services/credentials.py
+import hashlib
+import hmac
+import os
+import time
+from typing import Dict
+
+# retCodes da Bybit que indicam chave inválida ou assinatura rejeitada
+AUTH_ERROR_CODES = {10003, 10004}
+
+# Sal aleatório por processo: as impressões digitais não podem ser comparadas
+# com hashes de chaves conhecidas nem reaproveitadas fora deste processo
+_FINGERPRINT_SALT = os.urandom(32)
+
+
+# Impressão digital (HMAC-SHA256) das credenciais, usada como chave de cache no lugar do texto puro
+def credential_fingerprint(api_key: str, api_secret: str = "") -> str:
+    message = f"{api_key}\x00{api_secret}".encode("utf-8")
+    return hmac.new(_FINGERPRINT_SALT, message, hashlib.sha256).hexdigest()
+
+
+# Cache das credenciais já validadas na exchange, com TTL
+class CredentialCache:
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._expires_at: Dict[str, float] = {}
+
+    def is_valid(self, api_key: str, api_secret: str) -> bool:
+        fingerprint = credential_fingerprint(api_key, api_secret)
+        expires_at = self._expires_at.get(fingerprint)
+        if expires_at is None:
+            return False
+        if time.monotonic() >= expires_at:
+            del self._expires_at[fingerprint]
+            return False
+        return True
+
+    def mark_valid(self, api_key: str, api_secret: str):
+        self._expires_at[credential_fingerprint(api_key, api_secret)] = time.monotonic() + self.ttl
+
+    def invalidate(self, api_key: str, api_secret: str):
+        self._expires_at.pop(credential_fingerprint(api_key, api_secret), None)
+
+    def __len__(self) -> int:
+        return len(self._expires_at)
@@ -0,0 +1,138 @@
+# ~/backend/services/exchange_registry.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Protocol, Tuple
+
+from services.credentials import credential_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+# Interface comum dos adaptadores de exchange (BybitService, BinanceService, PaperExchange).
+# Métodos bloqueantes: no servidor assíncrono, chame-os via asyncio.to_thread.
+# O client_id de create_futures_order é enviado à exchange e deduplicado por ela; find_order o consulta.
+class ExchangeAdapter(Protocol):
+    def set_leverage(self, symbol: str, leverage: int): ...
+
+    def get_current_price(self, symbol: str) -> Optional[float]: ...
+
+    def get_symbol_info(self, symbol: str) -> Optional[Dict]: ...
+
+    def calculate_quantity(self, symbol: str, amount_in_usd: float, leverage: int) -> Optional[float]: ...
+
+    def create_futures_order(self, client_id: str, symbol: str, side: str, quantity: float): ...
+
+    def find_order(self, symbol: str, client_id: str) -> Optional[Dict]: ...
+
+    def close(self): ...
+
+
+# (api_key, api_secret, testnet) -> adaptador
+AdapterFactory = Callable[[str, str, bool], ExchangeAdapter]
+
+
+# Registro de adaptadores por (exchange, hash das credenciais, testnet).
+# Reaproveita o cliente (sessão HTTP, ping/horário do servidor feitos na construção) entre
+# requisições (cada cliente é construído uma única vez, mesmo com acessos simultâneos);
+# remove o menos usado quando passa de max_size e os ociosos há mais de idle_timeout.
+class ExchangeClientRegistry:
+    def __init__(self, factories: Dict[str, AdapterFactory], max_size: int = 256, idle_timeout: float = 900.0):
+        self.factories = {name.lower(): factory for name, factory in factories.items()}
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        # chave -> (adaptador, último uso), do menos para o mais recentemente usado
+        self._adapters: "OrderedDict[Tuple[str, str, bool], Tuple[ExchangeAdapter, float]]" = OrderedDict()
+        # Chaves com cliente em construção (evita criar o mesmo cliente em paralelo)
+        self._creating: Dict[Tuple[str, str, bool], threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, exchange: str, api_key: str, api_secret: str, testnet: bool = False) -> ExchangeAdapter:
+        name = exchange.lower()
+        factory = self.factories.get(name)
+        if factory is None:
+            raise ValueError(f"Exchange não suportada: {exchange}")
+        key = (name, credential_fingerprint(api_key, api_secret), testnet)
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                expired = self._evict_idle(now)
+                entry = self._adapters.get(key)
+                if entry is not None:
+                    self._adapters[key] = (entry[0], now)
+                    self._adapters.move_to_end(key)
+                    self.hits += 1
+                    creating = None
+                else:
+                    creating = self._creating.get(key)
+                    if creating is None:
+                        self._creating[key] = threading.Event()
+            self._close_all(expired)
+            if entry is not None:
+                return entry[0]
+            if creating is None:
+                break
+            # Outra thread já está criando o cliente destas credenciais: aguarda e tenta de novo
+            creating.wait()
+
+        # Construção fora do lock (pode fazer requisições), uma única vez por chave
+        try:
+            adapter = factory(api_key, api_secret, testnet)
+        except BaseException:
+            with self._lock:
+                self._creating.pop(key).set()
+            raise
+        with self._lock:
+            self.misses += 1
+            self._adapters[key] = (adapter, time.monotonic())
+            self._creating.pop(key).set()
+            discarded = []
+            while len(self._adapters) > self.max_size:
+                _, (evicted, _) = self._adapters.popitem(last=False)
+                discarded.append(evicted)
+                self.evictions += 1
+        self._close_all(discarded)
+        return adapter
+
+    def _evict_idle(self, now: float):
+        expired = []
+        while self._adapters:
+            key, (adapter, last_used) = next(iter(self._adapters.items()))
+            if now - last_used < self.idle_timeout:
+                break
+            del self._adapters[key]
+            expired.append(adapter)
+            self.evictions += 1
+        return expired
+
+    def _close_all(self, adapters):
+        for adapter in adapters:
+            try:
+                adapter.close()
+            except Exception as e:
+                logger.warning("Erro ao fechar cliente de exchange: %s", e)
+
+    def close(self):
+        with self._lock:
+            adapters = [adapter for adapter, _ in self._adapters.values()]
+            self._adapters.clear()
+        self._close_all(adapters)
+
+    def status(self) -> Dict:
+        with self._lock:
+            by_exchange: Dict[str, int] = {}
+            for name, _, _ in self._adapters:
+                by_exchange[name] = by_exchange.get(name, 0) + 1
+            return {
+                "clients": len(self._adapters),
+                "by_exchange": by_exchange,
+                "max_size": self.max_size,
+                "idle_timeout": self.idle_timeout,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
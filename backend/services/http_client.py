@@ -0,0 +1,103 @@
+# ~/backend/services/http_client.py
+import os
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+from services.metrics import registry
+
+# Timeouts e limites do pool de conexões (configuráveis por variável de ambiente)
+CONNECT_TIMEOUT = float(os.getenv("EXCHANGE_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUT = float(os.getenv("EXCHANGE_READ_TIMEOUT", "10"))
+MAX_CONNECTIONS = int(os.getenv("EXCHANGE_MAX_CONNECTIONS", "200"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("EXCHANGE_MAX_KEEPALIVE_CONNECTIONS", "50"))
+KEEPALIVE_EXPIRY = float(os.getenv("EXCHANGE_KEEPALIVE_EXPIRY", "30"))
+
+QueryParams = Union[Dict, List[Tuple[str, str]], None]
+
+# Métricas por host e endpoint da exchange (o caminho da URL, sem a query string)
+EXCHANGE_REQUEST_DURATION = registry.histogram(
+    "exchange_request_duration_seconds", "Latência das requisições às exchanges", ("host", "method", "endpoint")
+)
+EXCHANGE_REQUESTS_IN_FLIGHT = registry.gauge(
+    "exchange_requests_in_flight", "Requisições às exchanges em andamento", ("host", "endpoint")
+)
+EXCHANGE_REQUEST_ERRORS = registry.counter(
+    "exchange_request_errors_total",
+    "Erros das exchanges por código: retCode da resposta, http_<status> ou a exceção de rede",
+    ("host", "endpoint", "code"),
+)
+
+
+# Cliente HTTP assíncrono com uma única sessão keep-alive por URL base
+class ExchangeClient:
+    def __init__(
+        self,
+        base_url: str,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        max_connections: int = MAX_CONNECTIONS,
+        max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+    ):
+        self.base_url = base_url
+        self.host = urlsplit(base_url).netloc or base_url
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    async def get(self, path: str, params: QueryParams = None, headers: Optional[Dict] = None) -> httpx.Response:
+        return await self._request("GET", path, params=params, headers=headers)
+
+    async def post(self, path: str, content: Optional[str] = None, headers: Optional[Dict] = None) -> httpx.Response:
+        return await self._request("POST", path, content=content, headers=headers)
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        in_flight = EXCHANGE_REQUESTS_IN_FLIGHT.labels(self.host, path)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            response = await self._client.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            self.record_error(path, type(e).__name__)
+            raise
+        finally:
+            in_flight.dec()
+            EXCHANGE_REQUEST_DURATION.labels(self.host, method, path).observe(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.record_error(path, f"http_{response.status_code}")
+        return response
+
+    # Erro informado no corpo da resposta (ex.: retCode != 0 da Bybit)
+    def record_error(self, path: str, code) -> None:
+        EXCHANGE_REQUEST_ERRORS.labels(self.host, path, code).inc()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+# Uma instância compartilhada por URL base, reaproveitada por todas as requisições
+_clients: Dict[str, ExchangeClient] = {}
+
+
+def get_exchange_client(base_url: str) -> ExchangeClient:
+    client = _clients.get(base_url)
+    if client is None:
+        client = ExchangeClient(base_url)
+        _clients[base_url] = client
+    return client
+
+
+# Fecha todas as sessões abertas (usado no shutdown da aplicação)
+async def close_exchange_clients():
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
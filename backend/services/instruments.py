@@ -0,0 +1,138 @@
+# ~/backend/services/instruments.py
+import asyncio
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Uma página de instrumentos: (lista de instrumentos, cursor da próxima página ou "")
+InstrumentPage = Tuple[List[Dict], str]
+
+
+# Converte um item de /v5/market/instruments-info para os filtros usados no cálculo da ordem
+def parse_instrument(item: Dict) -> Dict:
+    lot_size = item["lotSizeFilter"]
+    return {
+        "minOrderQty": float(lot_size["minOrderQty"]),
+        "maxOrderQty": float(lot_size["maxOrderQty"]),
+        "qtyStep": float(lot_size["qtyStep"])
+    }
+
+
+# Registro em memória dos instrumentos lineares, carregado em lote e renovado por TTL.
+# Um símbolo ausente dispara uma única atualização compartilhada por todas as requisições.
+class InstrumentRegistry:
+    def __init__(
+        self,
+        fetch_page: Callable[[Optional[str]], Awaitable[InstrumentPage]],
+        ttl: float = 3600.0,
+        min_refresh_interval: float = 30.0,
+    ):
+        self._fetch_page = fetch_page
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._instruments: Dict[str, Dict] = {}
+        self._loaded_at: Optional[float] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._instruments)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._instruments
+
+    async def _load(self):
+        instruments = {}
+        cursor = None
+        while True:
+            items, cursor = await self._fetch_page(cursor)
+            for item in items:
+                instruments[item["symbol"]] = parse_instrument(item)
+            if not cursor:
+                break
+        self._instruments = instruments
+        self._loaded_at = time.monotonic()
+        logger.info("Registro de instrumentos carregado: %d símbolos", len(instruments))
+
+    # Recarrega todos os instrumentos; chamadas simultâneas aguardam a mesma carga
+    async def refresh(self):
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._load())
+        await asyncio.shield(self._inflight)
+
+    async def get(self, symbol: str) -> Dict:
+        info = self._instruments.get(symbol)
+        if info is not None:
+            return info
+        recently_loaded = self._loaded_at is not None and time.monotonic() - self._loaded_at < self.min_refresh_interval
+        if not recently_loaded or (self._inflight is not None and not self._inflight.done()):
+            await self.refresh()
+        info = self._instruments.get(symbol)
+        if info is None:
+            raise KeyError(symbol)
+        return info
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Erro ao atualizar o registro de instrumentos: %s", e)
+            await asyncio.sleep(self.ttl)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Versão síncrona do registro, para os serviços baseados em SDK (ex.: pybit)
+class SyncInstrumentCache:
+    def __init__(self, fetch_page: Callable[[Optional[str]], InstrumentPage], ttl: float = 3600.0, min_refresh_interval: float = 30.0):
+        self._fetch_page = fetch_page
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._instruments: Dict[str, Dict] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _is_expired(self, max_age: float) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= max_age
+
+    def _refresh(self, max_age: float):
+        # Apenas uma thread recarrega; as demais esperam e reaproveitam o resultado
+        with self._lock:
+            if not self._is_expired(max_age):
+                return
+            instruments = {}
+            cursor = None
+            while True:
+                items, cursor = self._fetch_page(cursor)
+                for item in items:
+                    instruments[item["symbol"]] = parse_instrument(item)
+                if not cursor:
+                    break
+            self._instruments = instruments
+            self._loaded_at = time.monotonic()
+
+    def get(self, symbol: str) -> Dict:
+        if self._is_expired(self.ttl):
+            self._refresh(self.ttl)
+        info = self._instruments.get(symbol)
+        if info is None:
+            self._refresh(self.min_refresh_interval)
+            info = self._instruments.get(symbol)
+        if info is None:
+            raise KeyError(symbol)
+        return info
@@ -0,0 +1,250 @@
+# ~/backend/services/job_queue.py
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    available_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_available_at ON jobs (status, available_at);
+"""
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict:
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "payload": json.loads(row["payload"]),
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "result": json.loads(row["result"]) if row["result"] is not None else None,
+        "error": row["error"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+# Fila de jobs durável em SQLite (stdlib). Cada transição de estado é gravada com
+# synchronous=FULL antes de retornar, então um job aceito sobrevive a uma queda do processo.
+# A retirada de um job (claim) é atômica, inclusive entre processos que compartilham o arquivo.
+class JobQueue:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    # Conexão aberta sob demanda (e reaberta se a fila for usada de novo após close())
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=FULL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def enqueue(self, kind: str, payload: Dict, job_id: Optional[str] = None) -> Dict:
+        now = time.time()
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, attempts, created_at, updated_at, available_at) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), JOB_QUEUED, now, now, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    # Retira o próximo job disponível, marcando-o como em execução (e contando a tentativa)
+    def claim(self) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? AND available_at <= ? ORDER BY available_at, created_at LIMIT 1",
+                    (JOB_QUEUED, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (JOB_RUNNING, now, row["id"])
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        job = _row_to_job(row)
+        job["status"] = JOB_RUNNING
+        job["attempts"] += 1
+        return job
+
+    def complete(self, job_id: str, result: Any):
+        self._finish(job_id, JOB_SUCCEEDED, result=json.dumps(result))
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, JOB_FAILED, error=error)
+
+    # Devolve o job à fila para uma nova tentativa após `delay` segundos
+    def retry(self, job_id: str, error: str, delay: float = 0.0):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ?, available_at = ? WHERE id = ?",
+                (JOB_QUEUED, error, now, now + delay, job_id)
+            )
+
+    def _finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id)
+            )
+
+    # Renova a posse de um job em execução (o worker que o retirou continua vivo)
+    def heartbeat(self, job_id: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = ?",
+                (time.time(), job_id, JOB_RUNNING)
+            )
+
+    # Jobs em execução sem heartbeat há mais de `lease` segundos (o processo que os retirou caiu)
+    # voltam para a fila. Jobs de workers vivos, inclusive de outros processos, não são tocados.
+    def requeue_expired(self, lease: float) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, available_at = ? WHERE status = ? AND updated_at < ?",
+                (JOB_QUEUED, now, now, JOB_RUNNING, now - lease)
+            )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS total FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["total"] for row in rows}
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+# Pool de workers assíncronos que consomem a JobQueue. Cada job é entregue ao handler do seu tipo;
+# falhas para as quais `retryable` devolve True voltam à fila (até max_attempts), as demais encerram o job.
+# Enquanto um job executa, o worker renova a posse a cada lease/3 s; jobs com a posse vencida (processo
+# caído) são devolvidos à fila por qualquer processo, na inicialização e periodicamente.
+class JobWorkerPool:
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[Dict], Awaitable[Any]]],
+                 workers: int = 4, max_attempts: int = 3, retry_delay: float = 2.0, poll_interval: float = 1.0,
+                 retryable: Callable[[Exception], bool] = lambda e: False, lease: float = 60.0):
+        self.queue = queue
+        self.lease = lease
+        self.handlers = handlers
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.retryable = retryable
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._next_requeue = 0.0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._requeue_expired()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    def _requeue_expired(self):
+        self._next_requeue = time.monotonic() + self.lease / 3
+        resumed = self.queue.requeue_expired(self.lease)
+        if resumed:
+            logger.info("%d job(s) interrompido(s) devolvido(s) à fila", resumed)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # Grava o job e acorda os workers; devolve o job já persistido
+    async def submit(self, kind: str, payload: Dict, job_id: Optional[str] = None) -> Dict:
+        job = await asyncio.to_thread(self.queue.enqueue, kind, payload, job_id)
+        self._wakeup.set()
+        return job
+
+    async def _run(self):
+        while True:
+            if time.monotonic() >= self._next_requeue:
+                await asyncio.to_thread(self._requeue_expired)
+            job = await asyncio.to_thread(self.queue.claim)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._execute(job)
+
+    async def _execute(self, job: Dict):
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            await asyncio.to_thread(self.queue.fail, job["id"], f"Tipo de job desconhecido: {job['kind']}")
+            return
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            result = await handler(job)
+        except asyncio.CancelledError:
+            # Desligamento: o job continua "running" e volta à fila quando a posse vencer
+            raise
+        except Exception as e:
+            error = getattr(e, "detail", None) or str(e)
+            if self.retryable(e) and job["attempts"] < self.max_attempts:
+                logger.warning("Job %s falhou (tentativa %d); nova tentativa em %ss: %s", job["id"], job["attempts"], self.retry_delay * job["attempts"], error)
+                await asyncio.to_thread(self.queue.retry, job["id"], error, self.retry_delay * job["attempts"])
+            else:
+                logger.error("Job %s falhou: %s", job["id"], error)
+                await asyncio.to_thread(self.queue.fail, job["id"], error)
+            return
+        finally:
+            heartbeat.cancel()
+        await asyncio.to_thread(self.queue.complete, job["id"], result)
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await asyncio.to_thread(self.queue.heartbeat, job_id)
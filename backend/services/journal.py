@@ -0,0 +1,208 @@
+# ~/backend/services/journal.py
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Persistência de uma coleção JSON em snapshot + journal append-only.
+# Cada mutação grava uma linha no journal ({"op": "put"|"delete", ...}); o fsync é feito
+# em lote por uma thread em segundo plano. A compactação grava um novo snapshot
+# (arquivo temporário + rename atômico) e descarta o journal já incorporado.
+class JsonJournal:
+    def __init__(
+        self,
+        snapshot_path: str,
+        primary_key: str = "id",
+        fsync_interval: float = 0.05,
+        compact_every: int = 10000,
+    ):
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + ".journal"
+        # Journal sendo incorporado por uma compactação em andamento (ou interrompida)
+        self.compacting_path = snapshot_path + ".journal.compacting"
+        self.primary_key = primary_key
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        # Função que devolve todos os registros atuais (definida por quem usa o journal)
+        self.snapshot_source: Optional[Callable[[], List[Dict]]] = None
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._dirty = False
+        self._entries_since_compaction = 0
+        self._compaction: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    # Lê o snapshot e reaplica os journals pendentes; devolve os registros na ordem de inserção
+    def load(self) -> List[Dict]:
+        records, replayed = self._read(repair=True)
+        self._entries_since_compaction = replayed
+        self._open()
+        logger.info("%s: %d registros carregados (%d entradas do journal)", self.snapshot_path, len(records), replayed)
+        return list(records.values())
+
+    # Como load(), mas só leitura: não abre o journal para escrita nem corta linhas incompletas
+    # (ex.: exportar os dados sem mexer nos arquivos da aplicação)
+    def read(self) -> List[Dict]:
+        records, _ = self._read(repair=False)
+        return list(records.values())
+
+    def _read(self, repair: bool):
+        records: Dict[Any, Dict] = {}
+        try:
+            with open(self.snapshot_path, "r") as file:
+                for record in json.load(file):
+                    records[record[self.primary_key]] = record
+        except FileNotFoundError:
+            pass
+        replayed = 0
+        for path in (self.compacting_path, self.journal_path):
+            replayed += self._replay(path, records, repair)
+        return records, replayed
+
+    def _replay(self, path: str, records: Dict[Any, Dict], repair: bool = True) -> int:
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return 0
+        applied = 0
+        valid_length = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            self._apply(entry, records)
+            applied += 1
+            valid_length += len(line)
+        if valid_length < len(data) and repair:
+            # Linha incompleta (queda durante a escrita): descarta o trecho final
+            logger.warning("%s: descartando %d bytes incompletos no fim do journal", path, len(data) - valid_length)
+            with open(path, "r+b") as file:
+                file.truncate(valid_length)
+        return applied
+
+    def _apply(self, entry: Dict, records: Dict[Any, Dict]):
+        if entry["op"] == "put":
+            record = entry["record"]
+            pk = record[self.primary_key]
+            # Um registro atualizado vai para o fim, como no IndexedStore
+            records.pop(pk, None)
+            records[pk] = record
+        elif entry["op"] == "delete":
+            records.pop(entry["id"], None)
+
+    def _open(self):
+        self._fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if self.fsync_interval > 0 and self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name=f"journal-fsync:{self.snapshot_path}", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.fsync_interval):
+            self.flush()
+
+    # Garante em disco tudo o que já foi escrito no journal
+    def flush(self):
+        with self._lock:
+            if self._dirty and self._fd is not None:
+                os.fsync(self._fd)
+                self._dirty = False
+
+    def _append(self, entry: Dict):
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self._fd is None:
+                self._open()
+            os.write(self._fd, line)
+            if self.fsync_interval > 0:
+                self._dirty = True
+            else:
+                os.fsync(self._fd)
+            self._entries_since_compaction += 1
+        if self._entries_since_compaction >= self.compact_every and self.snapshot_source is not None:
+            self.compact()
+
+    def put(self, record: Dict):
+        self._append({"op": "put", "record": record})
+
+    def delete(self, pk: Any):
+        self._append({"op": "delete", "id": pk})
+
+    # Gira o journal e grava um novo snapshot em segundo plano
+    def compact(self, wait: bool = False):
+        if self._compaction is not None and self._compaction.is_alive():
+            if not wait:
+                return
+            self._compaction.join()
+        with self._lock:
+            if os.path.exists(self.compacting_path):
+                # Uma compactação anterior foi interrompida: incorpora o journal atual a ela
+                self._copy_journal_to_compacting()
+            elif self._fd is not None:
+                os.fsync(self._fd)
+                os.rename(self.journal_path, self.compacting_path)
+            if self._fd is not None:
+                os.close(self._fd)
+            self._fd = None
+            self._dirty = False
+            self._entries_since_compaction = 0
+            self._open()
+            records = self.snapshot_source()
+        self._compaction = threading.Thread(target=self._write_snapshot, args=(records,), name=f"journal-compact:{self.snapshot_path}", daemon=True)
+        self._compaction.start()
+        if wait:
+            self._compaction.join()
+
+    def _copy_journal_to_compacting(self):
+        if self._fd is not None:
+            os.fsync(self._fd)
+        try:
+            with open(self.journal_path, "rb") as source:
+                data = source.read()
+        except FileNotFoundError:
+            return
+        with open(self.compacting_path, "ab") as target:
+            target.write(data)
+            target.flush()
+            os.fsync(target.fileno())
+        os.remove(self.journal_path)
+
+    def _write_snapshot(self, records: List[Dict]):
+        tmp_path = self.snapshot_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as file:
+                json.dump(records, file, indent=4)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            self._fsync_directory()
+            os.remove(self.compacting_path)
+            logger.info("%s: snapshot compactado com %d registros", self.snapshot_path, len(records))
+        except Exception as e:
+            logger.error("Erro ao compactar %s: %s", self.snapshot_path, e)
+
+    def _fsync_directory(self):
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        self._closed.set()
+        if self._compaction is not None:
+            self._compaction.join()
+        self.flush()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
@@ -0,0 +1,42 @@
+# ~/backend/services/leader.py
+import fcntl
+import logging
+import os
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Líder entre os processos da aplicação (uvicorn/gunicorn com --workers N), para tarefas que só
+# um deles pode executar (ex.: enviar ordens de uma virada de tendência). A liderança é um flock
+# exclusivo e não bloqueante no arquivo: fica com o processo até ele terminar, e o sistema a libera
+# se ele cair; quem pergunta depois (is_leader) assume o lugar.
+class LeaderLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def is_leader(self) -> bool:
+        with self._lock:
+            if self._fd is not None:
+                return True
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode())
+            self._fd = fd
+            logger.info("Processo %d assumiu a liderança (%s)", os.getpid(), self.path)
+            return True
+
+    def release(self):
+        with self._lock:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+                os.close(self._fd)
+                self._fd = None
@@ -0,0 +1,37 @@
+# ~/backend/services/leverage.py
+from typing import Dict, Iterable, Optional, Tuple
+
+from services.credentials import credential_fingerprint
+
+
+# Alavancagem conhecida por (chave de API, símbolo), preenchida a partir das respostas
+# da exchange. Evita chamar set-leverage quando o valor já está aplicado.
+class LeverageCache:
+    def __init__(self):
+        self._leverage: Dict[Tuple[str, str], int] = {}
+
+    def _key(self, api_key: str, symbol: str) -> Tuple[str, str]:
+        return credential_fingerprint(api_key), symbol
+
+    def get(self, api_key: str, symbol: str) -> Optional[int]:
+        return self._leverage.get(self._key(api_key, symbol))
+
+    def set(self, api_key: str, symbol: str, leverage: int):
+        self._leverage[self._key(api_key, symbol)] = int(leverage)
+
+    def invalidate(self, api_key: str, symbol: str):
+        self._leverage.pop(self._key(api_key, symbol), None)
+
+    # Carrega a alavancagem atual a partir de /v5/position/list
+    def load_positions(self, api_key: str, positions: Iterable[Dict]) -> int:
+        loaded = 0
+        for position in positions:
+            leverage = position.get("leverage")
+            if not leverage:
+                continue
+            self.set(api_key, position["symbol"], int(float(leverage)))
+            loaded += 1
+        return loaded
+
+    def __len__(self) -> int:
+        return len(self._leverage)
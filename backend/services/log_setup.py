@@ -0,0 +1,159 @@
+# ~/backend/services/log_setup.py
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import time
+from typing import Any, Optional
+
+# Chaves cujo valor nunca vai para o log (comparação sem diferenciar maiúsculas)
+SENSITIVE_KEYS = frozenset({
+    "api_key", "apikey", "api_secret", "apisecret", "secret", "password", "token",
+    "sign", "signature", "x-bapi-api-key", "x-bapi-sign", "x-mbx-apikey",
+})
+REDACTED = "***"
+
+# Mesmas chaves em texto livre (dicts formatados, "chave=valor", cabeçalhos), para mensagens antigas em f-string
+_SENSITIVE_TEXT = re.compile(
+    r"""(?i)(["']?(?:api_key|api_secret|apikey|secret|password|token|signature|x-bapi-api-key|x-bapi-sign|x-mbx-apikey)["']?\s*[:=]\s*["']?)([^"'\s,;&}\]]+)"""
+)
+
+# Atributos padrão de um LogRecord; o resto veio de `extra` e vira campo do registro estruturado
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional["NonBlockingQueueHandler"] = None
+_payload_sample_rate = 0.0
+
+
+# Cópia do valor com as chaves sensíveis mascaradas (dicts, listas e tuplas aninhados)
+def redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if isinstance(key, str) and key.lower() in SENSITIVE_KEYS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(item) for item in value)
+    return value
+
+
+def redact_text(text: str) -> str:
+    return _SENSITIVE_TEXT.sub(lambda match: match.group(1) + REDACTED, text)
+
+
+# Mensagem final do registro com argumentos e texto mascarados
+def _redacted_message(record: logging.LogRecord) -> str:
+    if record.args:
+        record.args = redact(record.args)
+    return redact_text(record.getMessage())
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return redact({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS})
+
+
+# Um objeto JSON por linha: instante, nível, logger, mensagem e os campos passados em `extra`
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": _redacted_message(record),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exc_info"] = redact_text(self.formatException(record.exc_info))
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+# Formato de texto do basicConfig, com os campos de `extra` no fim como chave=valor
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s:%(name)s:%(message)s")
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = _redacted_message(record)
+        fields = _extra_fields(record)
+        line = super().formatMessage(record)
+        if fields:
+            line += " " + " ".join(f"{key}={json.dumps(value, default=str, ensure_ascii=False)}" for key, value in fields.items())
+        return line
+
+    def formatException(self, exc_info) -> str:
+        return redact_text(super().formatException(exc_info))
+
+
+# Handler do caminho quente: só enfileira o registro (sem formatar nem escrever) e nunca bloqueia;
+# com a fila cheia o registro é descartado e contado. A formatação e a escrita ficam com o
+# QueueListener, numa thread própria.
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# Configura o logger raiz: registros vão para uma fila e uma thread os formata (JSON ou texto)
+# e escreve no stderr. Substitui handlers instalados antes (ex.: basicConfig).
+def configure_logging(level: str = "INFO", fmt: str = "json", queue_size: int = 10000, payload_sample_rate: float = 0.0):
+    global _listener, _handler, _payload_sample_rate
+    stop_logging()
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    log_queue = queue.Queue(maxsize=max(0, queue_size))
+    _handler = NonBlockingQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
+    _payload_sample_rate = min(1.0, max(0.0, payload_sample_rate))
+    _listener.start()
+
+
+# Esvazia a fila e para a thread de escrita
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def logging_status() -> dict:
+    return {
+        "level": logging.getLevelName(logging.getLogger().level),
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+        "payload_sample_rate": _payload_sample_rate,
+    }
+
+
+# Log de payload completo (respostas e corpos de requisição): sempre em DEBUG; em INFO, só uma
+# amostra (payload_sample_rate). Fora disso custa uma checagem de nível. O payload é copiado já
+# mascarado, então pode ser alterado pelo chamador depois do log.
+def log_payload(logger: logging.Logger, message: str, payload: Any, **fields):
+    if logger.isEnabledFor(logging.DEBUG):
+        level = logging.DEBUG
+    elif _payload_sample_rate and random.random() < _payload_sample_rate and logger.isEnabledFor(logging.INFO):
+        level = logging.INFO
+    else:
+        return
+    logger.log(level, message, extra={**fields, "payload": redact(payload)})
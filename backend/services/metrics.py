@@ -0,0 +1,198 @@
+# ~/backend/services/metrics.py
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Limites dos buckets de latência (segundos): de 1 ms a 10 s
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Valores de uma série divididos por thread: cada thread só escreve no próprio shard, então um
+# incremento é uma soma numa lista sem lock e sem perda entre threads. A leitura soma os shards.
+class _Shards:
+    __slots__ = ("_width", "_shards")
+
+    def __init__(self, width: int):
+        self._width = width
+        self._shards: Dict[int, List[float]] = {}
+
+    def shard(self) -> List[float]:
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            shard = self._shards.setdefault(ident, [0.0] * self._width)
+        return shard
+
+    def totals(self) -> List[float]:
+        totals = [0.0] * self._width
+        for shard in list(self._shards.values()):
+            for position, value in enumerate(shard):
+                totals[position] += value
+        return totals
+
+
+class Counter(_Shards):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1.0):
+        self.shard()[0] += amount
+
+    def value(self) -> float:
+        return self.totals()[0]
+
+
+# Gauge de incrementos (ex.: requisições em andamento); inc e dec podem vir de threads diferentes
+class Gauge(Counter):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0):
+        self.shard()[0] -= amount
+
+
+# Histograma com buckets fixos: contagem por bucket (não acumulada) e a soma dos valores no fim
+class Histogram(_Shards):
+    __slots__ = ("bounds",)
+
+    def __init__(self, bounds: Sequence[float]):
+        super().__init__(len(bounds) + 2)
+        self.bounds = bounds
+
+    def observe(self, value: float):
+        shard = self.shard()
+        shard[bisect_left(self.bounds, value)] += 1
+        shard[-1] += value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+# Métrica com rótulos: uma série (Counter/Gauge/Histogram) por combinação de valores, criada no primeiro uso
+class MetricFamily:
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Iterable[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], _Shards] = {}
+
+    def labels(self, *values) -> _Shards:
+        key = tuple(str(value) for value in values)
+        series = self._series.get(key)
+        if series is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: esperados os rótulos {self.labelnames}")
+            if self.kind == "histogram":
+                series = Histogram(self.buckets)
+            elif self.kind == "gauge":
+                series = Gauge()
+            else:
+                series = Counter()
+            series = self._series.setdefault(key, series)
+        return series
+
+    def _label_text(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(f'{extra[0]}="{extra[1]}"')
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, series in sorted(self._series.items()):
+            totals = series.totals()
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{self._label_text(key)} {_number(totals[0])}")
+                continue
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), totals[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{self._label_text(key, ('le', le))} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_number(totals[-1])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {_number(cumulative)}")
+        return lines
+
+
+# Conjunto de métricas exportado em /metrics (formato de texto do Prometheus)
+class MetricsRegistry:
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, documentation: str, kind: str, labelnames: Iterable[str], buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(name, documentation, kind, labelnames, buckets)
+            elif family.kind != kind or family.labelnames != tuple(labelnames):
+                raise ValueError(f"Métrica {name} já registrada com outro tipo ou rótulos")
+            return family
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> MetricFamily:
+        return self._register(name, documentation, "counter", labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> MetricFamily:
+        return self._register(name, documentation, "gauge", labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+        return self._register(name, documentation, "histogram", labelnames, buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            families = sorted(self._families.values(), key=lambda family: family.name)
+        lines = []
+        for family in families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registro usado pela aplicação
+registry = MetricsRegistry()
+
+
+# Código de erro de uma exceção para o rótulo das métricas: status HTTP (HTTPException), ou o nome da classe
+def error_code(error: BaseException) -> str:
+    status = getattr(error, "status_code", None)
+    return str(status) if status is not None else type(error).__name__
+
+
+# Métricas das etapas de um fluxo (ex.: pipeline do send_signal): latência por etapa e resultado,
+# etapas em andamento e erros por código
+class StageMetrics:
+    def __init__(self, prefix: str, metrics: MetricsRegistry = registry):
+        self.duration = metrics.histogram(f"{prefix}_stage_duration_seconds", "Duração de cada etapa, por resultado", ("stage", "outcome"))
+        self.in_flight = metrics.gauge(f"{prefix}_stages_in_flight", "Etapas em andamento", ("stage",))
+        self.errors = metrics.counter(f"{prefix}_stage_errors_total", "Erros por etapa e código", ("stage", "code"))
+
+    @contextmanager
+    def stage(self, name: str):
+        in_flight = self.in_flight.labels(name)
+        in_flight.inc()
+        outcome = "ok"
+        started = time.perf_counter()
+        try:
+            yield
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except BaseException as e:
+            outcome = "error"
+            self.errors.labels(name, error_code(e)).inc()
+            raise
+        finally:
+            in_flight.dec()
+            self.duration.labels(name, outcome).observe(time.perf_counter() - started)
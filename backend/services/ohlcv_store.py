@@ -0,0 +1,293 @@
+# ~/backend/services/ohlcv_store.py
+import asyncio
+import fcntl
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Colunas de cada série e o tipo gravado em disco (little-endian, largura fixa)
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("ts", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+    ("turnover", "<f8"),
+)
+
+# Duração de cada intervalo de kline da Bybit, em ms
+INTERVAL_MS = {
+    **{str(minutes): minutes * 60 * 1000 for minutes in (1, 3, 5, 15, 30, 60, 120, 240, 360, 720)},
+    "D": 24 * 3600 * 1000,
+    "W": 7 * 24 * 3600 * 1000,
+}
+
+# Símbolos aceitos como nome de diretório da série (sem separadores de caminho nem "..")
+SYMBOL_PATTERN = re.compile(r"[A-Z0-9][A-Z0-9-]{0,31}")
+
+# Máximo de candles por requisição de /v5/market/kline
+KLINE_PAGE_LIMIT = 1000
+
+
+# Série OHLCV de um símbolo em um intervalo, em colunas: um arquivo binário por coluna
+# (<raiz>/<intervalo>/<símbolo>/<coluna>.bin), só com candles fechados e timestamps crescentes.
+# Acrescentar candles é um append em cada arquivo; as leituras são memory-mapped (sem cópia).
+# Uma queda no meio de um append deixa colunas de tamanhos diferentes: ao abrir, todas são
+# cortadas para o menor número de linhas completas.
+# Vários processos (uvicorn --workers N) podem usar a mesma pasta: a recuperação e o append são
+# feitos sob um flock em <pasta>/.lock, com o tamanho relido do disco, e as leituras acompanham
+# o tamanho dos arquivos (candles gravados por outro processo aparecem na leitura seguinte).
+class OhlcvSeries:
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._maps: Dict[str, np.ndarray] = {}
+        self._mapped_length = -1
+        with self._file_lock():
+            self.length = self._recover()
+
+    def _path(self, column: str) -> str:
+        return os.path.join(self.directory, f"{column}.bin")
+
+    # Lock exclusivo entre processos para alterar os arquivos da série
+    @contextmanager
+    def _file_lock(self):
+        with open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    # Linhas gravadas em cada coluna, pelo tamanho dos arquivos
+    def _disk_lengths(self) -> List[int]:
+        lengths = []
+        for column, dtype in COLUMNS:
+            try:
+                size = os.path.getsize(self._path(column))
+            except FileNotFoundError:
+                size = 0
+            lengths.append(size // np.dtype(dtype).itemsize)
+        return lengths
+
+    def _recover(self) -> int:
+        lengths = self._disk_lengths()
+        length = min(lengths)
+        for (column, dtype), rows in zip(COLUMNS, lengths):
+            if rows != length or not os.path.exists(self._path(column)):
+                with open(self._path(column), "ab") as file:
+                    file.truncate(length * np.dtype(dtype).itemsize)
+        if length != max(lengths):
+            logger.warning("%s: colunas cortadas para %d candles completos", self.directory, length)
+        return length
+
+    # Colunas mapeadas em memória, remapeadas só quando a série cresceu (inclusive por outro processo)
+    def _columns(self) -> Dict[str, np.ndarray]:
+        self.length = max(self.length, min(self._disk_lengths()))
+        if self._mapped_length != self.length:
+            if self.length == 0:
+                self._maps = {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS}
+            else:
+                self._maps = {
+                    column: np.memmap(self._path(column), dtype=dtype, mode="r", shape=(self.length,))
+                    for column, dtype in COLUMNS
+                }
+            self._mapped_length = self.length
+        return self._maps
+
+    def last_ts(self) -> Optional[int]:
+        with self._lock:
+            ts = self._columns()["ts"]
+            return int(ts[-1]) if len(ts) else None
+
+    # Acrescenta candles (colunas com o mesmo tamanho); os que não forem posteriores ao último gravado são ignorados
+    def append(self, columns: Dict[str, np.ndarray]) -> int:
+        with self._lock, self._file_lock():
+            self.length = self._recover()
+            ts = np.asarray(columns["ts"], dtype=np.int64)
+            if self.length:
+                keep = ts > self._columns()["ts"][-1]
+                if not keep.all():
+                    columns = {name: np.asarray(values)[keep] for name, values in columns.items()}
+                    ts = ts[keep]
+            if len(ts) == 0:
+                return 0
+            if len(ts) > 1 and not (np.diff(ts) > 0).all():
+                raise ValueError("Timestamps dos candles devem ser crescentes")
+            for column, dtype in COLUMNS:
+                with open(self._path(column), "ab") as file:
+                    file.write(np.ascontiguousarray(columns[column], dtype=dtype).tobytes())
+                    file.flush()
+                    os.fsync(file.fileno())
+            self.length += len(ts)
+            return len(ts)
+
+    # Candles com start_ms <= ts <= end_ms, como arrays NumPy (visões do memmap, somente leitura)
+    def range(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        with self._lock:
+            columns = self._columns()
+        ts = columns["ts"]
+        first = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side="left"))
+        last = len(ts) if end_ms is None else int(np.searchsorted(ts, end_ms, side="right"))
+        return {column: values[first:last] for column, values in columns.items()}
+
+    def close(self):
+        with self._lock:
+            self._maps = {}
+            self._mapped_length = -1
+
+
+# Séries OHLCV locais de todos os símbolos, por intervalo
+class OhlcvStore:
+    def __init__(self, root: str):
+        self.root = root
+        self._series: Dict[Tuple[str, str], OhlcvSeries] = {}
+        self._lock = threading.Lock()
+
+    def series(self, symbol: str, interval: str) -> OhlcvSeries:
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"Intervalo não suportado: {interval}")
+        if not SYMBOL_PATTERN.fullmatch(symbol):
+            raise ValueError(f"Símbolo inválido: {symbol!r}")
+        key = (symbol, interval)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = OhlcvSeries(os.path.join(self.root, interval, symbol))
+            return series
+
+    def range(self, symbol: str, interval: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        return self.series(symbol, interval).range(start_ms, end_ms)
+
+    def close(self):
+        with self._lock:
+            for series in self._series.values():
+                series.close()
+            self._series.clear()
+
+    def status(self) -> Dict:
+        with self._lock:
+            series = list(self._series.items())
+        return {
+            "root": self.root,
+            "series": {
+                f"{symbol}:{interval}": {"candles": len(item.range()["ts"]), "last_ts": item.last_ts()}
+                for (symbol, interval), item in sorted(series)
+            },
+        }
+
+
+# Converte uma página de /v5/market/kline (do mais novo para o mais antigo, valores em texto)
+# em colunas em ordem crescente de tempo
+def klines_to_columns(rows: List[List]) -> Dict[str, np.ndarray]:
+    if not rows:
+        return {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS}
+    table = np.array(rows[::-1], dtype=np.float64)
+    columns = {column: table[:, position] for position, (column, _) in enumerate(COLUMNS)}
+    columns["ts"] = np.array([int(row[0]) for row in rows[::-1]], dtype=np.int64)
+    return columns
+
+
+# Sincronização incremental das séries locais com a exchange: para cada (símbolo, intervalo) busca
+# apenas os candles fechados depois do último gravado, em páginas de KLINE_PAGE_LIMIT candles.
+# Uma série nova começa `history_days` dias atrás.
+class KlineSync:
+    def __init__(
+        self,
+        store: OhlcvStore,
+        fetch_klines: Callable[[str, str, int, int], Awaitable[List[List]]],
+        symbols: Callable[[], Iterable[str]],
+        intervals: Iterable[str] = ("D", "60"),
+        history_days: int = 365,
+        sync_interval: float = 300.0,
+        concurrency: int = 4,
+        on_synced: Optional[Callable[[], Awaitable]] = None,
+    ):
+        self.store = store
+        self._fetch_klines = fetch_klines
+        self._symbols = symbols
+        self.intervals = tuple(intervals)
+        self.history_days = history_days
+        self.sync_interval = sync_interval
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # Chamada após cada sincronização (ex.: atualizar indicadores com os candles novos)
+        self.on_synced = on_synced
+        self._task: Optional[asyncio.Task] = None
+        self.last_sync: Optional[Dict] = None
+
+    # Sincroniza uma série; devolve o número de candles novos
+    async def sync_series(self, symbol: str, interval: str) -> int:
+        series = self.store.series(symbol, interval)
+        step = INTERVAL_MS[interval]
+        now_ms = int(time.time() * 1000)
+        # Último candle já fechado
+        closed_until = now_ms // step * step - step
+        last = series.last_ts()
+        start = last + step if last is not None else (now_ms - self.history_days * 24 * 3600 * 1000) // step * step
+        added = 0
+        async with self._semaphore:
+            while start <= closed_until:
+                end = min(closed_until, start + (KLINE_PAGE_LIMIT - 1) * step)
+                columns = klines_to_columns(await self._fetch_klines(symbol, interval, start, end))
+                keep = columns["ts"] <= closed_until
+                if not keep.all():
+                    columns = {name: values[keep] for name, values in columns.items()}
+                added += await asyncio.to_thread(series.append, columns)
+                start = end + step
+        return added
+
+    async def sync(self) -> Dict:
+        started_at = time.perf_counter()
+        pairs = [(symbol, interval) for symbol in sorted(self._symbols()) for interval in self.intervals]
+        results = await asyncio.gather(*(self.sync_series(symbol, interval) for symbol, interval in pairs), return_exceptions=True)
+        added, errors = 0, {}
+        for (symbol, interval), result in zip(pairs, results):
+            if isinstance(result, Exception):
+                errors[f"{symbol}:{interval}"] = str(result)
+                logger.warning("Erro ao sincronizar candles de %s (%s): %s", symbol, interval, result)
+            else:
+                added += result
+        self.last_sync = {
+            "series": len(pairs),
+            "added": added,
+            "errors": errors,
+            "duration_ms": round((time.perf_counter() - started_at) * 1000, 2),
+        }
+        logger.info("Candles sincronizados: %d novos em %d séries", added, len(pairs))
+        if self.on_synced is not None:
+            try:
+                await self.on_synced()
+            except Exception as e:
+                logger.error("Erro ao processar os candles sincronizados: %s", e)
+        return self.last_sync
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error("Erro na sincronização de candles: %s", e)
+            await asyncio.sleep(self.sync_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,186 @@
+# ~/backend/services/paper_exchange.py
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from services.sizing import size_order, SIZE_OK, SIZE_BELOW_MIN, SIZE_ABOVE_MAX
+
+logger = logging.getLogger(__name__)
+
+# Taxa de taker da Bybit em contratos lineares (0,055%)
+DEFAULT_FEE_RATE = 0.00055
+
+
+# Conta simulada de um conjunto de credenciais: posições líquidas por símbolo (quantidade com sinal
+# e preço médio de entrada), PnL realizado, taxas e as últimas ordens (por orderLinkId, para que o
+# reenvio de uma ordem devolva a execução original em vez de executá-la de novo)
+class PaperAccount:
+    def __init__(self, max_orders: int = 1000):
+        self.positions: Dict[str, Dict] = {}
+        self.leverage: Dict[str, int] = {}
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+        self.max_orders = max_orders
+        self.orders: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fill(self, order_link_id: str, symbol: str, side: str, qty: float, price: float, fee_rate: float) -> Dict:
+        with self._lock:
+            existing = self.orders.get(order_link_id)
+            if existing is not None:
+                return existing
+            signed = qty if side == "Buy" else -qty
+            position = self.positions.setdefault(symbol, {"qty": 0.0, "entry_price": 0.0})
+            held = position["qty"]
+            realized = 0.0
+            if held == 0 or (held > 0) == (signed > 0):
+                # Abre ou aumenta a posição: novo preço médio
+                total = held + signed
+                position["entry_price"] = (abs(held) * position["entry_price"] + qty * price) / abs(total)
+                position["qty"] = total
+            else:
+                # Reduz, fecha ou inverte a posição: realiza o PnL da parte fechada
+                closed = min(abs(held), qty)
+                realized = closed * (price - position["entry_price"]) * (1 if held > 0 else -1)
+                position["qty"] = held + signed
+                if abs(position["qty"]) < 1e-12:
+                    position["qty"] = 0.0
+                    position["entry_price"] = 0.0
+                elif (position["qty"] > 0) != (held > 0):
+                    position["entry_price"] = price
+            fee = qty * price * fee_rate
+            self.realized_pnl += realized
+            self.fees += fee
+            order = {
+                "orderId": uuid.uuid4().hex,
+                "orderLinkId": order_link_id,
+                "symbol": symbol,
+                "side": side,
+                "orderType": "Market",
+                "qty": qty,
+                "avgPrice": price,
+                "orderStatus": "Filled",
+                "realizedPnl": round(realized, 8),
+                "fee": round(fee, 8),
+                "createdTime": int(time.time() * 1000),
+            }
+            self.orders[order_link_id] = order
+            while len(self.orders) > self.max_orders:
+                self.orders.popitem(last=False)
+            return order
+
+    def find(self, order_link_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self.orders.get(order_link_id)
+
+    def status(self, price_source: Optional[Callable[[str], Optional[float]]] = None) -> Dict:
+        with self._lock:
+            positions = {}
+            unrealized_total = 0.0
+            for symbol, position in self.positions.items():
+                if position["qty"] == 0:
+                    continue
+                item = dict(position, leverage=self.leverage.get(symbol))
+                price = price_source(symbol) if price_source else None
+                if price is not None:
+                    item["mark_price"] = price
+                    item["unrealized_pnl"] = round(position["qty"] * (price - position["entry_price"]), 8)
+                    unrealized_total += item["unrealized_pnl"]
+                positions[symbol] = item
+            return {
+                "positions": positions,
+                "realized_pnl": round(self.realized_pnl, 8),
+                "unrealized_pnl": round(unrealized_total, 8),
+                "fees": round(self.fees, 8),
+                "orders": list(self.orders.values())[-50:],
+            }
+
+
+# Contas simuladas por hash das credenciais. Ficam fora dos adaptadores para sobreviver ao descarte
+# do cliente pelo registro (LRU/ociosidade); são mantidas apenas em memória.
+class PaperLedger:
+    def __init__(self):
+        self._accounts: Dict[str, PaperAccount] = {}
+        self._lock = threading.Lock()
+
+    def account(self, fingerprint: str) -> PaperAccount:
+        with self._lock:
+            account = self._accounts.get(fingerprint)
+            if account is None:
+                account = self._accounts[fingerprint] = PaperAccount()
+            return account
+
+    def get(self, fingerprint: str) -> Optional[PaperAccount]:
+        with self._lock:
+            return self._accounts.get(fingerprint)
+
+
+# Adaptador de exchange simulada (mesma interface de BybitService/BinanceService): as ordens são
+# dimensionadas com as mesmas regras da Bybit (qtyStep, mínimo e máximo) e executadas ao preço atual,
+# sem enviar nada à exchange
+class PaperExchange:
+    def __init__(
+        self,
+        account: PaperAccount,
+        price_source: Callable[[str], Optional[float]],
+        instrument_source: Callable[[str], Optional[Dict]],
+        fee_rate: float = DEFAULT_FEE_RATE,
+    ):
+        self.account = account
+        self._price_source = price_source
+        self._instrument_source = instrument_source
+        self.fee_rate = fee_rate
+
+    def set_leverage(self, symbol: str, leverage: int):
+        self.account.leverage[symbol] = leverage
+        return {"symbol": symbol, "leverage": leverage}
+
+    def get_current_price(self, symbol: str) -> Optional[float]:
+        try:
+            return self._price_source(symbol)
+        except Exception as e:
+            logger.error("Erro ao obter preço simulado de %s: %s", symbol, e)
+            return None
+
+    def get_symbol_info(self, symbol: str) -> Optional[Dict]:
+        try:
+            return self._instrument_source(symbol)
+        except Exception as e:
+            logger.error("Erro ao obter informações do símbolo %s: %s", symbol, e)
+            return None
+
+    def calculate_quantity(self, symbol: str, amount_in_usd: float, leverage: int) -> Optional[float]:
+        price = self.get_current_price(symbol)
+        symbol_info = self.get_symbol_info(symbol)
+        if price is None or symbol_info is None:
+            return None
+        quantity, status = size_order(amount_in_usd, price, symbol_info, leverage)
+        if status == SIZE_BELOW_MIN:
+            logger.warning("Quantidade %s menor que o mínimo %s para %s", quantity, symbol_info["minOrderQty"], symbol)
+            return None
+        if status == SIZE_ABOVE_MAX:
+            logger.warning("Quantidade %s excede o máximo permitido (%s)", quantity, symbol_info["maxOrderQty"])
+            return None
+        if status != SIZE_OK:
+            logger.warning("Preço inválido para %s: %s", symbol, price)
+            return None
+        return quantity
+
+    def create_futures_order(self, client_id: str, symbol: str, side: str, quantity: float):
+        price = self.get_current_price(symbol)
+        if price is None:
+            return None
+        order = self.account.fill(client_id, symbol, side.capitalize(), float(quantity), price, self.fee_rate)
+        logger.info("Ordem simulada executada: %s %s %s a %s", order["side"], order["qty"], symbol, price)
+        return order
+
+    # Ordem já executada com o client_id (orderLinkId), ou None
+    def find_order(self, symbol: str, client_id: str) -> Optional[Dict]:
+        return self.account.find(client_id)
+
+    # O estado fica na conta (PaperLedger); nada a liberar
+    def close(self):
+        pass
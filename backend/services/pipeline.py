@@ -0,0 +1,62 @@
+# ~/backend/services/pipeline.py
+import asyncio
+import time
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from services.metrics import StageMetrics
+
+
+# Pipeline de etapas assíncronas com dependências explícitas.
+# Cada etapa começa assim que as etapas de que depende terminam; etapas independentes
+# rodam em paralelo. Cada etapa recebe os resultados das suas dependências como
+# argumentos nomeados. Na primeira falha, as etapas restantes são canceladas e o erro é propagado.
+# Com `metrics`, a duração de cada etapa (e do pipeline inteiro, como "total") também vai para os histogramas.
+class StagePipeline:
+    def __init__(self, metrics: Optional[StageMetrics] = None):
+        self._stages: Dict[str, Tuple[Callable[..., Awaitable[Any]], Tuple[str, ...]]] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.metrics = metrics
+
+    def _measure(self, name: str):
+        return self.metrics.stage(name) if self.metrics is not None else nullcontext()
+
+    def add(self, name: str, stage: Callable[..., Awaitable[Any]], depends_on: Iterable[str] = ()) -> "StagePipeline":
+        depends_on = tuple(depends_on)
+        for dependency in depends_on:
+            if dependency not in self._stages:
+                raise ValueError(f"Etapa '{name}' depende de '{dependency}', que não foi definida antes")
+        self._stages[name] = (stage, depends_on)
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        started_at = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str, stage, depends_on):
+            arguments = {dependency: await tasks[dependency] for dependency in depends_on}
+            start = time.perf_counter()
+            try:
+                with self._measure(name):
+                    return await stage(**arguments)
+            finally:
+                end = time.perf_counter()
+                self.timings[name] = {
+                    "start_ms": round((start - started_at) * 1000, 2),
+                    "end_ms": round((end - started_at) * 1000, 2),
+                    "duration_ms": round((end - start) * 1000, 2),
+                }
+
+        for name, (stage, depends_on) in self._stages.items():
+            tasks[name] = asyncio.create_task(run_stage(name, stage, depends_on))
+        try:
+            with self._measure("total"):
+                await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            self.timings["total"] = {"duration_ms": round((time.perf_counter() - started_at) * 1000, 2)}
+        return {name: task.result() for name, task in tasks.items()}
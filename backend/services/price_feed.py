@@ -0,0 +1,166 @@
+# ~/backend/services/price_feed.py
+import asyncio
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+
+import websockets
+
+logger = logging.getLogger(__name__)
+
+# A Bybit aceita no máximo 10 tópicos por mensagem de subscribe
+SUBSCRIBE_CHUNK_SIZE = 10
+
+
+# Cache de preços alimentado pelo stream público de tickers da exchange.
+# Mantém o último preço de cada símbolo em memória e só consulta a API REST
+# quando a cotação está mais velha que o limite de staleness.
+class TickerPriceFeed:
+    def __init__(
+        self,
+        ws_url: str,
+        fetch_price: Callable[[str], Awaitable[float]],
+        symbols: Iterable[str] = (),
+        max_age: float = 5.0,
+        ping_interval: float = 20.0,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        self.ws_url = ws_url
+        self._fetch_price = fetch_price
+        self.symbols: Set[str] = set(symbols)
+        self.max_age = max_age
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        # símbolo -> (preço, timestamp da exchange em ms, instante local de recebimento)
+        self._prices: Dict[str, tuple] = {}
+        # Consultas REST em andamento, por símbolo
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._ws = None
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+        self.reconnects = 0
+        self.rest_fallbacks = 0
+
+    def update(self, symbol: str, price: float, exchange_ts: Optional[int] = None):
+        self._prices[symbol] = (price, exchange_ts, time.monotonic())
+
+    # Último preço conhecido, ou None se não existir ou estiver velho demais
+    def latest(self, symbol: str, max_age: Optional[float] = None) -> Optional[float]:
+        quote = self._prices.get(symbol)
+        if quote is None:
+            return None
+        limit = self.max_age if max_age is None else max_age
+        if time.monotonic() - quote[2] > limit:
+            return None
+        return quote[0]
+
+    # Preço do stream; se velho ou ausente, consulta a API REST. Requisições simultâneas do mesmo
+    # símbolo aguardam a mesma consulta.
+    async def get_price(self, symbol: str) -> float:
+        price = self.latest(symbol)
+        if price is not None:
+            return price
+        task = self._inflight.get(symbol)
+        if task is None or task.done():
+            task = self._inflight[symbol] = asyncio.create_task(self._fetch_and_subscribe(symbol))
+            task.add_done_callback(lambda done: self._inflight.pop(symbol, None) if self._inflight.get(symbol) is done else None)
+        return await asyncio.shield(task)
+
+    async def _fetch_and_subscribe(self, symbol: str) -> float:
+        self.rest_fallbacks += 1
+        price = await self._fetch_price(symbol)
+        self.update(symbol, price)
+        if symbol not in self.symbols:
+            await self.subscribe([symbol])
+        return price
+
+    async def subscribe(self, symbols: Iterable[str]):
+        new_symbols = [s for s in symbols if s not in self.symbols]
+        self.symbols.update(new_symbols)
+        if self._ws is not None and new_symbols:
+            try:
+                await self._send_subscribe(self._ws, new_symbols)
+            except Exception as e:
+                logger.warning("Falha ao assinar novos tickers (serão assinados na reconexão): %s", e)
+
+    async def _send_subscribe(self, ws, symbols):
+        symbols = sorted(symbols)
+        for i in range(0, len(symbols), SUBSCRIBE_CHUNK_SIZE):
+            args = [f"tickers.{s}" for s in symbols[i:i + SUBSCRIBE_CHUNK_SIZE]]
+            await ws.send(json.dumps({"op": "subscribe", "args": args}))
+
+    def _handle_message(self, raw: str):
+        message = json.loads(raw)
+        topic = message.get("topic", "")
+        if not topic.startswith("tickers."):
+            return
+        data = message.get("data") or {}
+        symbol = data.get("symbol") or topic[len("tickers."):]
+        last_price = data.get("lastPrice")
+        if last_price:
+            self.update(symbol, float(last_price), message.get("ts"))
+        elif symbol in self._prices:
+            # Delta sem lastPrice: o preço não mudou, apenas renova o instante da cotação
+            self.update(symbol, self._prices[symbol][0], message.get("ts"))
+
+    async def _heartbeat(self, ws):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send(json.dumps({"op": "ping"}))
+
+    async def _run(self):
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with websockets.connect(self.ws_url, ping_interval=None) as ws:
+                    self._ws = ws
+                    self.connected = True
+                    delay = self.reconnect_delay
+                    logger.info("Stream de tickers conectado: %s (%d símbolos)", self.ws_url, len(self.symbols))
+                    await self._send_subscribe(ws, self.symbols)
+                    heartbeat = asyncio.create_task(self._heartbeat(ws))
+                    try:
+                        async for raw in ws:
+                            self._handle_message(raw)
+                    finally:
+                        heartbeat.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Stream de tickers desconectado: %s", e)
+            finally:
+                self._ws = None
+                self.connected = False
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict:
+        now = time.monotonic()
+        return {
+            "connected": self.connected,
+            "ws_url": self.ws_url,
+            "symbols": len(self.symbols),
+            "reconnects": self.reconnects,
+            "rest_fallbacks": self.rest_fallbacks,
+            "quotes": {
+                symbol: {"price": price, "exchange_ts": ts, "age_s": round(now - received, 3)}
+                for symbol, (price, ts, received) in self._prices.items()
+            },
+        }
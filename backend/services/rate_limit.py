@@ -0,0 +1,250 @@
+# ~/backend/services/rate_limit.py
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Mapping, Optional, Tuple
+
+# Prioridade de cada classe de endpoint (menor = atendida primeiro)
+PRIORITIES = {"order": 0, "leverage": 1, "order_query": 1, "position": 2, "balance": 2, "info": 3, "market": 3}
+
+# Limites padrão da Bybit por UID (requisições/s); ajustados pelos cabeçalhos X-Bapi-Limit* das respostas
+BYBIT_CLASS_LIMITS = {"order": 10, "leverage": 10, "order_query": 50, "position": 50, "balance": 50, "info": 10}
+
+# Classe de cada endpoint privado da Bybit (os não listados contam como "info")
+BYBIT_ENDPOINT_CLASSES = {
+    "/v5/order/create": "order",
+    "/v5/order/create-batch": "order",
+    "/v5/order/realtime": "order_query",
+    "/v5/order/history": "order_query",
+    "/v5/position/set-leverage": "leverage",
+    "/v5/position/list": "position",
+    "/v5/account/wallet-balance": "balance",
+    "/v5/user/query-api": "info",
+}
+
+# Chave usada nas estatísticas para as requisições públicas (sem chave de API)
+PUBLIC_KEY = "public"
+
+
+def bybit_endpoint_class(path: str) -> str:
+    return BYBIT_ENDPOINT_CLASSES.get(path, "info")
+
+
+# Lê os cabeçalhos de limite da Bybit: (limite/s, requisições restantes, segundos até o reset).
+# O reset vem no relógio do servidor, por isso é comparado com o horário estimado da Bybit.
+def parse_bybit_limit_headers(headers: Mapping[str, str], server_now_ms: float) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+    limit = headers.get("X-Bapi-Limit")
+    remaining = headers.get("X-Bapi-Limit-Status")
+    reset_at = headers.get("X-Bapi-Limit-Reset-Timestamp")
+    return (
+        float(limit) if limit else None,
+        float(remaining) if remaining else None,
+        max(0.0, (float(reset_at) - server_now_ms) / 1000) if reset_at else None,
+    )
+
+
+# Balde de fichas: `rate` fichas por segundo, até `capacity` acumuladas
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    # Segundos até haver uma ficha disponível (0 se já há)
+    def delay(self, now: float) -> float:
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    # Ajusta o balde ao que a exchange informou: o limite vira a nova taxa, as fichas nunca
+    # ficam acima do saldo restante e, com o saldo esgotado, o balde bloqueia até o reset
+    def update(self, now: float, limit: Optional[float] = None, remaining: Optional[float] = None, reset_in: Optional[float] = None):
+        self._refill(now)
+        if limit:
+            self.rate = self.capacity = limit
+            self.tokens = min(self.tokens, self.capacity)
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset_in is not None:
+                self.blocked_until = max(self.blocked_until, now + reset_in)
+
+    def status(self, now: float) -> Dict:
+        self._refill(now)
+        return {
+            "rate": self.rate,
+            "tokens": round(self.tokens, 2),
+            "blocked_ms": round(max(0.0, self.blocked_until - now) * 1000, 1),
+        }
+
+
+class _Waiter:
+    __slots__ = ("key", "endpoint_class", "future", "enqueued_at")
+
+    def __init__(self, key: str, endpoint_class: str, future: asyncio.Future, enqueued_at: float):
+        self.key = key
+        self.endpoint_class = endpoint_class
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+
+# Escalonador de requisições para a exchange: um balde por (chave de API, classe de endpoint)
+# e, opcionalmente, um balde compartilhado por IP. As requisições aguardam em filas por prioridade;
+# as fichas do balde por IP são entregues sempre na ordem de prioridade (ordens antes de consultas),
+# e uma requisição só espera outra da mesma chave e classe quando o balde dessa classe está vazio.
+class RequestScheduler:
+    def __init__(self, class_limits: Mapping[str, float], priorities: Mapping[str, int] = PRIORITIES,
+                 ip_rate: Optional[float] = None, ip_capacity: Optional[float] = None):
+        self.class_limits = dict(class_limits)
+        self.priorities = dict(priorities)
+        self._ip_bucket = TokenBucket(ip_rate, ip_capacity) if ip_rate else None
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._queues: Dict[int, Deque[_Waiter]] = {priority: deque() for priority in sorted(set(self.priorities.values()))}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Estatísticas por chave: requisições atendidas, espera total e espera máxima (s)
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _bucket(self, key: str, endpoint_class: str) -> Optional[TokenBucket]:
+        if key == PUBLIC_KEY or endpoint_class not in self.class_limits:
+            return None
+        bucket = self._buckets.get((key, endpoint_class))
+        if bucket is None:
+            bucket = self._buckets[(key, endpoint_class)] = TokenBucket(self.class_limits[endpoint_class])
+        return bucket
+
+    # Aguarda a vez da requisição; devolve o tempo de espera em segundos.
+    # Use key=None para endpoints públicos (apenas o limite por IP se aplica).
+    async def acquire(self, key: Optional[str], endpoint_class: str) -> float:
+        key = key or PUBLIC_KEY
+        waiter = _Waiter(key, endpoint_class, asyncio.get_running_loop().create_future(), time.monotonic())
+        self._queues[self.priorities.get(endpoint_class, max(self._queues))].append(waiter)
+        self._pump()
+        return await waiter.future
+
+    # Aplica os limites informados pela exchange na resposta de uma requisição
+    def observe(self, key: Optional[str], endpoint_class: str, limit: Optional[float] = None,
+                remaining: Optional[float] = None, reset_in: Optional[float] = None):
+        bucket = self._bucket(key or PUBLIC_KEY, endpoint_class)
+        if bucket is None:
+            return
+        bucket.update(time.monotonic(), limit, remaining, reset_in)
+        self._pump()
+
+    # Libera as requisições que já podem seguir e agenda a próxima verificação
+    def _pump(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        next_check = None
+        ip_exhausted = False
+        for queue in self._queues.values():
+            kept = deque()
+            while queue:
+                waiter = queue.popleft()
+                if waiter.future.done():
+                    continue
+                if ip_exhausted:
+                    kept.append(waiter)
+                    continue
+                ip_delay = self._ip_bucket.delay(now) if self._ip_bucket else 0.0
+                if ip_delay > 0:
+                    # Sem fichas por IP: ninguém de prioridade menor pode passar na frente
+                    ip_exhausted = True
+                    next_check = ip_delay if next_check is None else min(next_check, ip_delay)
+                    kept.append(waiter)
+                    continue
+                bucket = self._bucket(waiter.key, waiter.endpoint_class)
+                delay = bucket.delay(now) if bucket else 0.0
+                if delay > 0:
+                    next_check = delay if next_check is None else min(next_check, delay)
+                    kept.append(waiter)
+                    continue
+                if bucket:
+                    bucket.take(now)
+                if self._ip_bucket:
+                    self._ip_bucket.take(now)
+                waited = now - waiter.enqueued_at
+                stats = self._stats.setdefault(waiter.key, {"requests": 0, "wait_total": 0.0, "wait_max": 0.0})
+                stats["requests"] += 1
+                stats["wait_total"] += waited
+                stats["wait_max"] = max(stats["wait_max"], waited)
+                waiter.future.set_result(waited)
+            queue.extend(kept)
+        if next_check is not None:
+            self._timer = asyncio.get_running_loop().call_later(next_check, self._pump)
+
+    # Profundidade das filas, espera atual e histórica e situação dos baldes, por chave
+    def status(self) -> Dict:
+        now = time.monotonic()
+        keys: Dict[str, Dict] = {}
+
+        def entry(key: str) -> Dict:
+            if key not in keys:
+                stats = self._stats.get(key, {"requests": 0, "wait_total": 0.0, "wait_max": 0.0})
+                keys[key] = {
+                    "queue_depth": 0,
+                    "queued": {},
+                    "oldest_wait_ms": 0.0,
+                    "requests": int(stats["requests"]),
+                    "avg_wait_ms": round(stats["wait_total"] / stats["requests"] * 1000, 2) if stats["requests"] else 0.0,
+                    "max_wait_ms": round(stats["wait_max"] * 1000, 2),
+                    "buckets": {},
+                }
+            return keys[key]
+
+        for key in self._stats:
+            entry(key)
+        for (key, endpoint_class), bucket in self._buckets.items():
+            entry(key)["buckets"][endpoint_class] = bucket.status(now)
+        for queue in self._queues.values():
+            for waiter in queue:
+                if waiter.future.done():
+                    continue
+                item = entry(waiter.key)
+                item["queue_depth"] += 1
+                item["queued"][waiter.endpoint_class] = item["queued"].get(waiter.endpoint_class, 0) + 1
+                item["oldest_wait_ms"] = max(item["oldest_wait_ms"], round((now - waiter.enqueued_at) * 1000, 2))
+        return {
+            "ip": self._ip_bucket.status(now) if self._ip_bucket else None,
+            "keys": keys,
+        }
+
+
+# Versão síncrona mínima para os clientes bloqueantes (BybitService, BinanceService):
+# mesmos baldes por chave e classe, sem filas de prioridade (cada thread aguarda a sua ficha)
+class SyncRequestLimiter:
+    def __init__(self, class_limits: Mapping[str, float]):
+        self.class_limits = dict(class_limits)
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, endpoint_class: str) -> float:
+        if endpoint_class not in self.class_limits:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                bucket = self._buckets.get((key, endpoint_class))
+                if bucket is None:
+                    bucket = self._buckets[(key, endpoint_class)] = TokenBucket(self.class_limits[endpoint_class])
+                now = time.monotonic()
+                delay = bucket.delay(now)
+                if delay <= 0:
+                    bucket.take(now)
+                    return waited
+            time.sleep(delay)
+            waited += delay
@@ -0,0 +1,213 @@
+# ~/backend/services/shared_journal.py
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+from services.journal import JsonJournal
+
+logger = logging.getLogger(__name__)
+
+
+# JsonJournal compartilhado entre processos (uvicorn/gunicorn com --workers N).
+# - Toda escrita acontece com um flock exclusivo em <snapshot>.lock; antes de escrever, o processo
+#   lê as entradas que os outros gravaram, então nunca escreve sobre um estado velho.
+# - Cada processo acompanha o journal por um descritor de leitura próprio; poll() devolve as
+#   entradas novas ({"op": "put"|"delete"} ou {"op": "reset", "records": [...]}) para o IndexedStore aplicar.
+# - A primeira linha de cada journal identifica a sua geração. A compactação (síncrona, sob o lock)
+#   grava o snapshot a partir do disco e troca o journal por um novo, da geração seguinte; quem
+#   estava lendo o antigo termina de lê-lo pelo descritor aberto e segue para o novo. Se uma
+#   geração inteira foi perdida, o processo recarrega tudo.
+class SharedJsonJournal(JsonJournal):
+    def __init__(self, snapshot_path: str, primary_key: str = "id", fsync_interval: float = 0.05, compact_every: int = 10000):
+        super().__init__(snapshot_path, primary_key=primary_key, fsync_interval=fsync_interval, compact_every=compact_every)
+        self.lock_path = snapshot_path + ".lock"
+        self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._process_lock = threading.RLock()
+        self._lock_depth = 0
+        self._read_fd = None
+        self._read_offset = 0
+        self._generation = 0
+        # Entradas lidas do journal e ainda não entregues por poll()
+        self._pending: List[Dict] = []
+
+    # Lock exclusivo entre processos (reentrante dentro do processo)
+    @contextmanager
+    def lock(self):
+        with self._process_lock:
+            if self._lock_depth == 0:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def load(self) -> List[Dict]:
+        with self.lock():
+            self._pending = []
+            records = super().load()
+            self._open_reader()
+            return records
+
+    # Abre o journal para escrita; um journal novo começa com a linha da sua geração
+    def _open(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+            self._fd = None
+        super()._open()
+        if os.fstat(self._fd).st_size == 0:
+            os.write(self._fd, self._generation_line(self._generation + 1))
+
+    def _generation_line(self, generation: int) -> bytes:
+        return (json.dumps({"op": "generation", "gen": generation}) + "\n").encode("utf-8")
+
+    def _read_generation(self, fd: int) -> int:
+        first_line = os.pread(fd, 256, 0).split(b"\n", 1)[0]
+        try:
+            entry = json.loads(first_line)
+        except ValueError:
+            return 0
+        return entry.get("gen", 0) if entry.get("op") == "generation" else 0
+
+    # Posiciona o leitor no fim do journal atual (tudo até aqui já foi carregado)
+    def _open_reader(self):
+        if self._read_fd is not None:
+            os.close(self._read_fd)
+        self._read_fd = os.open(self.journal_path, os.O_RDONLY)
+        self._read_offset = os.fstat(self._read_fd).st_size
+        self._generation = self._read_generation(self._read_fd)
+
+    # Lê as linhas completas ainda não lidas do descritor atual
+    def _read_available(self):
+        size = os.fstat(self._read_fd).st_size
+        if size <= self._read_offset:
+            return
+        data = os.pread(self._read_fd, size - self._read_offset, self._read_offset)
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            entry = json.loads(line)
+            if entry["op"] == "generation":
+                continue
+            self._pending.append(entry)
+            self._entries_since_compaction += 1
+        self._read_offset += end
+
+    # Traz o processo para o fim do journal, seguindo as trocas de journal feitas por outros processos
+    def _catch_up(self):
+        if self._read_fd is None:
+            return
+        while True:
+            self._read_available()
+            try:
+                current_inode = os.stat(self.journal_path).st_ino
+            except FileNotFoundError:
+                return
+            if current_inode == os.fstat(self._read_fd).st_ino:
+                return
+            expected = self._generation + 1
+            os.close(self._read_fd)
+            self._read_fd = os.open(self.journal_path, os.O_RDONLY)
+            self._read_offset = 0
+            self._generation = self._read_generation(self._read_fd)
+            self._entries_since_compaction = 0
+            if self._generation != expected:
+                # Uma geração inteira passou sem ser lida: recarrega do disco
+                logger.warning("%s: journal da geração %s não foi acompanhado; recarregando", self.snapshot_path, expected)
+                self._pending = [{"op": "reset", "records": super().load()}]
+                self._open_reader()
+                return
+
+    # Entradas gravadas por outros processos desde a última chamada
+    def poll(self) -> List[Dict]:
+        if self._read_fd is None:
+            return []
+        # Verificação barata, sem lock: nada novo no journal atual e o journal não foi trocado
+        try:
+            unchanged = (
+                os.fstat(self._read_fd).st_size <= self._read_offset
+                and os.stat(self.journal_path).st_ino == os.fstat(self._read_fd).st_ino
+            )
+        except FileNotFoundError:
+            unchanged = True
+        if unchanged and not self._pending:
+            return []
+        with self.lock():
+            self._catch_up()
+            entries, self._pending = self._pending, []
+            return entries
+
+    def _append(self, entry: Dict):
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        with self.lock():
+            self._catch_up()
+            if self._fd is None or os.fstat(self._fd).st_ino != os.fstat(self._read_fd).st_ino:
+                self._open()
+            size = os.fstat(self._fd).st_size
+            if size > self._read_offset:
+                # Linha incompleta de um processo que caiu no meio da escrita
+                logger.warning("%s: descartando %d bytes incompletos no fim do journal", self.journal_path, size - self._read_offset)
+                os.truncate(self.journal_path, self._read_offset)
+            with self._lock:
+                os.write(self._fd, line)
+                if self.fsync_interval > 0:
+                    self._dirty = True
+                else:
+                    os.fsync(self._fd)
+            self._read_offset += len(line)
+            self._entries_since_compaction += 1
+            if self._entries_since_compaction >= self.compact_every:
+                self.compact()
+
+    # Grava o snapshot com o estado em disco e inicia um journal novo (geração seguinte)
+    def compact(self, wait: bool = True):
+        with self.lock():
+            self._catch_up()
+            self.flush()
+            records: Dict[Any, Dict] = {}
+            try:
+                with open(self.snapshot_path, "r") as file:
+                    for record in json.load(file):
+                        records[record[self.primary_key]] = record
+            except FileNotFoundError:
+                pass
+            for path in (self.compacting_path, self.journal_path):
+                self._replay(path, records)
+            self._write_snapshot_file(list(records.values()))
+            if os.path.exists(self.compacting_path):
+                os.remove(self.compacting_path)
+            tmp_path = self.journal_path + ".tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(self._generation_line(self._generation + 1))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.journal_path)
+            self._fsync_directory()
+            self._open()
+            self._open_reader()
+            self._entries_since_compaction = 0
+            logger.info("%s: snapshot compactado com %d registros (geração %s)", self.snapshot_path, len(records), self._generation)
+
+    def _write_snapshot_file(self, records: List[Dict]):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(records, file, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._fsync_directory()
+
+    def close(self):
+        super().close()
+        if self._read_fd is not None:
+            os.close(self._read_fd)
+            self._read_fd = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
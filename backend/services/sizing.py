@@ -0,0 +1,95 @@
+# ~/backend/services/sizing.py
+from decimal import Decimal
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Situação de cada ordem calculada
+SIZE_OK = 0
+SIZE_INVALID_PRICE = 1
+SIZE_BELOW_MIN = 2
+SIZE_ABOVE_MAX = 3
+
+# Casas usadas para eliminar o ruído de ponto flutuante antes do floor
+# (ex.: 0.3 / 0.1 = 2.9999999999999996 deve virar 3 passos, não 2)
+_NOISE_DECIMALS = 9
+_POW10 = 10.0 ** np.arange(_NOISE_DECIMALS + 1)
+
+
+class SizingResult(NamedTuple):
+    qty: np.ndarray          # quantidade final (múltiplo exato de qtyStep)
+    steps: np.ndarray        # quantidade em número de passos (int64)
+    decimals: np.ndarray     # casas decimais de cada qtyStep (para formatar a quantidade)
+    status: np.ndarray       # SIZE_OK ou o motivo da rejeição
+
+
+# Número de casas decimais de um passo (0.001 -> 3, 0.5 -> 1, 1 -> 0, 10 -> 0)
+def step_decimals(step: float) -> int:
+    exponent = Decimal(repr(float(step))).normalize().as_tuple().exponent
+    return max(0, -exponent)
+
+
+# Mesma conta de step_decimals, vetorizada: parte das casas da potência de 10 do passo
+# (0.001 -> 3) e acrescenta casas só onde o passo ainda não é inteiro (0.025 -> 3)
+def _decimals_for(steps: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        decimals = np.clip(np.ceil(-np.log10(steps) - 1e-9), 0, _NOISE_DECIMALS).astype(np.int64)
+    for _ in range(_NOISE_DECIMALS):
+        scaled = steps * _POW10[decimals]
+        inexact = (np.abs(scaled - np.round(scaled)) > 1e-9 * np.maximum(scaled, 1.0)) & (decimals < _NOISE_DECIMALS)
+        if not inexact.any():
+            break
+        decimals[inexact] += 1
+    return decimals
+
+
+# Calcula, em uma única passada vetorizada, a quantidade de todas as ordens:
+# (valor em USD [x alavancagem]) / preço, arredondado para baixo ao múltiplo de qtyStep,
+# e marca as rejeições por preço inválido ou quantidade fora de [minOrderQty, maxOrderQty].
+# O arredondamento é feito em inteiros (passos e unidades de 10^-casas), então a
+# quantidade resultante é o double mais próximo do valor decimal exato.
+def size_orders(amounts, prices, qty_steps, min_qtys, max_qtys, leverages=None) -> SizingResult:
+    amounts = np.asarray(amounts, dtype=np.float64)
+    prices = np.broadcast_to(np.asarray(prices, dtype=np.float64), amounts.shape)
+    qty_steps = np.asarray(qty_steps, dtype=np.float64)
+    min_qtys = np.broadcast_to(np.asarray(min_qtys, dtype=np.float64), amounts.shape)
+    max_qtys = np.broadcast_to(np.asarray(max_qtys, dtype=np.float64), amounts.shape)
+    notional = amounts if leverages is None else amounts * np.asarray(leverages, dtype=np.float64)
+
+    valid_price = np.isfinite(prices) & (prices > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raw_steps = np.where(valid_price, notional / np.where(valid_price, prices, 1.0) / qty_steps, 0.0)
+    steps = np.floor(np.round(raw_steps, _NOISE_DECIMALS))
+    steps = np.where(np.isfinite(steps) & (steps > 0), steps, 0).astype(np.int64)
+
+    if np.ndim(qty_steps) == 0:
+        decimals = np.full(amounts.shape, step_decimals(qty_steps), dtype=np.int64)
+    else:
+        decimals = _decimals_for(np.broadcast_to(qty_steps, amounts.shape))
+    scale = _POW10[decimals]
+    step_units = np.round(qty_steps * scale)
+    qty_units = steps * step_units
+    qty = qty_units / scale
+
+    min_units = np.round(min_qtys * scale)
+    max_units = np.round(max_qtys * scale)
+    status = np.full(amounts.shape, SIZE_OK, dtype=np.int8)
+    status[qty_units > max_units] = SIZE_ABOVE_MAX
+    status[qty_units < min_units] = SIZE_BELOW_MIN
+    status[~valid_price] = SIZE_INVALID_PRICE
+    return SizingResult(qty=qty, steps=steps, decimals=decimals, status=status)
+
+
+# Versão para uma única ordem; devolve (quantidade, status)
+def size_order(amount_in_usd: float, price: float, symbol_info: Dict, leverage: Optional[float] = None) -> Tuple[float, int]:
+    result = size_orders(
+        [amount_in_usd], [price],
+        symbol_info["qtyStep"], symbol_info["minOrderQty"], symbol_info["maxOrderQty"],
+        None if leverage is None else [leverage]
+    )
+    return float(result.qty[0]), int(result.status[0])
+
+
+# Formata a quantidade com as casas do qtyStep (a API não aceita notação científica)
+def format_qty(qty: float, qty_step: float) -> str:
+    return f"{qty:.{step_decimals(qty_step)}f}"
@@ -0,0 +1,171 @@
+# ~/backend/services/sql_persistence.py
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import selectinload
+
+from models.database import SessionLocal
+from models.user import Portfolio, PortfolioAsset, User
+
+logger = logging.getLogger(__name__)
+
+USER_COLUMNS = ("id", "name", "email", "phone", "username", "password", "created_at")
+# Colunas expostas pela API; Portfolio.status é interno do banco e não entra no registro
+PORTFOLIO_COLUMNS = ("id", "user_id", "name", "total_amount", "exchange", "api_key", "api_secret", "portfolioType", "created_at")
+
+
+def user_to_dict(user: User) -> Dict:
+    return {column: getattr(user, column) for column in USER_COLUMNS}
+
+
+def portfolio_to_dict(portfolio: Portfolio) -> Dict:
+    record = {column: getattr(portfolio, column) for column in PORTFOLIO_COLUMNS}
+    record["assets"] = [
+        {"symbol": asset.symbol, "amount_in_usd": asset.amount_in_usd, "leverage": asset.leverage}
+        for asset in sorted(portfolio.assets, key=lambda asset: asset.id)
+    ]
+    return record
+
+
+def user_row(record: Dict) -> Dict:
+    return {column: record.get(column) for column in USER_COLUMNS}
+
+
+# Sem "status", o merge mantém o valor gravado (ou o padrão da coluna, numa carteira nova)
+def portfolio_row(record: Dict) -> Dict:
+    row = {column: record.get(column) for column in PORTFOLIO_COLUMNS}
+    if record.get("status"):
+        row["status"] = record["status"]
+    return row
+
+
+def asset_rows(records: List[Dict]) -> List[Dict]:
+    return [
+        {"portfolio_id": record["id"], "symbol": asset["symbol"], "amount_in_usd": asset["amount_in_usd"], "leverage": asset["leverage"]}
+        for record in records
+        for asset in record["assets"]
+    ]
+
+
+# Escritas no banco feitas por uma thread própria, na ordem em que foram pedidas: put/delete só
+# montam as linhas, enfileiram e devolvem um Future, então o IndexedStore (chamado no loop de
+# eventos) não bloqueia no banco. A thread junta o que estiver na fila num único commit; se ele
+# falhar, refaz cada escrita no seu próprio commit para que só o Future da escrita ruim falhe.
+class _SqlWriter:
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.failed_writes = 0
+
+    def _submit(self, write: Callable, *args) -> Future:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"sql-writer:{type(self).__name__}", daemon=True)
+                self._thread.start()
+        future: Future = Future()
+        self._queue.put((future, write, args))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            writes = [item for item in batch if item is not None]
+            try:
+                self._commit(writes)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _commit(self, writes: List[tuple]):
+        if not writes:
+            return
+        try:
+            with self.session_factory.begin() as session:
+                for _, write, args in writes:
+                    write(session, *args)
+        except Exception as e:
+            if len(writes) > 1:
+                for item in writes:
+                    self._commit([item])
+                return
+            self.failed_writes += 1
+            logger.error("Erro ao gravar no banco (%s): %s", type(self).__name__, e)
+            writes[0][0].set_exception(e)
+            return
+        for future, _, _ in writes:
+            future.set_result(None)
+
+    def flush(self):
+        self._queue.join()
+
+    # Grava o que está na fila e encerra a thread; as conexões pertencem ao pool do engine
+    def close(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+
+# Persistência de usuários nos modelos SQLAlchemy (mesma interface do JsonJournal)
+class SqlUserPersistence(_SqlWriter):
+    def __init__(self, session_factory=SessionLocal):
+        super().__init__(session_factory)
+
+    def load(self) -> List[Dict]:
+        with self.session_factory() as session:
+            return [user_to_dict(user) for user in session.scalars(select(User).order_by(User.id))]
+
+    def put(self, record: Dict) -> Future:
+        return self._submit(self._put, user_row(record))
+
+    def _put(self, session, row: Dict):
+        session.merge(User(**row))
+
+    def delete(self, pk: Any) -> Future:
+        return self._submit(self._delete, pk)
+
+    def _delete(self, session, pk: Any):
+        session.execute(delete(User).where(User.id == pk))
+
+
+# Persistência de carteiras e seus ativos nos modelos SQLAlchemy
+class SqlPortfolioPersistence(_SqlWriter):
+    def __init__(self, session_factory=SessionLocal):
+        super().__init__(session_factory)
+
+    def load(self) -> List[Dict]:
+        with self.session_factory() as session:
+            query = select(Portfolio).options(selectinload(Portfolio.assets)).order_by(Portfolio.id)
+            return [portfolio_to_dict(portfolio) for portfolio in session.scalars(query)]
+
+    def put(self, record: Dict) -> Future:
+        return self._submit(self._put, record["id"], portfolio_row(record), asset_rows([record]))
+
+    def _put(self, session, pk: Any, row: Dict, assets: List[Dict]):
+        session.merge(Portfolio(**row))
+        session.execute(delete(PortfolioAsset).where(PortfolioAsset.portfolio_id == pk))
+        if assets:
+            # Inserção em lote de todos os ativos em um único executemany
+            session.execute(insert(PortfolioAsset), assets)
+
+    def delete(self, pk: Any) -> Future:
+        return self._submit(self._delete, pk)
+
+    def _delete(self, session, pk: Any):
+        session.execute(delete(PortfolioAsset).where(PortfolioAsset.portfolio_id == pk))
+        session.execute(delete(Portfolio).where(Portfolio.id == pk))
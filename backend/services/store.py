@@ -0,0 +1,187 @@
+# ~/backend/services/store.py
+import asyncio
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Um índice é o nome de um campo do registro ou um par (nome, função) que devolve
+# as chaves do registro naquele índice (permite índices compostos e multivalorados)
+IndexSpec = Union[str, Tuple[str, Callable[[Dict], Iterable]]]
+
+
+# Repositório em memória com índice por chave primária e índices secundários.
+# Todas as consultas são O(1); create, update e delete mantêm os índices consistentes.
+# Se houver uma camada de persistência (objeto com put(record) e delete(pk)), cada
+# mutação é repassada a ela. Se a persistência for compartilhada entre processos
+# (com lock() e poll()), as mutações acontecem sob o lock e depois de aplicar as
+# alterações dos outros processos. Se ela gravar em segundo plano (put/delete devolvem
+# um Future), confirm(pk) espera a gravação e desfaz a mutação na memória se ela falhar.
+class IndexedStore:
+    def __init__(self, records: Iterable[Dict] = (), primary_key: str = "id", indexes: Iterable[IndexSpec] = (), persistence=None):
+        self.primary_key = primary_key
+        self.persistence = persistence
+        self._records: Dict[Any, Dict] = {}
+        self._key_functions: Dict[str, Callable[[Dict], Iterable]] = {}
+        for spec in indexes:
+            if isinstance(spec, str):
+                self._key_functions[spec] = (lambda field: lambda record: (record.get(field),))(spec)
+            else:
+                name, key_function = spec
+                self._key_functions[name] = key_function
+        # índice -> valor -> {chave primária: registro}
+        self._indexes: Dict[str, Dict[Any, Dict[Any, Dict]]] = {name: {} for name in self._key_functions}
+        self._max_id = 0
+        # Chave primária -> (Future da última gravação, registro anterior ou None)
+        self._pending: Dict[Any, Tuple[Future, Optional[Dict]]] = {}
+        for record in records:
+            self._insert(record)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, pk: Any) -> bool:
+        return pk in self._records
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(list(self._records.values()))
+
+    def all(self) -> List[Dict]:
+        return list(self._records.values())
+
+    def get(self, pk: Any) -> Optional[Dict]:
+        return self._records.get(pk)
+
+    def find(self, index: str, value: Any) -> List[Dict]:
+        return list(self._indexes[index].get(value, {}).values())
+
+    def find_one(self, index: str, value: Any) -> Optional[Dict]:
+        matches = self._indexes[index].get(value)
+        if not matches:
+            return None
+        return next(iter(matches.values()))
+
+    def next_id(self) -> int:
+        return self._max_id + 1
+
+    def _add_to_indexes(self, pk: Any, record: Dict):
+        for name, key_function in self._key_functions.items():
+            index = self._indexes[name]
+            for value in key_function(record):
+                index.setdefault(value, {})[pk] = record
+
+    def _remove_from_indexes(self, pk: Any, record: Dict):
+        for name, key_function in self._key_functions.items():
+            index = self._indexes[name]
+            for value in key_function(record):
+                bucket = index.get(value)
+                if bucket is None:
+                    continue
+                bucket.pop(pk, None)
+                if not bucket:
+                    del index[value]
+
+    def _insert(self, record: Dict) -> Dict:
+        pk = record[self.primary_key]
+        if pk in self._records:
+            raise KeyError(f"Registro com {self.primary_key}={pk} já existe")
+        self._records[pk] = record
+        self._add_to_indexes(pk, record)
+        if isinstance(pk, int) and pk > self._max_id:
+            self._max_id = pk
+        return record
+
+    def _delete(self, pk: Any) -> Dict:
+        record = self._records.pop(pk)
+        self._remove_from_indexes(pk, record)
+        return record
+
+    # Aplica as alterações gravadas por outros processos; devolve quantas foram aplicadas
+    def sync(self) -> int:
+        poll = getattr(self.persistence, "poll", None)
+        if poll is None:
+            return 0
+        entries = poll()
+        for entry in entries:
+            self._apply(entry)
+        return len(entries)
+
+    def _apply(self, entry: Dict):
+        if entry["op"] == "put":
+            record = entry["record"]
+            pk = record[self.primary_key]
+            if pk in self._records:
+                self._delete(pk)
+            self._insert(record)
+        elif entry["op"] == "delete":
+            if entry["id"] in self._records:
+                self._delete(entry["id"])
+        elif entry["op"] == "reset":
+            self._records.clear()
+            for index in self._indexes.values():
+                index.clear()
+            self._max_id = 0
+            for record in entry["records"]:
+                self._insert(record)
+
+    # Bloco de leitura + escrita atômico entre processos (ex.: verificar unicidade e inserir).
+    # Sem persistência compartilhada, não faz nada além de executar o bloco.
+    @contextmanager
+    def transaction(self):
+        lock = getattr(self.persistence, "lock", None)
+        if lock is None:
+            yield self
+            return
+        with lock():
+            self.sync()
+            yield self
+
+    def _persist(self, pk: Any, previous: Optional[Dict], write):
+        if isinstance(write, Future):
+            self._pending[pk] = (write, previous)
+
+    # Espera a gravação pendente do registro; se falhou, volta a memória ao estado anterior
+    # à mutação e repassa o erro. Sem gravação pendente, retorna na hora.
+    async def confirm(self, pk: Any):
+        pending = self._pending.get(pk)
+        if pending is None:
+            return
+        write, previous = pending
+        try:
+            await asyncio.wrap_future(write)
+        except Exception:
+            if self._pending.get(pk) is pending:
+                if pk in self._records:
+                    self._delete(pk)
+                if previous is not None:
+                    self._insert(previous)
+            raise
+        finally:
+            if self._pending.get(pk) is pending:
+                del self._pending[pk]
+
+    def insert(self, record: Dict) -> Dict:
+        with self.transaction():
+            pk = record[self.primary_key]
+            self._insert(record)
+            if self.persistence is not None:
+                self._persist(pk, None, self.persistence.put(record))
+        return record
+
+    # Substitui o registro inteiro (o registro atualizado passa para o fim da ordem de inserção)
+    def update(self, pk: Any, record: Dict) -> Dict:
+        with self.transaction():
+            if pk not in self._records:
+                raise KeyError(pk)
+            record[self.primary_key] = pk
+            previous = self._delete(pk)
+            self._insert(record)
+            if self.persistence is not None:
+                self._persist(pk, previous, self.persistence.put(record))
+        return record
+
+    def delete(self, pk: Any) -> Dict:
+        with self.transaction():
+            record = self._delete(pk)
+            if self.persistence is not None:
+                self._persist(pk, record, self.persistence.delete(pk))
+        return record
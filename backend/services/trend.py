@@ -0,0 +1,311 @@
+# ~/backend/services/trend.py
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from services.ohlcv_store import INTERVAL_MS, OhlcvStore
+
+logger = logging.getLogger(__name__)
+
+TREND_UP = 1
+TREND_DOWN = -1
+TREND_NONE = 0
+
+TREND_NAMES = {TREND_UP: "up", TREND_DOWN: "down"}
+
+# Instantes processados por vez em TrendEngine.feed (limita a memória das matrizes símbolo x instante)
+FEED_CHUNK = 512
+
+
+# Virada de tendência de um símbolo no fechamento de um candle
+class TrendFlip(NamedTuple):
+    symbol: str
+    trend: str
+    ts: int
+    close: float
+    adx: float
+
+
+# Motor de tendência incremental para vários símbolos de uma vez. O estado de cada símbolo é O(1)
+# (EMAs, último candle e médias de Wilder do ATR/+DM/-DM/ADX), guardado em arrays NumPy; cada candle
+# novo atualiza todos os símbolos com operações vetorizadas, sem recalcular o histórico.
+# A tendência segue o cruzamento EMA rápida x lenta, mas só vira com ADX >= adx_threshold e com a
+# distância entre as EMAs de pelo menos atr_filter x ATR (filtra cruzamentos em mercado lateral).
+# Os primeiros `warmup` candles de cada símbolo só aquecem os indicadores.
+class TrendEngine:
+    def __init__(
+        self,
+        symbols: Iterable[str] = (),
+        fast: int = 9,
+        slow: int = 21,
+        period: int = 14,
+        adx_threshold: float = 20.0,
+        atr_filter: float = 0.0,
+    ):
+        self.fast_alpha = 2.0 / (fast + 1)
+        self.slow_alpha = 2.0 / (slow + 1)
+        self.wilder_alpha = 1.0 / period
+        self.adx_threshold = adx_threshold
+        self.atr_filter = atr_filter
+        self.warmup = max(slow, 2 * period)
+        self.symbols: List[str] = []
+        self.index: Dict[str, int] = {}
+        self._state: Dict[str, np.ndarray] = {name: np.empty(0, dtype=dtype) for name, dtype in self._fields()}
+        self.set_symbols(symbols)
+
+    @staticmethod
+    def _fields():
+        return (
+            ("count", np.int64), ("last_ts", np.int64), ("trend", np.int8),
+            ("ema_fast", np.float64), ("ema_slow", np.float64),
+            ("high", np.float64), ("low", np.float64), ("close", np.float64),
+            ("atr", np.float64), ("plus_dm", np.float64), ("minus_dm", np.float64), ("adx", np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    # Atualiza o universo de símbolos mantendo o estado dos que continuam
+    def set_symbols(self, symbols: Iterable[str]):
+        symbols = sorted(set(symbols))
+        if symbols == self.symbols:
+            return
+        positions = np.array([self.index.get(symbol, -1) for symbol in symbols], dtype=np.intp)
+        kept = positions >= 0
+        state = {}
+        for name, dtype in self._fields():
+            values = np.zeros(len(symbols), dtype=dtype)
+            if name == "last_ts":
+                values[:] = -1
+            values[kept] = self._state[name][positions[kept]]
+            state[name] = values
+        self._state = state
+        self.symbols = symbols
+        self.index = {symbol: position for position, symbol in enumerate(symbols)}
+
+    def last_ts(self, symbol: str) -> int:
+        return int(self._state["last_ts"][self.index[symbol]])
+
+    # Aplica um candle a cada símbolo marcado em `mask` (arrays alinhados com self.symbols);
+    # candles com ts não posterior ao último processado do símbolo são ignorados.
+    # Devolve as viradas de tendência ocorridas neste candle.
+    def update(self, ts: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray, mask: Optional[np.ndarray] = None) -> List[TrendFlip]:
+        s = self._state
+        active = ts > s["last_ts"]
+        if mask is not None:
+            active &= mask
+        if active.all():
+            # Todos os símbolos têm candle: fatias (visões) em vez de indexação por lista
+            idx = slice(None)
+        elif active.any():
+            idx = np.flatnonzero(active)
+        else:
+            return []
+        h, l, c = high[idx], low[idx], close[idx]
+        count = s["count"][idx]
+        first = count == 0
+        # Só há símbolos no primeiro candle durante o aquecimento; fora dele, nada a semear
+        seeding = bool(first.any())
+        alpha = self.wilder_alpha
+
+        # Média exponencial; no primeiro candle do símbolo, começa no próprio valor
+        def smooth(previous, value, weight):
+            updated = previous + weight * (value - previous)
+            return np.where(first, value, updated) if seeding else updated
+
+        prev_high, prev_low, prev_close = s["high"][idx], s["low"][idx], s["close"][idx]
+        true_range = np.maximum(h - l, np.maximum(np.abs(h - prev_close), np.abs(l - prev_close)))
+        up_move = h - prev_high
+        down_move = prev_low - l
+        if seeding:
+            true_range = np.where(first, h - l, true_range)
+            up_move = np.where(first, 0.0, up_move)
+            down_move = np.where(first, 0.0, down_move)
+        plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+        minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+        ema_fast = smooth(s["ema_fast"][idx], c, self.fast_alpha)
+        ema_slow = smooth(s["ema_slow"][idx], c, self.slow_alpha)
+        atr = smooth(s["atr"][idx], true_range, alpha)
+        plus_avg = smooth(s["plus_dm"][idx], plus_dm, alpha)
+        minus_avg = smooth(s["minus_dm"][idx], minus_dm, alpha)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            plus_di = np.where(atr > 0, 100.0 * plus_avg / atr, 0.0)
+            minus_di = np.where(atr > 0, 100.0 * minus_avg / atr, 0.0)
+            di_sum = plus_di + minus_di
+            dx = np.where(di_sum > 0, 100.0 * np.abs(plus_di - minus_di) / di_sum, 0.0)
+        adx = smooth(s["adx"][idx], dx, alpha)
+
+        count = count + 1
+        spread = ema_fast - ema_slow
+        direction = np.sign(spread).astype(np.int8)
+        trend = s["trend"][idx]
+        warm = count >= self.warmup
+        confirmed = warm & (adx >= self.adx_threshold) & (np.abs(spread) >= self.atr_filter * atr) & (direction != 0)
+        changed = confirmed & (direction != trend)
+        # A primeira tendência de um símbolo (após o aquecimento) só define o estado; sinal é virada
+        flipped = changed & (trend != TREND_NONE)
+        trend = np.where(changed, direction, trend)
+
+        s["count"][idx] = count
+        s["last_ts"][idx] = ts[idx]
+        s["trend"][idx] = trend
+        s["ema_fast"][idx] = ema_fast
+        s["ema_slow"][idx] = ema_slow
+        s["high"][idx], s["low"][idx], s["close"][idx] = h, l, c
+        s["atr"][idx] = atr
+        s["plus_dm"][idx] = plus_avg
+        s["minus_dm"][idx] = minus_avg
+        s["adx"][idx] = adx
+
+        if not flipped.any():
+            return []
+        positions = np.flatnonzero(flipped)
+        rows = positions if isinstance(idx, slice) else idx[positions]
+        return [
+            TrendFlip(self.symbols[row], TREND_NAMES[int(trend[k])], int(ts[row]), float(c[k]), round(float(adx[k]), 2))
+            for k, row in zip(positions.tolist(), rows.tolist())
+        ]
+
+    # Aplica candles em colunas (como devolvidos pelo OhlcvStore) de vários símbolos, em ordem de tempo.
+    # `candles`: símbolo -> {"ts", "high", "low", "close"}; devolve as viradas na ordem em que ocorreram.
+    def feed(self, candles: Dict[str, Dict[str, np.ndarray]]) -> List[TrendFlip]:
+        flips: List[TrendFlip] = []
+        self._replay(candles, lambda rows, positions, bar_flips: flips.extend(bar_flips))
+        return flips
+
+    # Como feed(), mas devolve a tendência de cada símbolo após cada um dos seus candles
+    # (arrays alinhados com candles[símbolo]["ts"]; 0 enquanto não há tendência)
+    def trend_history(self, candles: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        history = {symbol: np.zeros(len(columns["ts"]), dtype=np.int8) for symbol, columns in candles.items() if symbol in self.index}
+        rows = {self.index[symbol]: symbol for symbol in history}
+        trend = self._state["trend"]
+
+        def record(present_rows, positions, bar_flips):
+            for row, position in zip(present_rows, positions):
+                history[rows[row]][position] = trend[row]
+
+        self._replay(candles, record)
+        return history
+
+    # Alinha os candles em matrizes símbolo x instante (FEED_CHUNK instantes por vez) e aplica um
+    # instante de cada vez; on_bar(linhas com candle, posição do candle em cada série, viradas)
+    def _replay(self, candles: Dict[str, Dict[str, np.ndarray]], on_bar: Callable):
+        candles = {symbol: columns for symbol, columns in candles.items() if symbol in self.index and len(columns["ts"])}
+        if not candles:
+            return
+        timestamps = np.unique(np.concatenate([columns["ts"] for columns in candles.values()]))
+        size = len(self.symbols)
+        for chunk_start in range(0, len(timestamps), FEED_CHUNK):
+            chunk = timestamps[chunk_start:chunk_start + FEED_CHUNK]
+            present = np.zeros((size, len(chunk)), dtype=bool)
+            # Posição de cada candle na série do seu símbolo (para on_bar)
+            offsets = np.zeros((size, len(chunk)), dtype=np.int64)
+            grids = {name: np.zeros((size, len(chunk))) for name in ("high", "low", "close")}
+            for symbol, columns in candles.items():
+                first = int(np.searchsorted(columns["ts"], chunk[0], side="left"))
+                last = int(np.searchsorted(columns["ts"], chunk[-1], side="right"))
+                if first == last:
+                    continue
+                row = self.index[symbol]
+                positions = np.searchsorted(chunk, columns["ts"][first:last])
+                present[row, positions] = True
+                offsets[row, positions] = np.arange(first, last)
+                for name, grid in grids.items():
+                    grid[row, positions] = columns[name][first:last]
+            for column, instant in enumerate(chunk):
+                ts = np.full(size, instant, dtype=np.int64)
+                bar_flips = self.update(ts, grids["high"][:, column], grids["low"][:, column], grids["close"][:, column], present[:, column])
+                rows = np.flatnonzero(present[:, column])
+                on_bar(rows, offsets[rows, column], bar_flips)
+
+    # Tendência atual e indicadores de cada símbolo já aquecido
+    def trends(self) -> Dict[str, Dict]:
+        s = self._state
+        return {
+            symbol: {
+                "trend": TREND_NAMES.get(int(s["trend"][position])),
+                "ts": int(s["last_ts"][position]),
+                "close": float(s["close"][position]),
+                "ema_fast": round(float(s["ema_fast"][position]), 8),
+                "ema_slow": round(float(s["ema_slow"][position]), 8),
+                "atr": round(float(s["atr"][position]), 8),
+                "adx": round(float(s["adx"][position]), 2),
+            }
+            for position, symbol in enumerate(self.symbols)
+            if s["count"][position] >= self.warmup
+        }
+
+
+# Acompanha as tendências de cada timeframe do cryptos.json ("daily", "intraday") sobre as séries
+# locais de candles: a cada sincronização, alimenta os motores só com os candles novos.
+# Viradas recentes (candle fechado há no máximo um intervalo) são entregues a `on_flip`;
+# as ocorridas no histórico (aquecimento, recuperação após uma parada) apenas ficam registradas.
+class TrendMonitor:
+    def __init__(
+        self,
+        store: OhlcvStore,
+        timeframes: Dict[str, Tuple[str, Callable[[], Iterable[str]]]],
+        on_flip: Optional[Callable[[str, TrendFlip], Awaitable]] = None,
+        history_size: int = 500,
+        **engine_options,
+    ):
+        self.store = store
+        # timeframe -> (intervalo dos candles, função que devolve os símbolos)
+        self.timeframes = dict(timeframes)
+        self.engines = {timeframe: TrendEngine(**engine_options) for timeframe in self.timeframes}
+        self.on_flip = on_flip
+        self.history: Deque[Dict] = deque(maxlen=history_size)
+        self._lock = asyncio.Lock()
+        self.last_update: Optional[Dict] = None
+
+    def _advance(self, timeframe: str) -> List[TrendFlip]:
+        interval, symbols = self.timeframes[timeframe]
+        engine = self.engines[timeframe]
+        engine.set_symbols(symbols())
+        candles = {
+            symbol: self.store.range(symbol, interval, engine.last_ts(symbol) + 1)
+            for symbol in engine.symbols
+        }
+        return engine.feed(candles)
+
+    # Processa os candles novos de todos os timeframes; devolve as viradas encontradas
+    async def update(self) -> List[Dict]:
+        async with self._lock:
+            started_at = time.perf_counter()
+            now_ms = time.time() * 1000
+            found = []
+            for timeframe, (interval, _) in self.timeframes.items():
+                for flip in await asyncio.to_thread(self._advance, timeframe):
+                    # Candle fechado há no máximo um intervalo: virada atual, não histórica
+                    live = flip.ts + 2 * INTERVAL_MS[interval] >= now_ms
+                    event = {"timeframe": timeframe, **flip._asdict(), "live": live}
+                    self.history.append(event)
+                    found.append(event)
+                    if live and self.on_flip is not None:
+                        try:
+                            await self.on_flip(timeframe, flip)
+                        except Exception as e:
+                            logger.error("Erro ao tratar a virada de %s (%s): %s", flip.symbol, timeframe, e)
+            self.last_update = {
+                "flips": len(found),
+                "live_flips": sum(1 for event in found if event["live"]),
+                "duration_ms": round((time.perf_counter() - started_at) * 1000, 2),
+            }
+            return found
+
+    def trends(self, timeframe: str) -> Dict[str, Dict]:
+        return self.engines[timeframe].trends()
+
+    def status(self) -> Dict:
+        return {
+            "timeframes": {
+                timeframe: {"interval": interval, "symbols": len(self.engines[timeframe]), "warm": len(self.engines[timeframe].trends())}
+                for timeframe, (interval, _) in self.timeframes.items()
+            },
+            "last_update": self.last_update,
+        }
@@ -0,0 +1,339 @@
+# ~/backend/services/valuation.py
+import asyncio
+import logging
+import time
+from datetime import date, datetime, time as dt_time, timedelta, tzinfo
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+
+from models.database import SessionLocal
+from models.user import PortfolioPerformance
+
+logger = logging.getLogger(__name__)
+
+HOUR_MS = 3600 * 1000
+
+# Máximo de candles por requisição de /v5/market/kline
+KLINE_PAGE_LIMIT = 1000
+
+
+# Preços de todos os símbolos em um instante de avaliação e 24h antes dele
+class PriceTable(NamedTuple):
+    index: Dict[str, int]
+    price: np.ndarray
+    previous: np.ndarray
+
+    # Variação em 24h de cada símbolo (NaN quando falta algum dos preços)
+    def returns(self) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = self.price / self.previous - 1.0
+        result[~np.isfinite(result)] = np.nan
+        return result
+
+
+# Tabela a partir de /v5/market/tickers?category=linear (todos os contratos em uma única chamada):
+# lastPrice é o preço no instante da avaliação e prevPrice24h o de 24h antes
+def price_table_from_tickers(items: Iterable[Dict]) -> PriceTable:
+    index: Dict[str, int] = {}
+    prices: List[float] = []
+    previous: List[float] = []
+    for item in items:
+        index[item["symbol"]] = len(prices)
+        prices.append(float(item.get("lastPrice") or "nan"))
+        previous.append(float(item.get("prevPrice24h") or "nan"))
+    return PriceTable(index, np.array(prices, dtype=np.float64), np.array(previous, dtype=np.float64))
+
+
+# Tabela a partir de candles de 1h ([início ms, abertura, máxima, mínima, fechamento, ...]) por símbolo:
+# o preço em um instante é o fechamento do candle que termina nele
+def price_table_from_klines(klines: Dict[str, Dict[int, float]], instant_ms: int) -> PriceTable:
+    index: Dict[str, int] = {}
+    prices = np.full(len(klines), np.nan)
+    previous = np.full(len(klines), np.nan)
+    for position, (symbol, closes) in enumerate(klines.items()):
+        index[symbol] = position
+        prices[position] = closes.get(instant_ms - HOUR_MS, np.nan)
+        previous[position] = closes.get(instant_ms - 25 * HOUR_MS, np.nan)
+    return PriceTable(index, prices, previous)
+
+
+# Lado da posição de cada ativo
+SIDE_LONG = 1
+SIDE_SHORT = -1
+
+# Base da avaliação, devolvida junto com o status e os resumos
+VALUATION_BASIS = (
+    "amount_in_usd é o nocional da posição (a alavancagem só muda a margem); lado pela tendência "
+    "atual do timeframe da carteira (sinal), comprado quando a tendência não é conhecida"
+)
+
+
+# Carteiras em colunas: uma linha por carteira (id, valor inicial) e uma por ativo
+# (índice da carteira, código do símbolo, valor alocado em USD, lado da posição)
+class PortfolioBook(NamedTuple):
+    portfolio_ids: np.ndarray
+    initial_values: np.ndarray
+    asset_portfolio: np.ndarray
+    asset_symbol: np.ndarray
+    asset_amount: np.ndarray
+    asset_side: np.ndarray
+    symbols: List[str]
+    # Ativos sem lado conhecido, avaliados como comprados
+    assumed_long: int
+
+
+# `sides` dá o lado (SIDE_LONG/SIDE_SHORT) por (portfolioType, símbolo)
+def build_book(portfolios: Iterable[Dict], sides: Optional[Dict[Tuple[str, str], int]] = None) -> PortfolioBook:
+    sides = sides or {}
+    portfolio_ids: List[int] = []
+    initial_values: List[float] = []
+    asset_portfolio: List[int] = []
+    asset_symbol: List[int] = []
+    asset_amount: List[float] = []
+    asset_side: List[int] = []
+    assumed_long = 0
+    codes: Dict[str, int] = {}
+    for position, portfolio in enumerate(portfolios):
+        portfolio_ids.append(portfolio["id"])
+        initial_values.append(float(portfolio.get("total_amount") or 0.0))
+        for asset in portfolio.get("assets") or ():
+            asset_portfolio.append(position)
+            asset_symbol.append(codes.setdefault(asset["symbol"], len(codes)))
+            asset_amount.append(float(asset["amount_in_usd"]))
+            side = sides.get((portfolio.get("portfolioType"), asset["symbol"]))
+            if side is None:
+                side = SIDE_LONG
+                assumed_long += 1
+            asset_side.append(side)
+    return PortfolioBook(
+        np.array(portfolio_ids, dtype=np.int64),
+        np.array(initial_values, dtype=np.float64),
+        np.array(asset_portfolio, dtype=np.intp),
+        np.array(asset_symbol, dtype=np.intp),
+        np.array(asset_amount, dtype=np.float64),
+        np.array(asset_side, dtype=np.float64),
+        list(codes),
+        assumed_long,
+    )
+
+
+# Avalia todas as carteiras de uma vez. Cada ativo mantém o valor alocado (amount_in_usd), como no
+# rebalanceamento, e esse valor é o nocional da posição (a ordem compra amount_in_usd / preço; a
+# alavancagem reduz a margem, não o resultado em USD). O resultado do dia é o lado vezes o nocional
+# vezes a variação do preço em 24h; o valor da carteira é o do snapshot anterior mais a soma dos
+# resultados dos seus ativos. Devolve os novos valores e o número de ativos sem preço (avaliados sem variação).
+def value_portfolios(book: PortfolioBook, table: PriceTable, previous_values: np.ndarray):
+    symbol_returns = table.returns()
+    # Variação de cada código de símbolo da carteira (NaN para os símbolos sem cotação)
+    by_code = np.array(
+        [symbol_returns[table.index[symbol]] if symbol in table.index else np.nan for symbol in book.symbols],
+        dtype=np.float64,
+    )
+    asset_returns = by_code[book.asset_symbol] if len(by_code) else np.zeros(0)
+    missing = np.isnan(asset_returns)
+    pnl = np.bincount(
+        book.asset_portfolio,
+        weights=np.where(missing, 0.0, book.asset_side * book.asset_amount * asset_returns),
+        minlength=len(book.portfolio_ids),
+    )
+    return previous_values + pnl, int(missing.sum())
+
+
+# Último valor registrado de cada carteira antes da data (ou o valor inicial, se não houver snapshot)
+def load_previous_values(session, book: PortfolioBook, day: str) -> np.ndarray:
+    latest = (
+        select(PortfolioPerformance.portfolio_id, func.max(PortfolioPerformance.date).label("date"))
+        .where(PortfolioPerformance.date < day)
+        .group_by(PortfolioPerformance.portfolio_id)
+        .subquery()
+    )
+    rows = session.execute(
+        select(PortfolioPerformance.portfolio_id, PortfolioPerformance.total_value).join(
+            latest,
+            (PortfolioPerformance.portfolio_id == latest.c.portfolio_id) & (PortfolioPerformance.date == latest.c.date),
+        )
+    )
+    known = dict(rows.all())
+    values = book.initial_values.copy()
+    if known:
+        for position, portfolio_id in enumerate(book.portfolio_ids.tolist()):
+            value = known.get(portfolio_id)
+            if value is not None:
+                values[position] = value
+    return values
+
+
+# Grava um snapshot por carteira para a data (substituindo os de uma execução anterior) em um único executemany
+def write_snapshots(session, book: PortfolioBook, day: str, values: np.ndarray):
+    session.execute(delete(PortfolioPerformance).where(PortfolioPerformance.date == day))
+    if len(book.portfolio_ids):
+        session.execute(
+            insert(PortfolioPerformance.__table__),
+            [
+                {"portfolio_id": portfolio_id, "date": day, "total_value": round(value, 8)}
+                for portfolio_id, value in zip(book.portfolio_ids.tolist(), values.tolist())
+            ],
+        )
+
+
+# Job de avaliação diária das carteiras (PortfolioPerformance, "valor atualizado às 21h").
+# No horário configurado, busca todos os tickers lineares em uma chamada, avalia as carteiras em lote
+# e grava um snapshot por carteira. Dias sem snapshot dentro de `backfill_days` (ex.: servidor
+# fora do ar) são reconstruídos com candles de 1h, uma requisição por símbolo para todo o período.
+# `load_sides` devolve o lado atual das posições (ver build_book); os dias reconstruídos usam o
+# mesmo lado. Com vários processos, a execução agendada só acontece onde `is_owner` devolve True.
+class ValuationJob:
+    def __init__(
+        self,
+        load_portfolios: Callable[[], List[Dict]],
+        fetch_tickers: Callable[[], Awaitable[List[Dict]]],
+        fetch_klines: Callable[[str, int, int], Awaitable[List[List]]],
+        timezone: tzinfo,
+        hour: int = 21,
+        backfill_days: int = 7,
+        session_factory=SessionLocal,
+        load_sides: Optional[Callable[[], Dict[Tuple[str, str], int]]] = None,
+        is_owner: Callable[[], bool] = lambda: True,
+    ):
+        self._load_portfolios = load_portfolios
+        self._fetch_tickers = fetch_tickers
+        self._fetch_klines = fetch_klines
+        self.timezone = timezone
+        self.hour = hour
+        self.backfill_days = backfill_days
+        self.session_factory = session_factory
+        self._load_sides = load_sides
+        self.is_owner = is_owner
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[Dict] = None
+
+    # Instante da avaliação de uma data (hora configurada no fuso configurado), em ms
+    def instant_ms(self, day: date) -> int:
+        return int(datetime.combine(day, dt_time(self.hour), tzinfo=self.timezone).timestamp() * 1000)
+
+    # Data da avaliação mais recente já ocorrida
+    def latest_day(self, now: Optional[datetime] = None) -> date:
+        now = now or datetime.now(self.timezone)
+        local = now.astimezone(self.timezone)
+        return local.date() if local.hour >= self.hour else local.date() - timedelta(days=1)
+
+    def _valued_days(self, since: str) -> set:
+        with self.session_factory() as session:
+            return set(session.scalars(select(PortfolioPerformance.date).where(PortfolioPerformance.date >= since).distinct()))
+
+    # Datas sem snapshot entre as últimas `days` avaliações
+    def missing_days(self, days: Optional[int] = None) -> List[date]:
+        latest = self.latest_day()
+        candidates = [latest - timedelta(days=offset) for offset in range((days or self.backfill_days) - 1, -1, -1)]
+        valued = self._valued_days(candidates[0].isoformat())
+        return [day for day in candidates if day.isoformat() not in valued]
+
+    # Candles de 1h de cada símbolo cobrindo [início, fim], paginados por KLINE_PAGE_LIMIT horas
+    async def _load_klines(self, symbols: List[str], start_ms: int, end_ms: int) -> Dict[str, Dict[int, float]]:
+        async def load(symbol: str) -> Dict[int, float]:
+            closes: Dict[int, float] = {}
+            page_start = start_ms
+            while page_start <= end_ms:
+                page_end = min(end_ms, page_start + (KLINE_PAGE_LIMIT - 1) * HOUR_MS)
+                for candle in await self._fetch_klines(symbol, page_start, page_end):
+                    closes[int(candle[0])] = float(candle[4])
+                page_start = page_end + HOUR_MS
+            return closes
+
+        results = await asyncio.gather(*(load(symbol) for symbol in symbols), return_exceptions=True)
+        klines = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                logger.warning("Sem candles de %s para a avaliação: %s", symbol, result)
+                continue
+            klines[symbol] = result
+        return klines
+
+    # Avalia as carteiras nas datas informadas (em ordem), cada uma com o snapshot anterior como base
+    async def run(self, days: List[date]) -> List[Dict]:
+        async with self._lock:
+            days = sorted(set(days))
+            if not days:
+                return []
+            book = build_book(self._load_portfolios(), self._load_sides() if self._load_sides else None)
+            tables: Dict[date, PriceTable] = {}
+            live_day = self.latest_day()
+            if live_day in days and time.time() * 1000 - self.instant_ms(live_day) < HOUR_MS:
+                # Execução no horário: preços atuais de todos os contratos em uma única chamada
+                tables[live_day] = price_table_from_tickers(await self._fetch_tickers())
+            history = [day for day in days if day not in tables]
+            if history:
+                first, last = self.instant_ms(history[0]), self.instant_ms(history[-1])
+                klines = await self._load_klines(book.symbols, first - 25 * HOUR_MS, last - HOUR_MS)
+                for day in history:
+                    tables[day] = price_table_from_klines(klines, self.instant_ms(day))
+            summaries = []
+            for day in days:
+                summaries.append(await asyncio.to_thread(self._value_day, book, tables[day], day.isoformat()))
+            self.last_run = summaries[-1]
+            return summaries
+
+    def _value_day(self, book: PortfolioBook, table: PriceTable, day: str) -> Dict:
+        started_at = time.perf_counter()
+        with self.session_factory.begin() as session:
+            previous = load_previous_values(session, book, day)
+            values, missing = value_portfolios(book, table, previous)
+            write_snapshots(session, book, day, values)
+        summary = {
+            "date": day,
+            "portfolios": len(book.portfolio_ids),
+            "assets": len(book.asset_amount),
+            "short_assets": int((book.asset_side == SIDE_SHORT).sum()),
+            "assumed_long_assets": book.assumed_long,
+            "unpriced_assets": missing,
+            "total_value": round(float(values.sum()), 2) if len(values) else 0.0,
+            "duration_ms": round((time.perf_counter() - started_at) * 1000, 2),
+        }
+        logger.info("Avaliação de %s: %d carteiras em %s ms (%d ativos sem preço)", day, summary["portfolios"], summary["duration_ms"], missing)
+        return summary
+
+    # Reconstrói as datas sem snapshot dentro da janela de backfill
+    async def backfill(self, days: Optional[int] = None) -> List[Dict]:
+        missing = await asyncio.to_thread(self.missing_days, days)
+        if missing:
+            logger.info("Backfill da avaliação: %s", ", ".join(day.isoformat() for day in missing))
+        return await self.run(missing)
+
+    async def _run(self):
+        while True:
+            try:
+                if self.is_owner():
+                    await self.backfill()
+            except Exception as e:
+                logger.error("Erro na avaliação diária das carteiras: %s", e)
+            # Dorme até o próximo horário de avaliação
+            next_instant = self.instant_ms(self.latest_day() + timedelta(days=1)) / 1000
+            await asyncio.sleep(max(1.0, next_instant - time.time()))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict:
+        return {
+            "hour": self.hour,
+            "timezone": str(self.timezone),
+            "backfill_days": self.backfill_days,
+            "basis": VALUATION_BASIS,
+            "owner": self.is_owner(),
+            "latest_day": self.latest_day().isoformat(),
+            "running": self._lock.locked(),
+            "last_run": self.last_run,
+        }
@@ -0,0 +1,111 @@
+# ~/backend/tests/conftest.py
+# Testes de fumaça contra o servidor falso da Bybit (benchmarks.fake_bybit): o servidor sobe num
+# processo próprio e o backend roda no TestClient, num diretório temporário e apontado para ele.
+# Uso (a partir de backend/): python -m pytest -q tests
+import itertools
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Ids e chaves únicos por carteira: o servidor falso guarda posições e ordens por chave de API
+_portfolio_ids = itertools.count(int(time.time()) % 1_000_000 * 1000)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def fake_bybit():
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_bybit", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT,
+    )
+    client = httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=10.0)
+    deadline = time.monotonic() + 20
+    while True:
+        try:
+            client.get("/fake/stats").raise_for_status()
+            break
+        except httpx.HTTPError:
+            if time.monotonic() > deadline or process.poll() is not None:
+                process.kill()
+                raise RuntimeError("O servidor falso da Bybit não respondeu a tempo")
+            time.sleep(0.1)
+    try:
+        yield client
+    finally:
+        client.close()
+        process.terminate()
+        process.wait(timeout=10)
+
+
+@pytest.fixture(scope="session")
+def api(fake_bybit, tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("backend")
+    shutil.copy(os.path.join(BACKEND_DIR, "cryptos.json"), workdir)
+    base_url = str(fake_bybit.base_url).rstrip("/")
+    os.environ.update(
+        BYBIT_BASE_URL=base_url,
+        BYBIT_WS_PUBLIC_URL=base_url.replace("http://", "ws://") + "/v5/public/linear",
+        STORAGE_BACKEND="json",
+        JOB_QUEUE_PATH=str(workdir / "jobs.db"),
+        JOB_RETRY_DELAY="0.2",
+        DATABASE_URL=f"sqlite:///{workdir / 'portfolios.db'}",
+        LEADER_LOCK_PATH=str(workdir / "leader.lock"),
+        OHLCV_ENABLED="false",
+        VALUATION_ENABLED="false",
+        LOG_LEVEL="WARNING",
+    )
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import app as backend
+        from fastapi.testclient import TestClient
+
+        with TestClient(backend.app) as client:
+            client.backend = backend
+            yield client
+    finally:
+        os.chdir(previous_dir)
+
+
+@pytest.fixture(scope="session")
+def user_id(api):
+    response = api.post("/signup", json={"name": "Smoke", "email": f"smoke-{time.time_ns()}@example.com", "phone": "0"})
+    response.raise_for_status()
+    return response.json()["user_id"]
+
+
+# Cria uma carteira com chave própria; devolve o registro enviado
+@pytest.fixture
+def create_portfolio(api, user_id):
+    def create(assets, exchange="Bybit", portfolio_type="daily"):
+        portfolio_id = next(_portfolio_ids)
+        portfolio = {
+            "id": portfolio_id,
+            "user_id": user_id,
+            "name": f"smoke-{portfolio_id}",
+            "total_amount": 100000.0,
+            "exchange": exchange,
+            "api_key": f"smoke-key-{portfolio_id}",
+            "api_secret": "smoke-secret",
+            "portfolioType": portfolio_type,
+            "assets": assets,
+        }
+        api.post(f"/portfolios/{user_id}", json=portfolio).raise_for_status()
+        return portfolio
+
+    return create
@@ -0,0 +1,144 @@
+# ~/backend/tests/test_smoke.py
+# Caminhos de ordem de ponta a ponta contra o servidor falso: ordem direta, nova tentativa sem ordem
+# duplicada, rebalanceamento em lote e carteira simulada ("Paper")
+import time
+
+import pytest
+
+
+def fake_orders(fake_bybit, **match):
+    return [order for order in fake_bybit.get("/fake/orders").json() if all(order.get(k) == v for k, v in match.items())]
+
+
+def fake_position(fake_bybit, api_key: str, symbol: str) -> float:
+    response = fake_bybit.get("/v5/position/list", params={"symbol": symbol}, headers={"X-BAPI-API-KEY": api_key})
+    item = response.json()["result"]["list"][0]
+    size = float(item["size"])
+    return size if item["side"] == "Buy" else -size
+
+
+def wait_job(api, job_id: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = api.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_signal_places_market_order(api, fake_bybit, create_portfolio):
+    portfolio = create_portfolio([{"symbol": "BTCUSDT", "amount_in_usd": 1000.0, "leverage": 2}])
+
+    response = api.post(f"/signal/{portfolio['id']}", json={"symbol": "BTCUSDT", "trend": "up", "amount_in_usd": 1000.0, "leverage": 2})
+
+    assert response.status_code == 200, response.text
+    result = response.json()["bybit_response"]
+    assert result["retCode"] == 0
+    [order] = fake_orders(fake_bybit, orderId=result["result"]["orderId"])
+    assert order["side"] == "Buy"
+    assert float(order["qty"]) > 0
+    assert fake_position(fake_bybit, portfolio["api_key"], "BTCUSDT") == pytest.approx(float(order["qty"]))
+
+
+def test_repeated_order_link_id_resolves_to_the_first_order(api, fake_bybit, create_portfolio):
+    portfolio = create_portfolio([{"symbol": "ETHUSDT", "amount_in_usd": 1000.0, "leverage": 1}])
+    place = lambda: api.portal.call(
+        api.backend.place_order, portfolio["api_key"], portfolio["api_secret"], "ETHUSDT", "up", "0.01", "smoke-dup-1"
+    )
+
+    first, second = place(), place()
+
+    assert second["retCode"] == 0
+    assert second["result"]["orderId"] == first["result"]["orderId"]
+    assert len(fake_orders(fake_bybit, orderLinkId="smoke-dup-1")) == 1
+
+
+def test_retried_signal_job_does_not_duplicate_the_order(api, fake_bybit, create_portfolio):
+    portfolio = create_portfolio([{"symbol": "SOLUSDT", "amount_in_usd": 1000.0, "leverage": 1}])
+    # A primeira ordem é executada, mas a resposta se perde (HTTP 502): o job tenta de novo
+    fake_bybit.post("/fake/config", json={"lost_order_responses": 1}).raise_for_status()
+
+    response = api.post(f"/signal/{portfolio['id']}/jobs", json={"symbol": "SOLUSDT", "trend": "down", "amount_in_usd": 1000.0, "leverage": 1})
+
+    assert response.status_code == 202, response.text
+    job = wait_job(api, response.json()["job_id"])
+    assert job["status"] == "succeeded", job
+    assert job["attempts"] == 2
+    [order] = fake_orders(fake_bybit, orderLinkId=response.json()["order_link_id"])
+    assert job["result"]["bybit_response"]["result"]["orderId"] == order["orderId"]
+    assert fake_position(fake_bybit, portfolio["api_key"], "SOLUSDT") == pytest.approx(-float(order["qty"]))
+
+
+def test_rebalance_sends_batch_and_reports_leg_errors(api, fake_bybit, create_portfolio):
+    portfolio = create_portfolio([
+        {"symbol": "BTCUSDT", "amount_in_usd": 30000.0, "leverage": 2},
+        {"symbol": "ETHUSDT", "amount_in_usd": 20000.0, "leverage": 3},
+        # Alavancagem recusada pela exchange: só este ativo falha
+        {"symbol": "XRPUSDT", "amount_in_usd": 10000.0, "leverage": 200},
+    ])
+    key = portfolio["api_key"]
+
+    up = api.post(f"/portfolios/{portfolio['id']}/rebalance", json={"trend": "up"})
+
+    assert up.status_code == 200, up.text
+    legs = {leg["symbol"]: leg for leg in up.json()["legs"]}
+    assert legs["XRPUSDT"]["status"] == "error"
+    assert "Alavancagem inválida" in legs["XRPUSDT"]["detail"]
+    for symbol in ("BTCUSDT", "ETHUSDT"):
+        assert legs[symbol]["status"] == "ok"
+        assert legs[symbol]["side"] == "Buy"
+        assert fake_position(fake_bybit, key, symbol) == pytest.approx(legs[symbol]["target_qty"])
+
+    down = api.post(f"/portfolios/{portfolio['id']}/rebalance", json={"trend": "down"})
+
+    assert down.status_code == 200, down.text
+    for leg in down.json()["legs"]:
+        if leg["symbol"] == "XRPUSDT":
+            continue
+        assert leg["status"] == "ok"
+        assert leg["side"] == "Sell"
+        assert leg["current_qty"] == pytest.approx(legs[leg["symbol"]]["target_qty"])
+        assert fake_position(fake_bybit, key, leg["symbol"]) == pytest.approx(leg["current_qty"] - leg["order_qty"])
+        assert fake_position(fake_bybit, key, leg["symbol"]) < 0
+
+
+def test_paper_portfolio_fills_without_sending_orders(api, fake_bybit, create_portfolio):
+    portfolio = create_portfolio([{"symbol": "BTCUSDT", "amount_in_usd": 1000.0, "leverage": 1}], exchange="Paper")
+    orders_before = len(fake_bybit.get("/fake/orders").json())
+
+    response = api.post(f"/signal/{portfolio['id']}", json={"symbol": "BTCUSDT", "trend": "up", "amount_in_usd": 1000.0, "leverage": 1})
+
+    assert response.status_code == 200, response.text
+    account = api.get(f"/portfolios/{portfolio['id']}/paper").json()
+    assert account["positions"]["BTCUSDT"]["qty"] > 0
+    assert account["fees"] > 0
+    assert len(fake_bybit.get("/fake/orders").json()) == orders_before
+
+
+@pytest.mark.parametrize("path", ["/signal/broadcast", "/signal/{id}"])
+def test_signal_rejects_unknown_trend(api, fake_bybit, create_portfolio, path):
+    portfolio = create_portfolio([{"symbol": "BTCUSDT", "amount_in_usd": 1000.0, "leverage": 1}])
+    orders_before = len(fake_bybit.get("/fake/orders").json())
+    body = {"symbol": "BTCUSDT", "trend": "UP", "amount_in_usd": 1000.0, "leverage": 1, "portfolioType": "daily"}
+
+    response = api.post(path.format(id=portfolio["id"]), json=body)
+
+    assert response.status_code == 400, response.text
+    assert len(fake_bybit.get("/fake/orders").json()) == orders_before
+
+
+def test_backtest_rejects_symbols_outside_the_ohlcv_root(api, create_portfolio):
+    portfolio = create_portfolio([{"symbol": "../../escaped", "amount_in_usd": 1000.0, "leverage": 1}], exchange="Paper")
+
+    response = api.post(f"/portfolios/{portfolio['id']}/backtest", json={})
+
+    assert response.status_code == 400, response.text
+    with pytest.raises(ValueError):
+        api.backend.ohlcv_store.series("../../escaped", "D")
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_klines_rejects_non_positive_limit(api, limit):
+    response = api.get("/market/klines/BTCUSDT", params={"limit": limit})
+
+    assert response.status_code == 422, response.text